@@ -3,10 +3,13 @@
 # Software:PyCharm
 # Time:2024/9/5 19:08
 # File:main.py
+from multiprocessing import freeze_support
+
 from module.stdio import MetaData
 from module.downloader import TelegramRestrictedMediaDownloader
 
 if __name__ == '__main__':
+    freeze_support()  # 打包后校验文件时使用的进程池需要。
     MetaData.print_helper()
     trmd = TelegramRestrictedMediaDownloader()
     trmd.run()
@@ -184,5 +184,44 @@ proxy: # 代理部分,如不使用请全部填null注意冒号后面有空格,
   username: null # 代理的账号,没有就填null。
   password: null # 代理的密码,没有就填null。
 save_directory: F:\directory\media\where\you\save # 下载的媒体保存的目录(支持通配符,不支持网络路径)。
+segment: # 大文件分段并发下载。
+  count: 1 # 单个文件同时下载的分段数,1为不分段(按顺序下载)。
+  min_size: 64 # 文件大小(MiB)达到该值时才启用分段下载。
+writer: # 磁盘写入。
+  queue_size: 8 # 每个文件的写入队列可缓存的块数,队列满时暂停接收数据。
+  coalesce_size: 4 # 合并为一次写入的最大数据量(MiB)。
+  fsync: close # 同步到磁盘的时机。支持的参数:never(不主动同步),close(文件写完时),always(每次写入后)。
+retention: # 长时间运行时的内存回收。
+  max_records: 10000 # 内存中保留的已结束任务记录数,超出后最早的记录将移出内存(仍保存在任务日志中,统计表会按需读取)。
+  max_age: 24 # 已结束任务记录在内存中保留的最长时间(小时)。
+download_chat: # 频道下载(/download_chat)。
+  incremental: true # 增量扫描。记录每个频道在相同过滤条件(下载类型、关键词、起始日期)下已扫描的最大消息ID,再次执行时只获取新消息。
+auto_concurrency: # 自动调整同时下载的任务数(AIMD)。
+  enabled: false # 是否启用。启用后以max_tasks.download为初始值,总速度上升时逐个增加,遇到FloodWait、超时或单任务速度下降时减少。
+  min: 1 # 最少同时下载的任务数。
+  max: 16 # 最多同时下载的任务数。
+  interval: 10 # 采样间隔(秒)。
+accounts: # 多账号会话池。
+  sessions: # 额外账号的会话名列表,如:[account2, account3]。首次运行时会依次要求登录,会话文件保存在sessions目录下。下载时按频道访问权限、负载与文件所在DC在所有账号间分配,某账号无法访问的频道会自动交给其他账号。
+dedup: # 跨频道内容去重,以Telegram的file_unique_id与文件大小识别相同的文件。
+  enabled: True # 为True时,已保存过的文件在其他频道或链接中再次出现时,由本地已保存的文件得到(reflink或硬链接),不再下载。
+  copy: True # 为True时,reflink与硬链接都不可用(如跨磁盘)时复制本地文件;为False时重新下载。
+hash: # 下载时计算文件摘要,用于发现磁盘上的静默损坏。
+  algorithm: # 摘要算法,如:sha256、md5、blake2b,安装xxhash后可使用xxhash。为空时不计算。摘要保存在任务日志中。
+  sidecar: False # 为True时,在文件旁写入同名的摘要文件(如:video.mp4.sha256,格式与sha256sum一致)。
+  verify: False # 为True时,启动后使用多进程重新校验任务日志中记录过摘要的所有文件,并输出损坏或缺失的文件。
+temp: # 缓存目录。
+  per_volume: True # 为True时,缓存目录与保存路径不在同一设备(如Docker中分别挂载)时,改用保存路径所在设备上的"保存路径/.trmd_temp"作为缓存目录,下载完成后移动文件只需重命名;为False时始终使用软件目录下的temp,跨设备移动在后台线程中复制。
+disk: # 磁盘空间。
+  min_free: 1024 # 单位MB,下载前按文件大小预留缓存目录所在磁盘的空间,并至少保留该大小的剩余空间,不足时任务排队等待(不会失败),机器人会发送等待通知。
+  preallocate: True # 为True时,开始下载时使用posix_fallocate一次性分配缓存文件的空间,减少磁盘碎片(仅Linux等支持的平台)。
+temp_gc: # 缓存文件清理。
+  enabled: True # 为True时,在后台定期清理缓存目录中失败、取消或被替换的下载留下的.temp文件,正在下载与未完成任务的缓存文件会保留用于断点续传。第一次启用前(如从旧版本升级前)已存在的缓存文件不会被清理,不再需要时请手动删除。
+  max_age: 72 # 孤立的缓存文件超过该时间(小时)未修改时删除,为0时不按时间清理。
+  max_size: 0 # 孤立的缓存文件总大小超过该值(MB)时从最旧的开始删除,为0时不限制。
+  interval: 600 # 每隔多少秒检查一次缓存目录(最小60)。
+upload_part: # 大文件上传。
+  enabled: True # 为True时,大于10MB的文件分片并发上传,已上传的分片记录在任务日志中,上传失败重试或重启后只上传缺少的分片。
+  workers: 4 # 每个文件同时上传的分片数。
 ```
 """
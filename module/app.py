@@ -25,6 +25,7 @@ from module.language import _t
 from module.config import UserConfig
 from module.stdio import StatisticalTable
 from module.client import TelegramRestrictedMediaDownloaderClient
+from module.dir_index import DirectoryIndex
 from module.enums import (
     DownloadType,
     DownloadStatus,
@@ -43,27 +44,37 @@ class Application(UserConfig, StatisticalTable):
 
     def __init__(self):
         UserConfig.__init__(self)
-        StatisticalTable.__init__(self)
+        StatisticalTable.__init__(self, maxlen=self.retention_max_records)
         self.client = self.build_client()
         self.check_download_type()
         self.current_task_num: int = 0
 
-    def build_client(self) -> pyrogram.Client:
-        """用填写的配置文件,构造pyrogram客户端。"""
+    def build_client(self, name: Union[str, None] = None) -> pyrogram.Client:
+        """用填写的配置文件,构造pyrogram客户端。name为会话名,为None时使用主账号。"""
         os.makedirs(self.work_directory, exist_ok=True)
-        Session.WAIT_TIMEOUT = min(Session.WAIT_TIMEOUT + self.max_download_task ** 2, MAX_FILE_REFERENCE_TIME)
+        # 启用自动并发时按上限配置,实际并发数由调度器控制。
+        max_download_task: int = max(
+            self.max_download_task or 1,
+            self.auto_concurrency_max if self.auto_concurrency_enabled else 0
+        )
+        if name is None:
+            Session.WAIT_TIMEOUT = min(Session.WAIT_TIMEOUT + max_download_task ** 2, MAX_FILE_REFERENCE_TIME)
         return TelegramRestrictedMediaDownloaderClient(
-            name=SOFTWARE_FULL_NAME.replace(' ', ''),
+            name=name or SOFTWARE_FULL_NAME.replace(' ', ''),
             api_id=self.api_id,
             api_hash=self.api_hash,
             proxy=self.proxy if self.enable_proxy else None,
             workdir=self.work_directory,
-            max_concurrent_transmissions=self.max_download_task,
+            max_concurrent_transmissions=max_download_task,
             sleep_threshold=SLEEP_THRESHOLD,
         )
         # v1.3.7 新增多任务下载功能,无论是否Telegram会员。
         # https://stackoverflow.com/questions/76714896/pyrogram-download-multiple-files-at-the-same-time
 
+    def build_session_clients(self) -> list:
+        """构造会话池中额外账号的客户端。"""
+        return [self.build_client(name=name) for name in self.account_sessions]
+
     def process_shutdown(self, second: int) -> None:
         """处理关机逻辑。"""
         self.shutdown_task(second=second) if self.config.get('is_shutdown') else None
@@ -71,25 +82,27 @@ class Application(UserConfig, StatisticalTable):
     def get_temp_file_path(
             self,
             message: pyrogram.types.Message,
-            dtype: str
+            dtype: str,
+            temp_directory: Union[str, None] = None
     ) -> str:
-        """获取下载文件时的临时保存路径。"""
+        """获取下载文件时的临时保存路径,temp_directory为None时使用配置的缓存目录。"""
+        temp_directory = temp_directory or self.temp_directory
 
         def splice_chat_id(_file_name) -> str:
             try:
                 chat_id = str(message.chat.id)
                 if chat_id:
-                    temp_directory_with_chat_id: str = os.path.join(self.temp_directory, chat_id)
-                    os.makedirs(temp_directory_with_chat_id, exist_ok=True)
+                    temp_directory_with_chat_id: str = os.path.join(temp_directory, chat_id)
+                    DirectoryIndex.makedirs(temp_directory_with_chat_id)
                     _file: str = os.path.join(temp_directory_with_chat_id, validate_title(_file_name))
                 else:
                     raise ValueError('chat id is empty.')
             except Exception as e:
-                _file: str = os.path.join(self.temp_directory, validate_title(_file_name))
+                _file: str = os.path.join(temp_directory, validate_title(_file_name))
                 log.warning(f'拼接临时路径时,无法获取频道id,原因:{e}')
             return _file
 
-        os.makedirs(self.temp_directory, exist_ok=True)
+        DirectoryIndex.makedirs(temp_directory)
         dt = DownloadFileName(message=message, download_type=dtype)
         if dtype == DownloadType.VIDEO:
             file_name: str = dt.get_video_filename()
@@ -151,17 +164,19 @@ class Application(UserConfig, StatisticalTable):
         }
 
         if download_status == DownloadStatus.SUCCESS:
+            if file_name not in type_to_success[download_type]:
+                self.success_count[download_type] += 1
             type_to_success[download_type].add(file_name)
+            type_to_failure[download_type].discard(file_name)  # 重试成功的文件不再计入失败。
         elif download_status == DownloadStatus.FAILURE:
-            type_to_failure[download_type].add(file_name)
+            if file_name not in type_to_success[download_type]:
+                type_to_failure[download_type].add(file_name)
         elif download_status == DownloadStatus.SKIP:
+            if file_name not in type_to_skip[download_type]:
+                self.skip_count[download_type] += 1
             type_to_skip[download_type].add(file_name)
         elif download_status == DownloadStatus.DOWNLOADING:
             self.current_task_num += 1
-        failure_set = type_to_failure[download_type]
-        success_set = type_to_success[download_type]
-        if failure_set and success_set:
-            failure_set -= success_set
 
     @on_record
     def get_file_type(self, *args) -> str:
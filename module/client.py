@@ -20,9 +20,38 @@ from module import (
 )
 from module.enums import KeyWord
 from module.language import _t
+from module.limiter import RateLimiter
+from module.peer_cache import PeerCache
 
 
-class TelegramRestrictedMediaDownloaderClient(pyrogram.Client):
+class RateLimitedClient(pyrogram.Client):
+    """所有RPC都经由限流器发出的客户端,FloodWait由限流器统一等待。
+    所有账号共享LIMITER,同一DC的优先级在主账号、其他账号与机器人之间共同生效。
+    文件分片的传输(stream_media、get_file使用的媒体会话,以及upload.*)不经过限流器。
+    """
+    LIMITER: RateLimiter = RateLimiter()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter: RateLimiter = RateLimitedClient.LIMITER
+
+    async def invoke(self, query, *args, sleep_threshold: Optional[float] = None, **kwargs):
+        invoke = super().invoke
+
+        async def call(_query, **_kwargs):
+            return await invoke(_query, *args, **_kwargs)
+
+        return await self.limiter.invoke(
+            call,
+            query,
+            dc_id=getattr(self.session, 'dc_id', None),
+            sleep_threshold=self.sleep_threshold if sleep_threshold is None else sleep_threshold,
+            account=self.name,
+            **kwargs
+        )
+
+
+class TelegramRestrictedMediaDownloaderClient(RateLimitedClient):
 
     async def authorize(self) -> pyrogram.types.User:
         console.print(
@@ -315,6 +344,23 @@ class TelegramRestrictedMediaDownloaderClient(pyrogram.Client):
                     return
 
 
+    async def get_message_id_by_date(
+            self: pyrogram.Client,
+            chat_id: Union[int, str],
+            date: datetime
+    ) -> int:
+        """获取指定时间之前的最后一条消息ID,没有时返回0。
+        只请求一条消息,用于将日期范围转换为get_chat_history的min_id与max_id。
+        """
+        messages = await get_chunk(
+            client=self,
+            chat_id=chat_id,
+            limit=1,
+            from_date=date
+        )
+        return messages[0].id if messages else 0
+
+
 async def get_chunk(
         *,
         client: pyrogram.Client,
@@ -328,11 +374,10 @@ async def get_chunk(
         reverse: bool = False
 ):
     from_message_id = from_message_id or (1 if reverse else 0)
-    messages = await utils.parse_messages(
-        client,
-        await client.invoke(
+    try:
+        r = await client.invoke(
             raw.functions.messages.GetHistory(
-                peer=await client.resolve_peer(chat_id),
+                peer=await PeerCache.resolve_peer(client, chat_id),
                 offset_id=from_message_id,
                 offset_date=utils.datetime_to_timestamp(from_date),
                 add_offset=offset * (-1 if reverse else 1) - (limit if reverse else 0),
@@ -342,9 +387,11 @@ async def get_chunk(
                 hash=0,
             ),
             sleep_threshold=60,
-        ),
-        replies=0,
-    )
+        )
+    except PeerCache.INVALID_ERRORS:
+        PeerCache.invalidate(chat_id)
+        raise
+    messages = await utils.parse_messages(client, r, replies=0)
 
     if reverse:
         messages.reverse()
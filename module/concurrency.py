@@ -0,0 +1,95 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 19:50
+# File:concurrency.py
+import time
+import asyncio
+
+from typing import Callable, Union
+
+from module import log
+from module.stdio import MetaData
+from module.scheduler import TaskScheduler
+
+
+class ConcurrencyTuner:
+    """按AIMD(加性增、乘性减)自动调整同时下载的任务数。
+    每隔interval秒采样一次总下载速度:
+    1.名额已占满且总速度仍在上升时,名额+1。
+    2.出现FloodWait、超时时名额减半;总速度不再上升而单任务速度明显下降时,名额减为3/4。
+    """
+    RISE_RATIO: float = 1.05  # 总速度高于上次的该倍数时视为上升。
+    FALL_RATIO: float = 0.7  # 单任务速度低于上次的该倍数时视为下降。
+
+    def __init__(
+            self,
+            scheduler: TaskScheduler,
+            sample: Callable[[], int],
+            min_task: int,
+            max_task: int,
+            interval: float
+    ):
+        self.scheduler: TaskScheduler = scheduler
+        self.sample: Callable[[], int] = sample  # 返回累计已下载字节数。
+        self.min_task: int = max(min_task or 1, 1)
+        self.max_task: int = max(max_task or self.min_task, self.min_task)
+        self.interval: float = max(interval or 10, 1)
+        self.congestion: int = 0
+        self.congestion_reason: Union[str, None] = None
+        self.last_throughput: float = 0.0
+        self.last_per_task: float = 0.0
+        self.scheduler.set_limit(min(max(self.scheduler.max_download_task, self.min_task), self.max_task))
+
+    @property
+    def limit(self) -> int:
+        return self.scheduler.max_download_task
+
+    def on_congestion(self, reason: str) -> None:
+        """记录一次拥塞信号(FloodWait、超时等),在下次采样时减少名额。"""
+        self.congestion += 1
+        self.congestion_reason = reason
+
+    def __set_limit(self, limit: int, reason: str, throughput: float) -> None:
+        limit = min(max(limit, self.min_task), self.max_task)
+        if limit == self.limit:
+            return None
+        log.info(
+            f'下载并发数已自动调整:{self.limit} -> {limit},'
+            f'总速度:{MetaData.suitable_units_display(int(throughput))}/s,原因:{reason}。'
+        )
+        self.scheduler.set_limit(limit)
+
+    def step(self, throughput: float) -> None:
+        """根据一次采样的总速度(字节/秒)调整名额。"""
+        running: int = self.scheduler.running
+        per_task: float = throughput / running if running else 0.0
+        saturated: bool = running >= self.limit
+        if self.congestion:
+            self.__set_limit(self.limit // 2, f'{self.congestion_reason}(共{self.congestion}次)', throughput)
+            self.congestion = 0
+        elif (
+                saturated
+                and self.last_per_task
+                and per_task < self.last_per_task * ConcurrencyTuner.FALL_RATIO
+                and throughput < self.last_throughput * ConcurrencyTuner.RISE_RATIO
+        ):
+            self.__set_limit(self.limit * 3 // 4, '单任务速度下降', throughput)
+        elif saturated and throughput >= self.last_throughput * ConcurrencyTuner.RISE_RATIO:
+            self.__set_limit(self.limit + 1, '总速度上升', throughput)
+        self.last_throughput = throughput
+        self.last_per_task = per_task
+
+    async def run(self) -> None:
+        log.info(f'已启用自动并发,当前下载并发数:{self.limit},范围:{self.min_task}~{self.max_task}。')
+        last_total: int = self.sample()
+        last_time: float = time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            total: int = self.sample()
+            now: float = time.monotonic()
+            throughput: float = (total - last_total) / max(now - last_time, 1e-6)
+            last_total, last_time = total, now
+            if not self.scheduler.running and not self.congestion:
+                continue  # 没有下载时不调整。
+            self.step(throughput)
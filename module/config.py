@@ -162,6 +162,57 @@ class UserConfig(BaseConfig):
         'max_retries': {
             'download': None,
             'upload': None
+        },
+        'segment': {
+            'count': 1,
+            'min_size': 64
+        },
+        'writer': {
+            'queue_size': 8,
+            'coalesce_size': 4,
+            'fsync': 'close'
+        },
+        'retention': {
+            'max_records': 10000,
+            'max_age': 24
+        },
+        'download_chat': {
+            'incremental': True
+        },
+        'auto_concurrency': {
+            'enabled': False,
+            'min': 1,
+            'max': 16,
+            'interval': 10
+        },
+        'accounts': {
+            'sessions': None
+        },
+        'dedup': {
+            'enabled': True,
+            'copy': True
+        },
+        'hash': {
+            'algorithm': None,
+            'sidecar': False,
+            'verify': False
+        },
+        'temp': {
+            'per_volume': True
+        },
+        'disk': {
+            'min_free': 1024,
+            'preallocate': True
+        },
+        'temp_gc': {
+            'enabled': True,
+            'max_age': 72,
+            'max_size': 0,
+            'interval': 600
+        },
+        'upload_part': {
+            'enabled': True,
+            'workers': 4
         }
     }
     TEMP_DIRECTORY: str = os.path.join(os.getcwd(), 'temp')
@@ -202,6 +253,35 @@ class UserConfig(BaseConfig):
         self.proxy: dict = self.config.get('proxy', {})
         self.enable_proxy: bool = self.proxy.get('enable_proxy', False)
         self.save_directory: str = self.config.get('save_directory')
+        self.segment_count: int = (self.config.get('segment') or {}).get('count', 1) or 1
+        self.segment_min_size: int = ((self.config.get('segment') or {}).get('min_size', 64) or 0) * 1024 * 1024
+        self.writer_queue_size: int = (self.config.get('writer') or {}).get('queue_size', 8) or 8
+        self.writer_coalesce_size: int = ((self.config.get('writer') or {}).get('coalesce_size', 4) or 4) * 1024 * 1024
+        self.writer_fsync: str = (self.config.get('writer') or {}).get('fsync', 'close') or 'close'
+        self.retention_max_records: int = (self.config.get('retention') or {}).get('max_records', 10000) or 10000
+        self.retention_max_age: int = ((self.config.get('retention') or {}).get('max_age', 24) or 24) * 3600
+        self.download_chat_incremental: bool = (self.config.get('download_chat') or {}).get('incremental', True) is not False
+        self.auto_concurrency_enabled: bool = bool((self.config.get('auto_concurrency') or {}).get('enabled', False))
+        self.auto_concurrency_min: int = (self.config.get('auto_concurrency') or {}).get('min', 1) or 1
+        self.auto_concurrency_max: int = (self.config.get('auto_concurrency') or {}).get('max', 16) or 16
+        self.auto_concurrency_interval: int = (self.config.get('auto_concurrency') or {}).get('interval', 10) or 10
+        self.account_sessions: list = [
+            str(_) for _ in ((self.config.get('accounts') or {}).get('sessions') or []) if _
+        ]
+        self.dedup_enabled: bool = (self.config.get('dedup') or {}).get('enabled', True) is not False
+        self.dedup_copy: bool = (self.config.get('dedup') or {}).get('copy', True) is not False
+        self.hash_algorithm: Union[str, None] = (self.config.get('hash') or {}).get('algorithm') or None
+        self.hash_sidecar: bool = bool((self.config.get('hash') or {}).get('sidecar', False))
+        self.hash_verify: bool = bool((self.config.get('hash') or {}).get('verify', False))
+        self.temp_per_volume: bool = (self.config.get('temp') or {}).get('per_volume', True) is not False
+        self.disk_min_free: int = ((self.config.get('disk') or {}).get('min_free', 1024) or 0) * 1024 * 1024
+        self.disk_preallocate: bool = (self.config.get('disk') or {}).get('preallocate', True) is not False
+        self.temp_gc_enabled: bool = (self.config.get('temp_gc') or {}).get('enabled', True) is not False
+        self.temp_gc_max_age: int = ((self.config.get('temp_gc') or {}).get('max_age', 72) or 0) * 3600
+        self.temp_gc_max_size: int = ((self.config.get('temp_gc') or {}).get('max_size', 0) or 0) * 1024 * 1024
+        self.temp_gc_interval: int = (self.config.get('temp_gc') or {}).get('interval', 600) or 600
+        self.upload_part_enabled: bool = (self.config.get('upload_part') or {}).get('enabled', True) is not False
+        self.upload_part_workers: int = (self.config.get('upload_part') or {}).get('workers', 4) or 4
 
     def get_last_history_record(self) -> None:
         """获取最近一次保存的历史配置文件。"""
@@ -303,6 +383,18 @@ class UserConfig(BaseConfig):
         self.process_nesting(param_name='proxy', config=config)
         self.process_nesting(param_name='max_tasks', config=config)
         self.process_nesting(param_name='max_retries', config=config)
+        self.process_nesting(param_name='segment', config=config)
+        self.process_nesting(param_name='writer', config=config)
+        self.process_nesting(param_name='retention', config=config)
+        self.process_nesting(param_name='download_chat', config=config)
+        self.process_nesting(param_name='auto_concurrency', config=config)
+        self.process_nesting(param_name='accounts', config=config)
+        self.process_nesting(param_name='dedup', config=config)
+        self.process_nesting(param_name='hash', config=config)
+        self.process_nesting(param_name='temp', config=config)
+        self.process_nesting(param_name='disk', config=config)
+        self.process_nesting(param_name='temp_gc', config=config)
+        self.process_nesting(param_name='upload_part', config=config)
 
         # 删除父级模板中没有的字段。
         self.remove_extra_keys(
@@ -0,0 +1,157 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 21:40
+# File:dedup.py
+import os
+import shutil
+
+from typing import Tuple, Union
+
+import pyrogram
+
+from module import log
+from module.language import _t
+from module.enums import DownloadType, KeyWord
+from module.dir_index import DirectoryIndex
+from module.journal import TaskJournal
+from module.retention import RetainedSet
+from module.stdio import MetaData
+
+
+class ContentIndex:
+    """跨频道的内容去重索引,以Telegram的file_unique_id与文件大小为键,记录已保存的文件路径。
+    同一文件在其他频道或链接中再次出现时,由已保存的文件直接得到,不再经过网络传输:
+    优先使用reflink(写时复制),其次硬链接,都不支持时(如跨磁盘)按配置复制本地文件。
+    """
+    METHOD_REFLINK: str = 'reflink'
+    METHOD_HARDLINK: str = 'hardlink'
+    METHOD_COPY: str = 'copy'
+    FICLONE: int = 0x40049409  # Linux的ioctl FICLONE,btrfs、xfs等文件系统支持。
+
+    def __init__(
+            self,
+            journal: TaskJournal,
+            enabled: bool = True,
+            allow_copy: bool = True,
+            max_records: int = 10000
+    ):
+        self.journal: TaskJournal = journal
+        self.enabled: bool = enabled
+        self.allow_copy: bool = allow_copy
+        self.recorded: RetainedSet = RetainedSet(max_records)  # 最近确认已记录的(file_unique_id,大小)。
+        self.saved_bytes: int = 0
+        self.saved_count: int = 0
+
+    @staticmethod
+    def get_key(message: pyrogram.types.Message) -> Union[Tuple[str, int], None]:
+        """获取消息中媒体的(file_unique_id,大小),没有媒体时返回None。"""
+        for dtype in DownloadType():
+            media = getattr(message, dtype, None)
+            if media is not None:
+                file_unique_id: Union[str, None] = getattr(media, 'file_unique_id', None)
+                size: Union[int, None] = getattr(media, 'file_size', None)
+                return (file_unique_id, size) if file_unique_id and size else None
+        return None
+
+    def record(self, message: pyrogram.types.Message, path: str) -> None:
+        """记录已保存到path的文件。"""
+        if not self.enabled:
+            return None
+        key = ContentIndex.get_key(message)
+        if key is None or not os.path.isfile(path) or os.path.getsize(path) != key[1]:
+            return None
+        self.journal.set_content(*key, path=os.path.abspath(path))
+        self.recorded.add(key)
+
+    def is_recorded(self, message: pyrogram.types.Message) -> bool:
+        """通过内存与任务日志判断文件是否已记录,不访问文件系统,可在事件循环中调用。"""
+        if not self.enabled:
+            return True
+        key = ContentIndex.get_key(message)
+        if key is None or key in self.recorded:
+            return True
+        if self.journal.get_content(*key) is None:
+            return False
+        self.recorded.add(key)
+        return True
+
+    def lookup(self, key: Tuple[str, int]) -> Union[str, None]:
+        """查询已保存的文件,文件已被删除或大小不一致时清除该记录。"""
+        path: Union[str, None] = self.journal.get_content(*key)
+        if path is None:
+            return None
+        if os.path.isfile(path) and os.path.getsize(path) == key[1]:
+            return path
+        self.journal.remove_content(*key)
+        return None
+
+    @staticmethod
+    def reflink(src: str, dst: str) -> None:
+        import fcntl
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            fcntl.ioctl(d.fileno(), ContentIndex.FICLONE, s.fileno())
+
+    def clone(self, src: str, dst: str) -> str:
+        """由src得到dst,返回使用的方式,全部失败时抛出最后一个异常。"""
+        temp: str = f'{dst}.dedup'
+        error: Union[Exception, None] = None
+        methods: list = [
+            (ContentIndex.METHOD_REFLINK, ContentIndex.reflink),
+            (ContentIndex.METHOD_HARDLINK, os.link)
+        ]
+        if self.allow_copy:
+            methods.append((ContentIndex.METHOD_COPY, shutil.copyfile))
+        for method, func in methods:
+            try:
+                if os.path.lexists(temp):
+                    os.remove(temp)
+                func(src, temp)
+                os.replace(temp, dst)
+                return method
+            except Exception as e:
+                error = e
+        try:
+            os.remove(temp) if os.path.lexists(temp) else None
+        except OSError:
+            pass
+        raise error
+
+    def restore(self, message: pyrogram.types.Message, path: str) -> bool:
+        """若该文件已保存在其他位置,则由已保存的文件得到path,成功时返回True。"""
+        if not self.enabled:
+            return False
+        key = ContentIndex.get_key(message)
+        if key is None:
+            return False
+        src: Union[str, None] = self.lookup(key)
+        if src is None or os.path.abspath(path) == src:
+            return False
+        try:
+            DirectoryIndex.makedirs(os.path.dirname(os.path.abspath(path)))
+            method: str = self.clone(src=src, dst=path)
+            DirectoryIndex.add(path, size=key[1])
+        except Exception as e:
+            log.warning(f'由已保存的文件"{src}"得到"{path}"失败,将重新下载,{_t(KeyWord.REASON)}:"{e}"')
+            return False
+        self.journal.add_content_ref(
+            path=os.path.abspath(path),
+            file_unique_id=key[0],
+            size=key[1],
+            source=src,
+            method=method
+        )
+        self.saved_bytes += key[1]
+        self.saved_count += 1
+        log.info(
+            f'"{path}"与已保存的文件"{src}"内容相同,已通过{method}得到,'
+            f'节省流量:{MetaData.suitable_units_display(key[1])}。'
+        )
+        return True
+
+    def summary(self) -> dict:
+        return {
+            'dedup_count': self.saved_count,
+            'saved_bytes': self.saved_bytes,
+            'total_saved_bytes': self.journal.content_saved_bytes()
+        }
@@ -0,0 +1,106 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 22:15
+# File:dir_index.py
+import os
+import threading
+
+from typing import Dict, Union
+
+
+class DirectoryIndex:
+    """进程内共享的保存目录索引,避免每个文件都调用os.path.exists与os.path.getsize。
+    1.每个目录第一次查询时用os.scandir读取一次文件名,文件大小在文件名命中时才获取并缓存。
+    2.文件移入、替换或删除时由path_tool中的函数同步更新索引。
+    3.已创建的目录会被记住,重复的os.makedirs不再访问文件系统。
+    4.索引会在事件循环与线程池(移动、删除文件)中同时访问,修改与遍历都在lock中进行,访问文件系统时不持有lock。
+    """
+    entries: Dict[str, Dict[str, Union[int, None]]] = {}  # 目录:{文件名:大小(未获取时为None)}。
+    created: set = set()  # 已确认存在的目录。
+    scan_count: int = 0
+    lock = threading.Lock()
+
+    @staticmethod
+    def __key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def makedirs(path: str) -> None:
+        """创建目录,已确认存在的目录直接返回。"""
+        key: str = DirectoryIndex.__key(path)
+        with DirectoryIndex.lock:
+            if key in DirectoryIndex.created:
+                return None
+        os.makedirs(path, exist_ok=True)
+        with DirectoryIndex.lock:
+            DirectoryIndex.created.add(key)
+
+    @staticmethod
+    def get_entries(directory: str) -> Dict[str, Union[int, None]]:
+        key: str = DirectoryIndex.__key(directory)
+        with DirectoryIndex.lock:
+            entries: Union[Dict[str, Union[int, None]], None] = DirectoryIndex.entries.get(key)
+        if entries is not None:
+            return entries
+        entries = {}
+        exists: bool = False
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file():
+                        entries[os.path.normcase(entry.name)] = None
+            exists = True
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        with DirectoryIndex.lock:
+            if exists:
+                DirectoryIndex.created.add(key)
+            # 扫描期间其他线程已建立的索引包含之后的变化,优先使用。
+            entries = DirectoryIndex.entries.setdefault(key, entries)
+            DirectoryIndex.scan_count += 1
+        return entries
+
+    @staticmethod
+    def get_size(path: str) -> Union[int, None]:
+        """获取文件大小,文件不在索引中时返回None。"""
+        directory, file_name = os.path.split(DirectoryIndex.__key(path))
+        entries: Dict[str, Union[int, None]] = DirectoryIndex.get_entries(directory)
+        with DirectoryIndex.lock:
+            if file_name not in entries:
+                return None
+            size: Union[int, None] = entries.get(file_name)
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                with DirectoryIndex.lock:
+                    entries.pop(file_name, None)
+                return None
+            with DirectoryIndex.lock:
+                if file_name in entries:
+                    entries[file_name] = size
+        return size
+
+    @staticmethod
+    def add(path: str, size: Union[int, None] = None) -> None:
+        """记录移入目录的文件,目录尚未建立索引时无需记录。"""
+        directory, file_name = os.path.split(DirectoryIndex.__key(path))
+        with DirectoryIndex.lock:
+            entries: Union[Dict[str, Union[int, None]], None] = DirectoryIndex.entries.get(directory)
+            if entries is not None:
+                entries[file_name] = size
+
+    @staticmethod
+    def discard(path: str) -> None:
+        """移除被删除或移走的文件或目录。"""
+        key: str = DirectoryIndex.__key(path)
+        directory, file_name = os.path.split(key)
+        prefix: str = key + os.sep
+        with DirectoryIndex.lock:
+            entries: Union[Dict[str, Union[int, None]], None] = DirectoryIndex.entries.get(directory)
+            if entries is not None:
+                entries.pop(file_name, None)
+            for cache in (DirectoryIndex.entries, DirectoryIndex.created):
+                for k in [k for k in cache if k == key or k.startswith(prefix)]:
+                    cache.remove(k) if isinstance(cache, set) else cache.pop(k, None)
@@ -0,0 +1,149 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 23:55
+# File:disk.py
+import os
+import shutil
+import asyncio
+
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from module import log
+from module.language import _t
+from module.enums import KeyWord
+from module.stdio import MetaData
+from module.volume import VolumeMap
+
+
+class DiskGuard:
+    """下载前按文件大小预留磁盘空间(准入控制)。
+    1.可用空间=磁盘剩余空间-已预留但尚未占用的字节数-保留空间,不足时任务排队等待,不会失败。
+    2.预留的字节数随缓存文件实际占用的磁盘空间(已分配的块,而不是文件大小)增长逐渐抵消,下载结束(成功或失败)后释放。
+    3.有任务释放预留或每隔POLL_INTERVAL秒(磁盘空间可能被手动清理)重新检查一次。
+    4.重复提交的任务使用同一个缓存文件,预留按缓存文件计数,最后一个任务释放时才移除。
+    """
+    POLL_INTERVAL: int = 30
+
+    def __init__(self, min_free: int = 0, on_wait: Optional[Callable[[str], None]] = None):
+        self.min_free: int = max(min_free, 0)
+        self.on_wait: Optional[Callable[[str], None]] = on_wait  # 开始等待磁盘空间时的通知。
+        self.reservations: Dict[str, Tuple[Union[int, None], int, int]] = {}  # 缓存文件:(设备,预留字节数,预留时已分配的字节数)。
+        self.holders: Dict[str, int] = {}  # 缓存文件:持有预留的任务数。
+        self.waiting: Dict[str, int] = {}  # 等待磁盘空间的缓存文件:需要的字节数。
+        self.changed = asyncio.Event()
+
+    def __notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    @staticmethod
+    def get_free(path: str) -> int:
+        """获取路径所在磁盘的剩余空间,路径不存在时使用最近的已存在的上级目录。"""
+        path = os.path.abspath(path)
+        while not os.path.exists(path):
+            parent: str = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        try:
+            return shutil.disk_usage(path).free
+        except OSError:
+            return 0
+
+    @staticmethod
+    def get_allocated(path: str) -> int:
+        """文件实际占用的磁盘空间。
+        分段下载的缓存文件是稀疏的,预分配的缓存文件大小等于最终大小,都不能用文件大小代替;
+        不支持st_blocks的平台(Windows)上使用文件大小。
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 0
+        blocks: Union[int, None] = getattr(stat, 'st_blocks', None)
+        return blocks * 512 if blocks is not None else stat.st_size
+
+    @staticmethod
+    def get_required(path: str, size: int, written: int) -> int:
+        """计算还需要预留的字节数。
+        size为文件大小,written为已写入(由块清单得到)的字节数,
+        已分配但尚未写入的空间(预分配)已从磁盘剩余空间中扣除,不再重复预留。
+        """
+        unwritten: int = max(size - written, 0)
+        preallocated: int = max(DiskGuard.get_allocated(path) - written, 0)
+        return max(unwritten - preallocated, 0)
+
+    @staticmethod
+    def __remaining(path: str, size: int, base: int) -> int:
+        """预留中尚未被文件实际占用的字节数。"""
+        return max(size - max(DiskGuard.get_allocated(path) - base, 0), 0)
+
+    def get_reserved(self, device: Union[int, None]) -> int:
+        return sum(
+            DiskGuard.__remaining(path, size, base)
+            for path, (_device, size, base) in self.reservations.items()
+            if _device == device
+        )
+
+    def get_available(self, path: str, device: Union[int, None]) -> int:
+        return DiskGuard.get_free(path) - self.get_reserved(device) - self.min_free
+
+    async def reserve(self, path: str, size: int) -> None:
+        """为缓存文件预留size字节,磁盘空间不足时等待,该缓存文件已有预留时只增加计数。"""
+        size = max(size, 0)
+        device: Union[int, None] = VolumeMap.get_device(path)
+        try:
+            while path not in self.reservations:  # 等待期间其他任务已为该缓存文件预留时不再等待。
+                available: int = self.get_available(path, device)
+                if size <= available:
+                    break
+                if path not in self.waiting:
+                    self.waiting[path] = size
+                    text: str = (
+                        f'💾 "{os.path.basename(path)}"等待磁盘空间,'
+                        f'需要:{MetaData.suitable_units_display(size)},'
+                        f'可用:{MetaData.suitable_units_display(max(available, 0))},'
+                        f'等待中的任务:{len(self.waiting)}个。'
+                    )
+                    log.warning(text)
+                    if self.on_wait:
+                        self.on_wait(text)
+                try:
+                    await asyncio.wait_for(self.changed.wait(), timeout=DiskGuard.POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self.waiting.pop(path, None) is not None:
+                log.info(f'"{os.path.basename(path)}"已获得磁盘空间,继续下载。')
+        if path in self.reservations:
+            self.holders[path] = self.holders.get(path, 1) + 1
+            return None
+        self.reservations[path] = (device, size, DiskGuard.get_allocated(path))
+        self.holders[path] = 1
+        self.__notify()  # 唤醒等待同一缓存文件的任务。
+
+    def release(self, path: str) -> None:
+        holders: int = self.holders.pop(path, 0) - 1
+        if holders > 0:
+            self.holders[path] = holders
+            return None
+        if self.reservations.pop(path, None) is not None:
+            self.__notify()
+
+    @staticmethod
+    def preallocate(path: str, size: int) -> bool:
+        """使用posix_fallocate一次性分配缓存文件的空间,减少碎片,不支持的平台或文件系统上不做处理。"""
+        if not hasattr(os, 'posix_fallocate'):
+            return False
+        fd: int = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if DiskGuard.get_allocated(path) >= size:  # 稀疏文件大小已达到size时仍需分配。
+                return True
+            os.posix_fallocate(fd, 0, size)
+            return True
+        except OSError as e:
+            log.warning(f'预分配"{path}"的空间失败,{_t(KeyWord.REASON)}:"{e}"')
+            return False
+        finally:
+            os.close(fd)
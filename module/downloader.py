@@ -5,8 +5,10 @@
 # File:downloader.py
 import asyncio
 import datetime
+import hashlib
 import json
 import os
+import random
 import re
 import shutil
 import sys
@@ -20,6 +22,7 @@ import pyrogram
 import yt_dlp
 from pyrogram.enums.parse_mode import ParseMode
 from pyrogram.errors.exceptions.bad_request_400 import (
+    BadRequest,
     BotMethodInvalid,
     ChannelInvalid,
 )
@@ -30,18 +33,22 @@ from pyrogram.errors.exceptions.bad_request_400 import (
     ChatForwardsRestricted as ChatForwardsRestricted_400,
 )
 from pyrogram.errors.exceptions.bad_request_400 import (
+    FileReferenceExpired,
+    FileReferenceInvalid,
     MsgIdInvalid,
     PeerIdInvalid,
     UsernameInvalid,
     UsernameNotOccupied,
 )
-from pyrogram.errors.exceptions.forbidden_403 import ChatWriteForbidden
+from pyrogram.errors.exceptions.flood_420 import FloodWait
+from pyrogram.errors.exceptions.forbidden_403 import ChatWriteForbidden, Forbidden
 from pyrogram.errors.exceptions.not_acceptable_406 import (
     ChannelPrivate as ChannelPrivate_406,
 )
 from pyrogram.errors.exceptions.not_acceptable_406 import (
     ChatForwardsRestricted as ChatForwardsRestricted_406,
 )
+from pyrogram.errors.exceptions.not_acceptable_406 import NotAcceptable
 from pyrogram.errors.exceptions.unauthorized_401 import (
     AuthKeyUnregistered,
     SessionExpired,
@@ -55,6 +62,10 @@ from pyrogram.types.messages_and_media import ReplyParameters
 from module import LINK_PREVIEW_OPTIONS, SLEEP_THRESHOLD, console, log
 from module.app import Application
 from module.bot import Bot, CallbackData, KeyboardButton
+from module.client import RateLimitedClient
+from module.concurrency import ConcurrencyTuner
+from module.dedup import ContentIndex
+from module.disk import DiskGuard
 from module.enums import (
     BotButton,
     BotCallbackText,
@@ -64,10 +75,14 @@ from module.enums import (
     DownloadType,
     KeyWord,
     LinkType,
+    RetryReason,
     SaveDirectoryPrefix,
+    TaskSource,
 )
 from module.filter import Filter
+from module.integrity import Integrity, StreamHasher
 from module.language import _t
+from module.part_uploader import UploadStats
 from module.path_tool import (
     compare_file_size,
     get_file_size,
@@ -77,20 +92,37 @@ from module.path_tool import (
     safe_replace,
     split_path,
 )
+from module.peer_cache import PeerCache
+from module.pool import ClientPool
+from module.retention import RetainedDict, RetainedSet
+from module.scheduler import TaskScheduler
+from module.segment import (
+    ChunkManifest,
+    get_chunk_length,
+    get_total_chunks,
+    split_segments,
+)
 from module.stdio import Base64Image, MetaData, ProgressBar
 from module.task import DownloadTask
+from module.temp_gc import TempCollector
 from module.uploader import TelegramUploader
 from module.util import (
     Issues,
     canonical_link_message,
     canonical_link_str,
+    extract_info_from_link,
     format_chat_link,
     get_chat_with_notify,
     get_message_by_link,
+    get_messages_by_ids,
+    get_chat_messages_by_links,
+    group_links_by_chat,
     parse_link,
     safe_message,
     truncate_display_filename,
 )
+from module.volume import VolumeMap
+from module.writer import FileWriter, WriterStats
 
 
 class TelegramProgressTracker:
@@ -250,12 +282,84 @@ class TelegramProgressTracker:
 
 
 class TelegramRestrictedMediaDownloader(Bot):
+    FILE_REFERENCE_MAX_REFRESH: int = 3  # 单次下载中文件引用过期后最多重新获取消息的次数。
+    RETRY_BASE_DELAY: float = 2.0  # 网络错误首次重试前的等待时间(秒),之后每次翻倍。
+    RETRY_MAX_DELAY: float = 60.0  # 网络错误重试前的最长等待时间(秒)。
+
     def __init__(self):
         super().__init__()
         self.loop = asyncio.get_event_loop()
-        self.event = asyncio.Event()
         self.queue = asyncio.Queue()
         self.app = Application()
+        max_download_task: int = max(
+            self.app.max_download_task or 5,
+            self.app.auto_concurrency_max if self.app.auto_concurrency_enabled else 0,
+        )  # 启用自动并发时,线程与协程数按上限创建。
+        FileWriter.set_workers(max_download_task)  # 写入线程数与最大下载任务数一致。
+        self.scheduler = TaskScheduler(
+            max_download_task=self.app.max_download_task or 5,
+            resolve_workers=max_download_task * 2,  # 解析协程会在等待下载名额时挂起,故多于下载名额。
+        )
+        self.file_reference_refresh_count: int = 0  # 文件引用过期后重新获取消息的次数。
+        self.refreshed_messages: RetainedDict = RetainedDict(
+            self.app.retention_max_records
+        )  # (chat_id,message_id)->下载时因文件引用过期重新获取的消息,重试时使用。
+        self.restored_retries: Dict[tuple, dict] = (
+            {}
+        )  # (任务键,message_id)->恢复的任务中各文件上次运行时的重试状态。
+        self.hash_algorithm: Union[str, None] = self.app.hash_algorithm
+        if self.hash_algorithm and not StreamHasher.is_supported(self.hash_algorithm):
+            log.warning(f'不支持的摘要算法"{self.hash_algorithm}",下载时将不计算文件摘要。')
+            self.hash_algorithm = None
+        self.file_digests: Dict[str, str] = {}  # 缓存文件路径:下载完成时计算的摘要。
+        self.volumes = VolumeMap(
+            temp_directory=self.app.temp_directory,
+            save_directory=self.app.save_directory,
+            per_volume=self.app.temp_per_volume,
+        )
+        self.relocate_semaphore = asyncio.Semaphore(2)  # 同时跨设备复制的文件数。
+        self.disk = DiskGuard(
+            min_free=self.app.disk_min_free,
+            on_wait=lambda text: asyncio.create_task(self.done_notice(text)),
+        )
+        self.temp_collector: Union[TempCollector, None] = (
+            TempCollector(
+                directories=lambda: [self.app.temp_directory, *self.volumes.directories.values()],
+                journal=DownloadTask.JOURNAL,
+                active=lambda: [*self.disk.reservations.keys(), *self.disk.waiting.keys()],
+                max_age=self.app.temp_gc_max_age,
+                max_size=self.app.temp_gc_max_size,
+                interval=self.app.temp_gc_interval,
+            )
+            if self.app.temp_gc_enabled
+            else None
+        )
+        self.content_index = ContentIndex(
+            journal=DownloadTask.JOURNAL,
+            enabled=self.app.dedup_enabled,
+            allow_copy=self.app.dedup_copy,
+            max_records=self.app.retention_max_records,
+        )
+        self.pool = ClientPool(
+            main=self.app.client, clients=self.app.build_session_clients()
+        )
+        self.tuner: Union[ConcurrencyTuner, None] = (
+            ConcurrencyTuner(
+                scheduler=self.scheduler,
+                sample=lambda: WriterStats.bytes_written,
+                min_task=self.app.auto_concurrency_min,
+                max_task=self.app.auto_concurrency_max,
+                interval=self.app.auto_concurrency_interval,
+            )
+            if self.app.auto_concurrency_enabled
+            else None
+        )
+        # 已结束的任务记录超出保留数量或时间后移出内存,仍可从任务日志中读取。
+        DownloadTask.set_retention(
+            max_records=self.app.retention_max_records,
+            max_age=self.app.retention_max_age,
+        )
+        self.bot_task_link: RetainedSet = RetainedSet(self.app.retention_max_records)
         self.is_running: bool = False
         self.running_log: set = set()
         self.running_log.add(self.is_running)
@@ -263,11 +367,15 @@ class TelegramRestrictedMediaDownloader(Bot):
         self.uploader: Union[TelegramUploader, None] = None
         self.cd: Union[CallbackData, None] = None
         # 标签映射: 链接->标签、(chat_id,message_id)->标签、监听(chat_id)->标签
-        self.link_tag_map: Dict[str, str] = {}
-        self.message_tag_map: Dict[tuple, str] = {}
+        self.link_tag_map: RetainedDict = RetainedDict(self.app.retention_max_records)
+        self.message_tag_map: RetainedDict = RetainedDict(self.app.retention_max_records)
         self.listen_download_tag_by_chatid: Dict[Union[int, str], str] = {}
+        # 媒体描述缓存: (chat_id,message_id)->{标签,保存目录,各类型的媒体元数据},任务期间只计算一次。
+        self.media_descriptors: RetainedDict = RetainedDict(self.app.retention_max_records)
         # 规范化后的进行中/已分配链接集合（仅用于去重判断）
-        self.bot_task_link_canon: set = set()
+        self.bot_task_link_canon: RetainedSet = RetainedSet(
+            self.app.retention_max_records
+        )
         # gallery-dl 配置
         base_dir = getattr(
             self.app,
@@ -539,7 +647,54 @@ class TelegramRestrictedMediaDownloader(Bot):
             log.exception(f"下载排行榜视频出错 (yt-dlp): {url}, 原因: {e}")
             return False
 
+    @staticmethod
+    def get_media_key(message: pyrogram.types.Message) -> Union[Tuple[Union[int, str], int], None]:
+        chat_id = getattr(getattr(message, "chat", None), "id", None)
+        mid = getattr(message, "id", None)
+        return (chat_id, mid) if chat_id is not None and mid is not None else None
+
+    def get_message_tag(self, message: pyrogram.types.Message) -> Union[str, None]:
+        """获取消息的标签(优先级: 单条消息标签 > 监听频道标签)。"""
+        chat_id = getattr(getattr(message, "chat", None), "id", None)
+        mid = getattr(message, "id", None)
+        tag = None
+        if chat_id is not None and mid is not None:
+            tag = self.message_tag_map.get((chat_id, mid))
+        if tag is None and chat_id is not None:
+            tag = self.listen_download_tag_by_chatid.get(chat_id)
+        return tag.strip() if isinstance(tag, str) and tag.strip() else None
+
     def env_save_directory(self, message: pyrogram.types.Message) -> str:
+        """获取消息的保存目录,结果按消息缓存到任务结束。
+        标签在第一次计算时固定在媒体描述中,之后不再从message_tag_map重新获取,
+        标签映射中的记录在下载期间被移出时,完成的文件仍会移动到带标签的目录。
+        """
+        key = self.get_media_key(message)
+        descriptor: Union[dict, None] = self.media_descriptors.get(key) if key else None
+        if descriptor is not None:
+            return descriptor.get("save_directory")
+        try:
+            tag: Union[str, None] = self.get_message_tag(message)
+        except Exception:
+            tag = None
+        save_directory: str = self.__build_save_directory(message, tag)
+        if key:
+            self.media_descriptors[key] = {
+                "tag": tag,
+                "save_directory": save_directory,
+                "meta": {},
+            }
+        return save_directory
+
+    def forget_media(self, message: pyrogram.types.Message) -> None:
+        """任务结束(完成、跳过或不再重试)后移除该消息的媒体描述与重新获取的消息。"""
+        key = self.get_media_key(message)
+        self.media_descriptors.pop(key)
+        self.refreshed_messages.pop(key)
+
+    def __build_save_directory(
+        self, message: pyrogram.types.Message, tag: Union[str, None]
+    ) -> str:
         save_directory = self.app.save_directory
         for placeholder in SaveDirectoryPrefix():
             if placeholder in save_directory:
@@ -571,19 +726,10 @@ class TelegramRestrictedMediaDownloader(Bot):
                             save_directory = save_directory.replace(placeholder, dtype)
         # 附加标签子目录(优先级: 单条消息标签 > 监听频道标签)
         try:
-            chat_id = getattr(getattr(message, "chat", None), "id", None)
-            mid = getattr(message, "id", None)
-            tag = None
-            if chat_id is not None and mid is not None:
-                tag = self.message_tag_map.get((chat_id, mid))
-            if tag is None and chat_id is not None:
-                tag = self.listen_download_tag_by_chatid.get(chat_id)
-            if isinstance(tag, str) and tag.strip():
+            if tag:
                 from module.path_tool import validate_title
 
-                save_directory = os.path.join(
-                    save_directory, validate_title(tag.strip())
-                )
+                save_directory = os.path.join(save_directory, validate_title(tag))
         except Exception:
             pass
         return save_directory
@@ -781,7 +927,8 @@ class TelegramRestrictedMediaDownloader(Bot):
                                                     ] = tag
                                             except Exception:
                                                 pass
-                                        await self.create_download_task(
+                                        await self.submit_download_task(
+                                            source=TaskSource.BOT,
                                             message_ids=m,
                                             with_upload=with_upload,
                                             single_link=True,
@@ -801,7 +948,8 @@ class TelegramRestrictedMediaDownloader(Bot):
                                                 self.message_tag_map[(_cid, _mid)] = tag
                                         except Exception:
                                             pass
-                                    await self.create_download_task(
+                                    await self.submit_download_task(
+                                        source=TaskSource.BOT,
                                         message_ids=media_msg,
                                         with_upload=with_upload,
                                         single_link=True,
@@ -868,11 +1016,16 @@ class TelegramRestrictedMediaDownloader(Bot):
                     pass
         # 命中“进行中/已分配”或“已完成”的规范化键
         existed_canon = set()
+        # bot_task_link_canon只保留最近的链接,被移出的进行中链接由任务日志判断。
         existed_canon.update(
-            {c for c in right_link_canon if c in self.bot_task_link_canon}
+            {
+                c
+                for c in right_link_canon
+                if c in self.bot_task_link_canon or DownloadTask.is_pending(c)
+            }
         )
         existed_canon.update(
-            {c for c in right_link_canon if c in DownloadTask.COMPLETE_LINK}
+            {c for c in right_link_canon if DownloadTask.is_complete(c)}
         )
         # 将规范化命中映射回原字符串用于展示
         canon_map = {canonical_link_str(s): s for s in (right_link or set())}
@@ -899,11 +1052,19 @@ class TelegramRestrictedMediaDownloader(Bot):
 
         if links is None:
             return None
-        for link in links:
-            task: dict = await self.create_download_task(
-                message_ids=link, retry=None, with_upload=with_upload,
-                request_chat_id=request_chat_id
+        resolved: dict = await self.__resolve_links(links)
+        futures: list = [
+            self.submit_download_task(
+                source=TaskSource.BOT,
+                message_ids=link,
+                retry=None,
+                with_upload=with_upload,
+                request_chat_id=request_chat_id,
+                meta=resolved.get(link),
             )
+            for link in links
+        ]
+        for link, task in zip(links, await asyncio.gather(*futures)):
             if task.get("status") == DownloadStatus.FAILURE:
                 invalid_link.add(link)
             else:
@@ -1984,7 +2145,7 @@ class TelegramRestrictedMediaDownloader(Bot):
         ) -> bool:
             if _link not in _listen_chat:
                 try:
-                    chat = await self.user.get_chat(_link)
+                    chat = await PeerCache.get_chat(self.user, _link)
                     if chat.is_forum:
                         raise PeerIdInvalid
                     handler = MessageHandler(
@@ -2140,7 +2301,11 @@ class TelegramRestrictedMediaDownloader(Bot):
                 self.link_tag_map[message.link] = _tag
                 log.info(f'消息{message.link}包含关键词{keywords}，准备下载。')
             
-            await self.create_download_task(message_ids=message.link, single_link=True)
+            self.submit_download_task(
+                source=TaskSource.LISTEN_DOWNLOAD,
+                message_ids=message.link,
+                single_link=True,
+            )
         except Exception as e:
             log.exception(f"监听下载出现错误,{_t(KeyWord.REASON)}:{e}")
 
@@ -2206,25 +2371,18 @@ class TelegramRestrictedMediaDownloader(Bot):
                         ):
                             raise ValueError
                         if not self.handle_media_groups.get(listen_chat_id):
-                            self.handle_media_groups[listen_chat_id] = set()
+                            # 只需对近期的媒体组去重,保留最近的消息ID即可。
+                            self.handle_media_groups[listen_chat_id] = RetainedSet(
+                                self.app.retention_max_records
+                            )
                         if (
                             listen_chat_id in self.handle_media_groups
                             and message.id
                             not in self.handle_media_groups.get(listen_chat_id)
                         ):
-                            ids: set = set()
-                            for peer_message in media_group_ids:
-                                peer_id = peer_message.id
-                                ids.add(peer_id)
-                            if ids:
-                                old_ids: Union[None, set] = (
-                                    self.handle_media_groups.get(listen_chat_id)
-                                )
-                                if old_ids and isinstance(old_ids, set):
-                                    old_ids.update(ids)
-                                    self.handle_media_groups[listen_chat_id] = old_ids
-                                else:
-                                    self.handle_media_groups[listen_chat_id] = ids
+                            self.handle_media_groups[listen_chat_id].update(
+                                peer_message.id for peer_message in media_group_ids
+                            )
                             await self.forward(
                                 client=client,
                                 message=message,
@@ -2281,7 +2439,11 @@ class TelegramRestrictedMediaDownloader(Bot):
         ] = None,  # 不为None时,将通过大小比对判断是否为完整文件。
         telegram_progress_task_id: Optional[str] = None,  # Telegram 进度任务 ID
         telegram_chat_id: Optional[int] = None,  # Telegram 聊天 ID
+        segments: Optional[int] = None,  # 分段数,为None时使用配置文件中的设置。
+        client: Optional[pyrogram.Client] = None,  # 下载使用的账号,为None时使用主账号。
+        save_directory: Optional[str] = None,  # 保存路径,与缓存文件不在同一设备时完成后先在线程中移到该设备上。
     ) -> str:
+        client: pyrogram.Client = client or self.app.client
         temp_path = f"{file_name}.temp"
         if os.path.exists(file_name) and compare_size:
             local_file_size: int = get_file_size(file_path=file_name)
@@ -2291,7 +2453,7 @@ class TelegramRestrictedMediaDownloader(Bot):
                     f'{_t(KeyWord.RESUME)}:"{file_name}",'
                     f"{_t(KeyWord.STATUS)}:{_t(KeyWord.ALREADY_EXIST)}"
                 )
-                return file_name
+                return await self.__relocate(file_name, save_directory)
             else:
                 result: str = safe_replace(
                     origin_file=file_name, overwrite_file=temp_path
@@ -2301,82 +2463,344 @@ class TelegramRestrictedMediaDownloader(Bot):
                     f'不完整的文件"{file_name}",'
                     f"更改文件名作为缓存:[{file_name}]({get_file_size(file_name)}) -> [{temp_path}]({compare_size})。"
                 )
-        if os.path.exists(temp_path) and compare_size:
+        if (
+            os.path.exists(temp_path)
+            and compare_size
+            and not ChunkManifest.exists(temp_path)  # 有块清单的缓存文件由清单判断是否完整。
+        ):
+            # 没有块清单时无法区分下载完成的缓存文件与预分配后未写入(全部为0)的缓存文件,
+            # 不小于文件大小的缓存文件不再视为完整,清除后重新下载。
             local_file_size: int = get_file_size(file_path=temp_path)
-            if compare_file_size(a_size=local_file_size, b_size=compare_size):
-                console.log(
-                    f"{_t(KeyWord.DOWNLOAD_TASK)}"
-                    f'{_t(KeyWord.RESUME)}:"{temp_path}",'
-                    f"{_t(KeyWord.STATUS)}:{_t(KeyWord.ALREADY_EXIST)}"
-                )
-                result: str = safe_replace(
-                    origin_file=temp_path, overwrite_file=file_name
-                ).get("e_code")
-                log.warning(result) if result is not None else None
-                return file_name
-            elif local_file_size > compare_size:
+            if local_file_size >= compare_size:
                 safe_delete(temp_path)
                 log.warning(
-                    f'错误的缓存文件"{temp_path}",'
-                    f"已清除({_t(KeyWord.ERROR_SIZE)}:{local_file_size} > {_t(KeyWord.ACTUAL_SIZE)}:{compare_size})。"
-                )
-        downloaded = (
-            os.path.getsize(temp_path) if os.path.exists(temp_path) else 0
-        )  # 获取已下载的字节数。
-        if downloaded == 0:
-            mode = "wb"
-        else:
-            mode = "ab"
-            console.log(
-                f"{_t(KeyWord.DOWNLOAD_TASK)}"
-                f'{_t(KeyWord.RESUME)}:"{file_name}",'
-                f"{_t(KeyWord.ERROR_SIZE)}:{MetaData.suitable_units_display(downloaded)}。"
+                    f'无法确认是否完整的缓存文件"{temp_path}",'
+                    f"已清除(没有块清单,{_t(KeyWord.ERROR_SIZE)}:{local_file_size},{_t(KeyWord.ACTUAL_SIZE)}:{compare_size})。"
+                )
+        async def _report(_downloaded: int) -> None:
+            # 更新终端进度条
+            progress(_downloaded, *progress_args)
+            # 更新 Telegram 进度（如果启用）
+            if telegram_progress_task_id and telegram_chat_id:
+                tracker = self._get_progress_tracker(telegram_chat_id)
+                if tracker and compare_size:
+                    # 从文件名中提取显示名称
+                    display_name = os.path.basename(file_name)
+                    await tracker.update_progress(
+                        telegram_progress_task_id,
+                        display_name,
+                        _downloaded,
+                        compare_size,
+                    )
+
+        hasher: Optional[StreamHasher] = (
+            StreamHasher(self.hash_algorithm) if self.hash_algorithm else None
+        )
+        segments: int = segments if segments else self.app.segment_count
+        if compare_size:
+            # 已知文件大小时均按块写入并记录块清单,未达到分段下载条件时只使用一个分段。
+            downloaded: int = await self.__segmented_download(
+                client=client,
+                message=message,
+                temp_path=temp_path,
+                file_size=compare_size,
+                segments=(
+                    segments
+                    if segments > 1 and compare_size >= self.app.segment_min_size
+                    else 1
+                ),
+                chunk_size=chunk_size,
+                report=_report,
+                hasher=hasher,
             )
-        with open(file=temp_path, mode=mode) as f:
+        else:
+            downloaded = (
+                os.path.getsize(temp_path) if os.path.exists(temp_path) else 0
+            )  # 获取已下载的字节数。
+            if downloaded == 0:
+                mode = "wb"
+            else:
+                mode = "ab"
+                console.log(
+                    f"{_t(KeyWord.DOWNLOAD_TASK)}"
+                    f'{_t(KeyWord.RESUME)}:"{file_name}",'
+                    f"{_t(KeyWord.ERROR_SIZE)}:{MetaData.suitable_units_display(downloaded)}。"
+                )
             skip_chunks: int = downloaded // chunk_size  # 计算要跳过的块数。
-            async for chunk in self.app.client.stream_media(
-                message=message, offset=skip_chunks
-            ):
-                f.write(chunk)
-                downloaded += len(chunk)
-                # 更新终端进度条
-                progress(downloaded, *progress_args)
-                # 更新 Telegram 进度（如果启用）
-                if telegram_progress_task_id and telegram_chat_id:
-                    tracker = self._get_progress_tracker(telegram_chat_id)
-                    if tracker and compare_size:
-                        # 从文件名中提取显示名称
-                        display_name = os.path.basename(file_name)
-                        await tracker.update_progress(
-                            telegram_progress_task_id,
-                            display_name,
-                            downloaded,
-                            compare_size,
-                        )
+            downloaded = skip_chunks * chunk_size  # 不完整的最后一块将被重新下载并覆盖。
+            async with self.__open_writer(
+                path=temp_path, truncate=mode == "wb", hasher=hasher
+            ) as writer:
+                media = next(
+                    (getattr(message, _) for _ in DownloadType() if getattr(message, _, None)),
+                    None,
+                )
+                file_size: int = getattr(media, "file_size", 0) or 0
+                async for chunk in self.__stream_media(
+                    client=client,
+                    message=message,
+                    offset=skip_chunks,
+                    total_chunks=(
+                        get_total_chunks(file_size=file_size, chunk_size=chunk_size)
+                        if file_size
+                        else None
+                    ),
+                ):
+                    await writer.write(offset=downloaded, data=chunk)
+                    downloaded += len(chunk)
+                    await _report(downloaded)
         if compare_size is None or compare_file_size(
             a_size=downloaded, b_size=compare_size
         ):
+            if hasher:
+                # 在线程中补读分段下载或续传时未连续计算的部分。
+                self.file_digests[file_name] = await self.loop.run_in_executor(
+                    None, hasher.finish, temp_path, downloaded
+                )
             result: str = safe_replace(
                 origin_file=temp_path, overwrite_file=file_name
             ).get("e_code")
             log.warning(result) if result is not None else None
+            if result is None:
+                ChunkManifest.remove(temp_path)
             log.info(
                 f'"{temp_path}"下载完成,更改文件名:[{temp_path}]({get_file_size(temp_path)}) -> [{file_name}]({compare_size})'
             )
-        return file_name
+        return await self.__relocate(file_name, save_directory)
+
+    async def __relocate(self, file_name: str, save_directory: Optional[str]) -> str:
+        """已完成的文件与保存路径不在同一设备时,在线程中复制到该设备的缓存目录,使移动到保存路径只需重命名。"""
+        if (
+            not save_directory
+            or not os.path.isfile(file_name)
+            or not self.volumes.is_cross_device(file_name, save_directory)
+        ):
+            return file_name
+        target: str = os.path.join(
+            self.volumes.get_staging_directory(save_directory),
+            os.path.basename(file_name),
+        )
+        step: list = [0]
+
+        def _progress(copied: int, total: int) -> None:
+            percent: int = copied * 100 // total if total else 100
+            if percent >= step[0] + 25:
+                step[0] = percent
+                log.info(
+                    f'正在跨设备移动"{file_name}":{percent}%'
+                    f"({MetaData.suitable_units_display(copied)}/{MetaData.suitable_units_display(total)})。"
+                )
+
+        async with self.relocate_semaphore:  # 限制同时复制的文件数,避免多个大文件同时占满磁盘带宽。
+            try:
+                start: float = time.monotonic()
+                await self.loop.run_in_executor(
+                    None, VolumeMap.move, file_name, target, _progress
+                )
+                log.info(
+                    f'"{file_name}"已跨设备移动到"{target}",'
+                    f"耗时{time.monotonic() - start:.1f}s。"
+                )
+                return target
+            except Exception as e:
+                log.warning(
+                    f'跨设备移动"{file_name}"失败,将在完成后直接移动,{_t(KeyWord.REASON)}:"{e}"'
+                )
+                return file_name
+
+    async def __stream_media(
+        self,
+        client: pyrogram.Client,
+        message: pyrogram.types.Message,
+        offset: int = 0,
+        limit: int = 0,
+        total_chunks: Optional[int] = None,
+    ):
+        """按块流式下载,文件引用过期时只重新获取该条消息,并从当前块继续下载。
+        stream_media内部的get_file遇到大部分错误(包括文件引用过期)时只记录日志并停止产生块,不会抛出异常,
+        因此块数少于预期(offset+limit或total_chunks)时同样视为需要重新获取消息。
+        """
+        index: int = offset
+        end: Union[int, None] = offset + limit if limit else total_chunks
+        refresh_count: int = 0
+        while True:
+            remaining: int = limit - (index - offset) if limit else 0
+            reason: Union[BaseException, str, None] = None
+            try:
+                async for chunk in client.stream_media(
+                    message=message, offset=index, limit=remaining
+                ):
+                    yield chunk
+                    index += 1
+                if end is None or index >= end:
+                    return
+                reason = f"只获取到第{index}块,预期到第{end}块"
+            except (FileReferenceExpired, FileReferenceInvalid) as e:
+                reason = e
+            if refresh_count >= self.FILE_REFERENCE_MAX_REFRESH:
+                if isinstance(reason, BaseException):
+                    raise reason
+                raise ConnectionError(f"下载提前结束,{reason}。")
+            refresh_count += 1
+            self.file_reference_refresh_count += 1
+            log.info(
+                f'"{getattr(message, "link", None) or message.id}"的文件引用可能已过期,'
+                f'重新获取消息后从第{index}块继续下载,{_t(KeyWord.REASON)}:"{reason}"'
+            )
+            _message = await client.get_messages(
+                chat_id=message.chat.id, message_ids=message.id
+            )
+            if not _message or getattr(_message, "empty", False):
+                if isinstance(reason, BaseException):
+                    raise reason
+                raise ConnectionError(f"下载提前结束且无法重新获取消息,{reason}。")
+            message = _message
+            # 重试时使用重新获取的消息,不再使用文件引用已过期的消息。
+            self.refreshed_messages[(message.chat.id, message.id)] = message
+
+    def __open_writer(
+        self,
+        path: str,
+        truncate: bool = False,
+        on_written: Optional[Callable[[int, int, int], None]] = None,
+        hasher: Optional[StreamHasher] = None,
+    ) -> FileWriter:
+        """创建在线程池中写入缓存文件的写入器,避免磁盘写入阻塞事件循环。"""
+        return FileWriter(
+            path=path,
+            truncate=truncate,
+            queue_size=self.app.writer_queue_size,
+            coalesce_size=self.app.writer_coalesce_size,
+            fsync=self.app.writer_fsync,
+            on_written=on_written,
+            hasher=hasher,
+        )
+
+    async def __segmented_download(
+        self,
+        client: pyrogram.Client,
+        message: Union[pyrogram.types.Message, str],
+        temp_path: str,
+        file_size: int,
+        segments: int,
+        chunk_size: int,
+        report: Callable,
+        hasher: Optional[StreamHasher] = None,
+    ) -> int:
+        """将文件拆分为多个块区间并发下载,每个块写入缓存文件中对应的偏移位置。
+        块写入完成后记录到块清单,续传前只校验清单中每个已下载区间末尾的块,并将缓存文件截断到最后一个已完成块的末尾。
+        """
+        total_chunks: int = get_total_chunks(file_size=file_size, chunk_size=chunk_size)
+        legacy: bool = not ChunkManifest.exists(temp_path)
+        manifest = ChunkManifest(temp_path=temp_path, total_chunks=total_chunks)
+        try:
+            if manifest.is_new and os.path.exists(temp_path):
+                if legacy and get_file_size(temp_path) < file_size:
+                    # 没有块清单且小于文件大小的旧缓存文件(按顺序写入,不会被预分配):
+                    # 已下载的完整块直接接管,最后一个完整块可能未落盘,与不完整的部分一起重新下载。
+                    for i in range(min(get_file_size(temp_path) // chunk_size - 1, total_chunks)):
+                        manifest.mark(index=i, offset=i * chunk_size, length=chunk_size)
+                    manifest.flush()
+                else:
+                    # 块清单损坏或缺失时缓存文件可能已被预分配,无法判断哪些块已下载,重新下载。
+                    os.truncate(temp_path, 0)
+            if os.path.exists(temp_path):
+                invalid: list = await self.loop.run_in_executor(
+                    None, manifest.verify, temp_path
+                )
+                if invalid:
+                    log.warning(
+                        f'缓存文件"{temp_path}"中有{len(invalid)}个块校验失败,将重新下载,'
+                        f"块序号:{invalid}。"
+                    )
+            downloaded: int = sum(
+                get_chunk_length(index=i, file_size=file_size, chunk_size=chunk_size)
+                for i in range(total_chunks)
+                if manifest.is_done(i)
+            )
+            if downloaded:
+                console.log(
+                    f"{_t(KeyWord.DOWNLOAD_TASK)}"
+                    f'{_t(KeyWord.RESUME)}:"{temp_path}",'
+                    f"{_t(KeyWord.ERROR_SIZE)}:{MetaData.suitable_units_display(downloaded)}。"
+                )
+            if self.app.disk_preallocate and not manifest.is_complete():
+                await self.loop.run_in_executor(
+                    None, DiskGuard.preallocate, temp_path, file_size
+                )
+            ranges: list = split_segments(missing=manifest.missing(), segments=segments)
+            semaphore = asyncio.Semaphore(segments)
+            async with self.__open_writer(
+                path=temp_path,
+                on_written=lambda offset, length, crc: manifest.mark(
+                    index=offset // chunk_size, offset=offset, length=length, crc=crc
+                ),
+                hasher=hasher,
+            ) as writer:
+
+                async def _fetch(start: int, count: int) -> None:
+                    nonlocal downloaded
+                    async with semaphore:
+                        index: int = start
+                        async for chunk in self.__stream_media(
+                            client=client, message=message, offset=start, limit=count
+                        ):
+                            await writer.write(offset=index * chunk_size, data=chunk)
+                            index += 1
+                            downloaded += len(chunk)
+                            await report(downloaded)
+
+                results: list = await asyncio.gather(
+                    *(_fetch(start, count) for start, count in ranges),
+                    return_exceptions=True,
+                )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            return downloaded
+        finally:
+            manifest.close()  # 完整的块清单在缓存文件改名后才删除,改名前中断时由清单确认缓存文件已完整。
+
+    @staticmethod
+    def get_downloaded_bytes(
+        temp_file_path: str, file_size: int, chunk_size: int = 1024 * 1024
+    ) -> int:
+        """由块清单统计缓存文件中已下载的字节数。
+        没有块清单时只有小于文件大小的旧缓存文件按文件大小计算,与文件大小相同的缓存文件可能是预分配后未写入的文件。
+        """
+        temp_path: str = f"{temp_file_path}.temp"
+        done: Union[int, None] = ChunkManifest.get_done_bytes(
+            temp_path, get_total_chunks(file_size=file_size, chunk_size=chunk_size)
+        )
+        if done is not None:
+            return done
+        size: int = get_file_size(temp_file_path)
+        return size if size < file_size else 0
 
     def get_media_meta(
         self, message: pyrogram.types.Message, dtype
     ) -> Dict[str, Union[int, str]]:
-        """获取媒体元数据。"""
+        """获取媒体元数据,同一消息在任务期间(含重试)只计算一次,保证缓存路径与文件名不变。"""
+        env_save_directory: str = self.env_save_directory(message)
+        key = self.get_media_key(message)
+        descriptor: Union[dict, None] = self.media_descriptors.get(key) if key else None
+        if descriptor is not None and dtype in descriptor.get("meta"):
+            return dict(descriptor.get("meta").get(dtype))
         file_id: int = getattr(message, "id")
         temp_file_path: str = self.app.get_temp_file_path(message, dtype)
+        temp_directory: str = self.volumes.get_temp_directory(env_save_directory)
+        if temp_directory != self.app.temp_directory and not os.path.exists(
+            f"{temp_file_path}.temp"
+        ):  # 已在默认缓存目录中下载了一部分的文件继续在原处下载。
+            temp_file_path = self.app.get_temp_file_path(
+                message, dtype, temp_directory=temp_directory
+            )
         _sever_meta = getattr(message, dtype)
         sever_file_size: int = getattr(_sever_meta, "file_size")
         file_name: str = split_path(temp_file_path).get("file_name")
-        save_directory: str = os.path.join(self.env_save_directory(message), file_name)
+        save_directory: str = os.path.join(env_save_directory, file_name)
         format_file_size: str = MetaData.suitable_units_display(sever_file_size)
-        return {
+        meta: Dict[str, Union[int, str]] = {
             "file_id": file_id,
             "temp_file_path": temp_file_path,
             "sever_file_size": sever_file_size,
@@ -2384,6 +2808,9 @@ class TelegramRestrictedMediaDownloader(Bot):
             "save_directory": save_directory,
             "format_file_size": format_file_size,
         }
+        if descriptor is not None:
+            descriptor.get("meta")[dtype] = meta
+        return dict(meta)
 
     async def __add_task(
         self,
@@ -2395,6 +2822,8 @@ class TelegramRestrictedMediaDownloader(Bot):
         with_upload: Union[dict, None] = None,
         diy_download_type: Optional[list] = None,
         telegram_chat_id: Optional[int] = None,
+        segments: Optional[int] = None,
+        source: str = TaskSource.LINKS,
     ) -> None:
         retry_count = retry.get("count")
         retry_id = retry.get("id")
@@ -2411,6 +2840,8 @@ class TelegramRestrictedMediaDownloader(Bot):
                             with_upload,
                             diy_download_type,
                             telegram_chat_id=telegram_chat_id,
+                            segments=segments,
+                            source=source,
                         )
                         break
                 else:
@@ -2423,6 +2854,8 @@ class TelegramRestrictedMediaDownloader(Bot):
                         with_upload,
                         diy_download_type,
                         telegram_chat_id=telegram_chat_id,
+                        segments=segments,
+                        source=source,
                     )
         else:
             _task = None
@@ -2440,16 +2873,13 @@ class TelegramRestrictedMediaDownloader(Bot):
                     f'{_t(KeyWord.LINK)}:"{link}",'  # 链接。
                     f"{_t(KeyWord.LINK_TYPE)}:{_t(link_type)}。"  # 链接类型。
                 )
-                while (
-                    self.app.current_task_num >= self.app.max_download_task
-                ):  # v1.0.7 增加下载任务数限制。
-                    await self.event.wait()
-                    self.event.clear()
                 # 在获取元数据前建立消息与标签的映射
                 try:
                     _chat_id = getattr(getattr(message, "chat", None), "id", None)
                     _mid = getattr(message, "id", None)
-                    _tag = self.link_tag_map.get(link)
+                    _tag = self.link_tag_map.get(link) or DownloadTask.get_pending_tag(
+                        link
+                    )
                     if not _tag and _chat_id is not None:
                         _tag = self.listen_download_tag_by_chatid.get(_chat_id)
                     if _tag and _chat_id is not None and _mid is not None:
@@ -2465,9 +2895,26 @@ class TelegramRestrictedMediaDownloader(Bot):
                     format_file_size,
                 ) = self.get_media_meta(message=message, dtype=valid_dtype).values()
                 retry["id"] = file_id
-                if is_file_duplicate(
+                if not retry_count:
+                    # 恢复的任务沿用该文件上次运行时已用掉的重试次数,同组的其他文件不受影响。
+                    retry_count = self.restored_retries.pop(
+                        (link, message.id), {}
+                    ).get("count", 0)
+                is_duplicate: bool = is_file_duplicate(
                     save_directory=save_directory, sever_file_size=sever_file_size
-                ):  # 检测是否存在。
+                )  # 检测是否存在。
+                if is_duplicate:
+                    # 已存在的文件只在内容索引中没有记录时才记录,记录需要访问文件系统,在线程池中进行。
+                    if not self.content_index.is_recorded(message):
+                        await self.loop.run_in_executor(
+                            None, self.content_index.record, message, save_directory
+                        )
+                else:
+                    # 其他频道或链接中已下载过相同的文件时,由本地文件得到,无需下载。
+                    is_duplicate = await self.loop.run_in_executor(
+                        None, self.content_index.restore, message, save_directory
+                    )
+                if is_duplicate:
                     self.download_complete_callback(
                         sever_file_size=sever_file_size,
                         temp_file_path=temp_file_path,
@@ -2483,49 +2930,101 @@ class TelegramRestrictedMediaDownloader(Bot):
                         _future=save_directory,
                     )
                 else:
-                    # 准备 Telegram 进度追踪
-                    telegram_task_id = None
-                    target_chat_id = telegram_chat_id
+                    # 创建下载任务前出错(包括被取消)时释放预留的磁盘空间与下载名额,否则将永远不会被释放。
+                    slot_acquired: bool = False
+                    reserved: bool = False
+                    task_id = None
                     try:
-                        if not target_chat_id and isinstance(message, pyrogram.types.Message):
-                            from_user = getattr(message, 'from_user', None)
-                            if from_user:
-                                target_chat_id = getattr(from_user, 'id', None)
+                        # v1.0.7 增加下载任务数限制,名额在download_complete_callback中释放。
+                        await self.scheduler.acquire(source=source)
+                        slot_acquired = True
+                        # 取得下载名额后再按尚未写入的字节数(由块清单得到,预分配的缓存文件大小不代表已下载)
+                        # 预留缓存目录所在磁盘的空间,排队中的任务不占用预留,空间不足时等待,在download_complete_callback中释放。
+                        downloaded: int = self.get_downloaded_bytes(
+                            temp_file_path=temp_file_path, file_size=sever_file_size
+                        )
+                        await self.disk.reserve(
+                            path=f"{temp_file_path}.temp",
+                            size=DiskGuard.get_required(
+                                path=f"{temp_file_path}.temp",
+                                size=sever_file_size,
+                                written=downloaded,
+                            ),
+                        )
+                        reserved = True
+                        # 准备 Telegram 进度追踪
+                        telegram_task_id = None
+                        target_chat_id = telegram_chat_id
+                        try:
+                            if not target_chat_id and isinstance(message, pyrogram.types.Message):
+                                from_user = getattr(message, 'from_user', None)
+                                if from_user:
+                                    target_chat_id = getattr(from_user, 'id', None)
                         
-                        if target_chat_id:
-                            tracker = self._get_progress_tracker(target_chat_id)
-                            if tracker:
-                                telegram_task_id = f"{file_id}_{int(time.time())}"
-                                await tracker.create_progress_message(
-                                    telegram_task_id, file_name
-                                )
-                    except Exception as e:
-                        log.debug(f"创建 Telegram 进度消息失败: {e}")
+                            if target_chat_id:
+                                tracker = self._get_progress_tracker(target_chat_id)
+                                if tracker:
+                                    telegram_task_id = f"{file_id}_{int(time.time())}"
+                                    await tracker.create_progress_message(
+                                        telegram_task_id, file_name
+                                    )
+                        except Exception as e:
+                            log.debug(f"创建 Telegram 进度消息失败: {e}")
                     
-                    console.log(
-                        f"{_t(KeyWord.DOWNLOAD_TASK)}"
-                        f'{_t(KeyWord.FILE)}:"{file_name}",'
-                        f"{_t(KeyWord.SIZE)}:{format_file_size},"
-                        f"{_t(KeyWord.TYPE)}:{_t(self.app.get_file_type(message, file_name, DownloadStatus.DOWNLOADING))},"
-                        f"{_t(KeyWord.STATUS)}:{_t(DownloadStatus.DOWNLOADING)}。"
-                    )
-                    task_id = self.pb.progress.add_task(
-                        description="📥",
-                        filename=truncate_display_filename(file_name),
-                        info=f"0.00B/{format_file_size}",
-                        total=sever_file_size,
-                    )
-                    _task = self.loop.create_task(
-                        self.resume_download(
-                            message=message,
-                            file_name=temp_file_path,
-                            progress=self.pb.bar,
-                            progress_args=(sever_file_size, self.pb.progress, task_id),
-                            compare_size=sever_file_size,
-                            telegram_progress_task_id=telegram_task_id,
-                            telegram_chat_id=target_chat_id,
+                        console.log(
+                            f"{_t(KeyWord.DOWNLOAD_TASK)}"
+                            f'{_t(KeyWord.FILE)}:"{file_name}",'
+                            f"{_t(KeyWord.SIZE)}:{format_file_size},"
+                            f"{_t(KeyWord.TYPE)}:{_t(self.app.get_file_type(message, file_name, DownloadStatus.DOWNLOADING))},"
+                            f"{_t(KeyWord.STATUS)}:{_t(DownloadStatus.DOWNLOADING)}。"
                         )
-                    )
+                        DownloadTask.set_file(
+                            link,
+                            file_name,
+                            file_id=file_id,
+                            size=sever_file_size,
+                            downloaded=downloaded,
+                            status=DownloadStatus.DOWNLOADING,
+                        )
+                        DownloadTask.set_pending_temp(
+                            link, getattr(message, "id", None), temp_file_path
+                        )
+                        # 按频道访问权限、负载与文件所在DC选择下载账号。
+                        client, download_message = await self.pool.assign(
+                            chat_id=chat_id, message=message
+                        )
+                        task_id = self.pb.progress.add_task(
+                            description="📥",
+                            filename=truncate_display_filename(file_name),
+                            info=f"0.00B/{format_file_size}",
+                            total=sever_file_size,
+                        )
+                        _task = self.loop.create_task(
+                            self.resume_download(
+                                message=download_message,
+                                file_name=temp_file_path,
+                                progress=self.pb.bar,
+                                progress_args=(sever_file_size, self.pb.progress, task_id),
+                                compare_size=sever_file_size,
+                                telegram_progress_task_id=telegram_task_id,
+                                telegram_chat_id=target_chat_id,
+                                segments=segments,
+                                client=client,
+                                save_directory=self.env_save_directory(message),
+                            )
+                        )
+                        self.pool.acquire(client)
+                        _task.add_done_callback(
+                            partial(self.pool.release, client, chat_id, message.id)
+                        )
+                    except BaseException:
+                        if reserved:
+                            self.disk.release(f"{temp_file_path}.temp")
+                        if slot_acquired:
+                            self.scheduler.release()
+                        if task_id is not None:
+                            self.pb.progress.remove_task(task_id=task_id)
+                        raise
                     MetaData.print_current_task_num(
                         prompt=_t(KeyWord.CURRENT_DOWNLOAD_TASK),
                         num=self.app.current_task_num,
@@ -2546,6 +3045,7 @@ class TelegramRestrictedMediaDownloader(Bot):
                             diy_download_type,
                             telegram_task_id,
                             telegram_chat_id,
+                            segments,
                         )
                     )
             else:
@@ -2575,6 +3075,8 @@ class TelegramRestrictedMediaDownloader(Bot):
                         f'{_t(KeyWord.LINK)}:"{link}",'  # 链接。
                         f"{_t(KeyWord.LINK_TYPE)}:{_error}"  # 链接类型。
                     )
+                finally:
+                    self.forget_media(message)
             self.queue.put_nowait(_task) if _task else None
 
     def __check_download_finish(
@@ -2641,6 +3143,7 @@ class TelegramRestrictedMediaDownloader(Bot):
         _future,
         telegram_task_id=None,  # Telegram 进度任务 ID
         telegram_chat_id=None,  # Telegram 聊天 ID
+        segments=None,  # 单个文件的分段数,重试时沿用。
     ):
         if task_id is None:
             if retry_count == 0:
@@ -2663,17 +3166,31 @@ class TelegramRestrictedMediaDownloader(Bot):
                             self.env_save_directory(message), file_name
                         ),
                     )
+            self.forget_media(message)
         else:
             self.app.current_task_num -= 1
-            self.event.set()  # v1.3.4 修复重试下载被阻塞的问题。
+            self.scheduler.release()  # v1.3.4 修复重试下载被阻塞的问题。
+            self.disk.release(f"{temp_file_path}.temp")
+            if self.tuner and not _future.cancelled():
+                error = _future.exception()
+                if isinstance(error, (FloodWait, TimeoutError, asyncio.TimeoutError)):
+                    self.tuner.on_congestion(reason=type(error).__name__)
             self.queue.task_done()
+            finished_path: str = temp_file_path
+            if not _future.cancelled() and _future.exception() is None:
+                finished_path = _future.result() or temp_file_path  # 跨设备时文件已被移到保存路径所在设备。
             if self.__check_download_finish(
                 message=message,
                 sever_file_size=sever_file_size,
-                temp_file_path=temp_file_path,
+                temp_file_path=finished_path,
                 save_directory=self.env_save_directory(message),
                 with_move=True,
             ):
+                save_path: str = os.path.join(self.env_save_directory(message), file_name)
+                self.content_index.record(message=message, path=save_path)
+                self.__record_digest(
+                    message=message, temp_file_path=temp_file_path, save_path=save_path
+                )
                 # 更新 Telegram 进度为完成
                 if telegram_task_id and telegram_chat_id:
                     tracker = self._get_progress_tracker(telegram_chat_id)
@@ -2692,16 +3209,35 @@ class TelegramRestrictedMediaDownloader(Bot):
                             self.env_save_directory(message), file_name
                         ),
                     )
+                self.forget_media(message)
             else:
-                if retry_count < self.app.max_download_retries:
+                DownloadTask.set_file(
+                    link,
+                    file_name,
+                    downloaded=get_file_size(temp_file_path),
+                    status=DownloadStatus.RETRY,
+                )
+                error = None if _future.cancelled() else _future.exception()
+                reason: str = self.get_retry_reason(error)
+                if (
+                    retry_count < self.app.max_download_retries
+                    and reason != RetryReason.PERMANENT
+                ):
                     retry_count += 1
-                    task = self.loop.create_task(
-                        self.create_download_task(
-                            message_ids=link if isinstance(link, str) else message,
-                            retry={"id": file_id, "count": retry_count},
-                            with_upload=with_upload,
-                            diy_download_type=diy_download_type,
-                        )
+                    delay: float = self.get_retry_delay(
+                        error=error, reason=reason, retry_count=retry_count
+                    )
+                    task = self.submit_retry_task(
+                        link=link,
+                        message=self.refreshed_messages.pop(
+                            self.get_media_key(message), message
+                        ),
+                        retry={"id": file_id, "count": retry_count},
+                        with_upload=with_upload,
+                        diy_download_type=diy_download_type,
+                        telegram_chat_id=telegram_chat_id,
+                        segments=segments,
+                        delay=delay,
                     )
                     task.add_done_callback(
                         partial(
@@ -2710,6 +3246,10 @@ class TelegramRestrictedMediaDownloader(Bot):
                             f"{_t(KeyWord.RETRY_TIMES)}:{retry_count}/{self.app.max_download_retries}。",
                         )
                     )
+                    log.info(
+                        f'"{file_name}"将在{delay:.1f}秒后重新下载,'
+                        f"{_t(KeyWord.REASON)}:{reason}({type(error).__name__ if error else '大小不一致'})。"
+                    )
                 else:
                     # 更新 Telegram 进度为失败
                     if telegram_task_id and telegram_chat_id:
@@ -2718,7 +3258,11 @@ class TelegramRestrictedMediaDownloader(Bot):
                             asyncio.create_task(
                                 tracker.complete_progress(telegram_task_id, file_name, success=False)
                             )
-                    _error = f"(达到最大重试次数:{self.app.max_download_retries}次)。"
+                    _error = (
+                        f"(达到最大重试次数:{self.app.max_download_retries}次)。"
+                        if reason != RetryReason.PERMANENT
+                        else f'(无法重试的错误:"{error}")。'
+                    )
                     console.log(
                         f"{_t(KeyWord.DOWNLOAD_TASK)}"
                         f'{_t(KeyWord.FILE)}:"{file_name}",'
@@ -2730,11 +3274,113 @@ class TelegramRestrictedMediaDownloader(Bot):
                     DownloadTask.set_error(
                         link=link, key=file_name, value=_error.replace("。", "")
                     )
+                    DownloadTask.remove_pending(link)
+                    DownloadTask.LINK_INFO.finish(link)
                     self.bot_task_link.discard(link)
+                    self.forget_media(message)
                 link, file_name = None, None
             self.pb.progress.remove_task(task_id=task_id)
         return link, file_name
 
+    def __record_digest(
+        self, message: pyrogram.types.Message, temp_file_path: str, save_path: str
+    ) -> None:
+        """将下载时计算的摘要记录到任务日志,并按配置写入摘要文件。"""
+        digest: Union[str, None] = self.file_digests.pop(temp_file_path, None)
+        if digest is None:
+            return None
+        key = ContentIndex.get_key(message)
+        DownloadTask.JOURNAL.set_digest(
+            path=os.path.abspath(save_path),
+            algorithm=self.hash_algorithm,
+            digest=digest,
+            size=key[1] if key else get_file_size(save_path),
+            file_unique_id=key[0] if key else None,
+        )
+        if self.app.hash_sidecar:
+            Integrity.write_sidecar(
+                path=save_path, algorithm=self.hash_algorithm, digest=digest
+            )
+
+    async def __verify_archive(self) -> None:
+        """在进程池中校验已下载的文件,不阻塞下载。"""
+        try:
+            await self.loop.run_in_executor(
+                None, Integrity.verify, DownloadTask.JOURNAL
+            )
+        except Exception as e:
+            log.error(f'校验已下载的文件失败,{_t(KeyWord.REASON)}:"{e}"')
+
+    @staticmethod
+    def get_retry_reason(error: Union[BaseException, None]) -> str:
+        """将下载失败的原因分为网络错误、FloodWait与无法重试的错误。"""
+        if isinstance(error, FloodWait):
+            return RetryReason.FLOOD_WAIT
+        if isinstance(error, (FileReferenceExpired, FileReferenceInvalid)):
+            return RetryReason.NETWORK
+        if isinstance(error, (BadRequest, Forbidden, NotAcceptable, Unauthorized)):
+            return RetryReason.PERMANENT
+        return RetryReason.NETWORK
+
+    def get_retry_delay(
+        self, error: Union[BaseException, None], reason: str, retry_count: int
+    ) -> float:
+        """计算重试前的等待时间,网络错误按指数退避并加入随机抖动,避免多个文件同时重试。"""
+        if reason == RetryReason.FLOOD_WAIT:
+            value: float = float(getattr(error, "value", 0) or 0)
+            return value + random.uniform(0, 1 + value * 0.1)
+        delay: float = min(
+            self.RETRY_BASE_DELAY * 2 ** (retry_count - 1), self.RETRY_MAX_DELAY
+        )
+        return delay * random.uniform(0.5, 1.5)
+
+    def submit_retry_task(
+        self,
+        link: str,
+        message: pyrogram.types.Message,
+        retry: dict,
+        with_upload: Union[dict, None] = None,
+        diy_download_type: Optional[list] = None,
+        telegram_chat_id: Optional[int] = None,
+        segments: Optional[int] = None,
+        delay: float = 0,
+    ) -> asyncio.Future:
+        """使用已获取的消息重新提交下载失败的文件,不再重新解析整个链接或媒体组。"""
+        chat_id = message.chat.id
+        link_type: str = DownloadTask.get(link, "link_type") or LinkType.SINGLE
+
+        async def _retry() -> dict:
+            await self.__add_task(
+                chat_id,
+                link_type,
+                link,
+                message,
+                retry,
+                with_upload,
+                diy_download_type,
+                telegram_chat_id=telegram_chat_id,
+                segments=segments,
+                source=TaskSource.RETRY,
+            )
+            return {
+                "chat_id": chat_id,
+                "member_num": DownloadTask.get(link, "member_num"),
+                "link_type": link_type,
+                "status": DownloadStatus.DOWNLOADING,
+                "e_code": None,
+            }
+
+        # 重试次数与等待时间按文件写入任务日志,进程意外退出后恢复的任务中该文件沿用已用掉的重试次数。
+        try:
+            DownloadTask.set_pending_retry(
+                link, message.id, {**retry, "delay": delay, "time": time.time()}
+            )
+        except Exception as e:
+            log.warning(f'记录重试状态失败,{_t(KeyWord.REASON)}:"{e}"')
+        return self.scheduler.submit(
+            _retry, source=TaskSource.RETRY, priority=retry.get("count", 0), delay=delay
+        )
+
     async def download_chat(self, chat_id: str):
         _filter = Filter()
         download_chat_filter: Union[dict, None] = None
@@ -2751,22 +3397,93 @@ class TelegramRestrictedMediaDownloader(Bot):
         end_date = date_filter.get("end_date")
         download_type: dict = download_chat_filter.get("download_type")
         keywords: list = download_chat_filter.get("keywords", [])
-        links: list = []
-        media_group_ids: set = set()
+        # 将日期范围转换为消息ID范围,由服务器过滤,避免从第一条消息开始遍历整个频道。
+        min_id: int = 0
+        max_id: int = 0
+        try:
+            if start_date:
+                min_id = await self.app.client.get_message_id_by_date(
+                    chat_id=chat_id,
+                    date=datetime.datetime.fromtimestamp(start_date),
+                )
+            if end_date:
+                max_id = await self.app.client.get_message_id_by_date(
+                    chat_id=chat_id,
+                    date=datetime.datetime.fromtimestamp(end_date + 1),
+                )
+                if max_id == 0:
+                    log.info(f'"{chat_id}"在结束日期之前没有消息。')
+                    return None
+        except Exception as e:
+            min_id, max_id = 0, 0
+            log.warning(
+                f'"{chat_id}"无法按日期定位消息,将遍历全部消息,{_t(KeyWord.REASON)}:"{e}"'
+            )
+        # 增量扫描:相同过滤条件下只获取上次已扫描的最大消息ID之后的新消息。
+        incremental: bool = self.app.download_chat_incremental
+        filter_hash: str = hashlib.md5(
+            json.dumps(
+                {
+                    "download_type": download_type,
+                    "keywords": keywords,
+                    "start_date": start_date,
+                },
+                sort_keys=True,
+                ensure_ascii=False,
+                default=str,
+            ).encode("UTF-8")
+        ).hexdigest()
+        sync_mark: int = 0
+        if incremental:
+            sync_mark = DownloadTask.get_sync_mark(chat_id, filter_hash)
+            if sync_mark:
+                if max_id and sync_mark >= max_id:
+                    log.info(f'"{chat_id}"在所选范围内没有新消息。')
+                    return None
+                if sync_mark > min_id:
+                    min_id = sync_mark
+                log.info(f'"{chat_id}"将从消息ID:{sync_mark}之后开始增量扫描。')
+        scanned_id: int = sync_mark
+        saved_id: int = sync_mark
+        media_group_ids: RetainedSet = RetainedSet(self.app.retention_max_records)
+        submit_count: int = 0
+
+        def _submit(link: Union[str, pyrogram.types.Message], single_link: bool):
+            # 边扫描边提交,第一个匹配的消息即可开始下载。
+            nonlocal submit_count
+            submit_count += 1
+            self.submit_download_task(
+                source=TaskSource.DOWNLOAD_CHAT,
+                message_ids=link,
+                single_link=single_link,
+                diy_download_type=[_ for _ in DownloadType()],
+            )
+
         async for message in self.app.client.get_chat_history(
-            chat_id=chat_id, reverse=True
+            chat_id=chat_id,
+            reverse=True,
+            min_id=min_id,
+            max_id=max_id,
+            offset_id=min_id + 1 if min_id else 0,
         ):
+            if end_date and datetime.datetime.timestamp(message.date) > end_date:
+                break  # 按时间正序遍历,超过结束日期后的消息均不符合条件。
+            if incremental and scanned_id - saved_id >= 100:
+                # 已提交的任务都记录在任务日志中,定期推进扫描位置,中断后无需重新扫描。
+                DownloadTask.set_sync_mark(chat_id, filter_hash, scanned_id)
+                saved_id = scanned_id
+            scanned_id = max(scanned_id, message.id)
             media_group_id = getattr(message, "media_group_id", None)
             if media_group_id:
                 if media_group_id in media_group_ids:
                     continue
                 media_group_ids.add(media_group_id)
+                if not _filter.date_range(message, start_date, end_date):
+                    continue
                 try:
                     group_messages = await message.get_media_group()
                 except Exception:
                     group_messages = [message]
-                if not _filter.date_range(message, start_date, end_date):
-                    continue
                 if not any(_filter.dtype(m, download_type) for m in group_messages):
                     continue
                 if keywords and not any(
@@ -2774,25 +3491,142 @@ class TelegramRestrictedMediaDownloader(Bot):
                 ):
                     continue
                 if getattr(message, "link", None):
-                    links.append({"link": message.link, "single_link": False})
+                    _submit(link=message.link, single_link=False)
                 else:
-                    links.append({"link": message, "single_link": True})
+                    _submit(link=message, single_link=True)
                 continue
             if _filter.date_range(message, start_date, end_date) and _filter.dtype(
                 message, download_type
             ) and _filter.keywords(message, keywords):
-                links.append(
-                    {
-                        "link": message.link if message.link else message,
-                        "single_link": True,
-                    }
+                _submit(link=message.link if message.link else message, single_link=True)
+        if incremental and scanned_id > sync_mark:
+            DownloadTask.set_sync_mark(chat_id, filter_hash, scanned_id)
+        log.info(f'"{chat_id}"扫描完成,共提交{submit_count}个下载任务。')
+
+    def submit_download_task(
+        self, source: str, priority: int = 0, **kwargs
+    ) -> asyncio.Future:
+        """持久化并提交下载任务,参数与create_download_task一致。
+        任务在完成或确认失败前一直保存在任务日志中,进程意外退出后会在下次启动时恢复。
+        """
+        message_ids = kwargs.get("message_ids")
+        try:
+            if isinstance(message_ids, pyrogram.types.Message):
+                _chat_id = getattr(getattr(message_ids, "chat", None), "id", None)
+                tag = self.message_tag_map.get(
+                    (_chat_id, getattr(message_ids, "id", None))
+                ) or self.listen_download_tag_by_chatid.get(_chat_id)
+            else:
+                tag = self.link_tag_map.get(message_ids)
+            DownloadTask.add_pending(
+                message_ids=message_ids,
+                source=source,
+                retry=kwargs.get("retry"),
+                single_link=kwargs.get("single_link", False),
+                with_upload=kwargs.get("with_upload"),
+                diy_download_type=kwargs.get("diy_download_type"),
+                request_chat_id=kwargs.get("request_chat_id"),
+                tag=tag,
+            )
+        except Exception as e:
+            log.warning(f'记录未完成任务失败,{_t(KeyWord.REASON)}:"{e}"')
+        return self.scheduler.submit(
+            partial(self.create_download_task, source=source, **kwargs),
+            source=source,
+            priority=priority,
+        )
+
+    async def __restore_pending_tasks(self) -> set:
+        """恢复上次运行时未完成的任务,返回已恢复任务的规范化键。
+        按频道分组批量获取消息,未解析的链接批量解析,不再为每个任务单独请求。
+        """
+        restored: set = set()
+        items: list = []
+        chats: Dict[str, list] = {}  # chat_id:需要获取的消息id。
+        for item in DownloadTask.load_pending():
+            key: str = item.get("key")
+            attempts: int = item.get("attempts") or 0  # 只记录恢复失败的次数,被中断的任务不计。
+            if DownloadTask.is_complete(key):
+                DownloadTask.remove_pending(key)
+                continue
+            if attempts >= max(self.app.max_download_retries or 0, 1):
+                # 每次启动都无法恢复的任务不再恢复,避免反复解析,记录保留在任务日志中。
+                log.error(
+                    f'{_t(KeyWord.DOWNLOAD_TASK)}{_t(KeyWord.LINK)}:"{key}"已连续{attempts}次恢复失败,不再恢复,'
+                    f"重新提交该链接即可再次下载。"
                 )
-        for item in links:
-            await self.create_download_task(
-                message_ids=item.get("link"),
-                single_link=item.get("single_link", True),
-                diy_download_type=[_ for _ in DownloadType()],
+                DownloadTask.drop_pending(key)
+                continue
+            items.append(item)
+            if item.get("message_id") is not None and item.get("chat_id"):
+                chats.setdefault(item.get("chat_id"), []).append(int(item.get("message_id")))
+        messages: Dict[str, Union[dict, Exception]] = {}
+        for chat_id, message_ids in chats.items():
+            try:
+                _chat_id = int(chat_id) if chat_id.lstrip("-").isdigit() else chat_id
+                messages[chat_id] = await self.pool.resolve(
+                    lambda client: get_messages_by_ids(
+                        client=client, chat_id=_chat_id, message_ids=message_ids
+                    ),
+                    chat_id=_chat_id,
+                )
+            except Exception as e:
+                messages[chat_id] = e
+        resolved: dict = await self.__resolve_links(
+            {
+                item.get("link")
+                for item in items
+                if item.get("message_id") is None
+                and item.get("link")
+                and not item.get("single_link")
+            }
+        )
+        for item in items:
+            key: str = item.get("key")
+            message_ids = item.get("link")
+            if item.get("message_id") is not None:
+                chat_messages: Union[dict, Exception, None] = messages.get(item.get("chat_id"))
+                if isinstance(chat_messages, Exception):
+                    log.warning(
+                        f'恢复未完成任务"{key}"失败,{_t(KeyWord.REASON)}:"{chat_messages}"'
+                    )
+                    DownloadTask.add_pending_attempt(key)
+                    continue
+                message_ids = (chat_messages or {}).get(int(item.get("message_id")))
+                if not message_ids:
+                    DownloadTask.remove_pending(key)
+                    continue
+            if not message_ids:
+                DownloadTask.remove_pending(key)
+                continue
+            for message_id, retry in DownloadTask.load_pending_retries(key).items():
+                self.restored_retries[(key, message_id)] = retry
+            tag: Union[str, None] = item.get("tag")
+            source: str = item.get("source") or TaskSource.LINKS
+            if isinstance(message_ids, str):
+                if tag:
+                    self.link_tag_map[message_ids] = tag
+                if source == TaskSource.BOT:
+                    self.bot_task_link.add(message_ids)
+                    self.bot_task_link_canon.add(key)
+            elif tag:
+                self.message_tag_map[
+                    (getattr(message_ids.chat, "id", None), message_ids.id)
+                ] = tag
+            self.submit_download_task(
+                source=source,
+                message_ids=message_ids,
+                retry=None,  # 重试状态按文件记录,整个链接从头恢复,在添加各文件时沿用各自的重试次数。
+                single_link=bool(item.get("single_link")),
+                with_upload=item.get("with_upload"),
+                diy_download_type=item.get("diy_download_type"),
+                request_chat_id=item.get("request_chat_id"),
+                meta=resolved.get(message_ids) if isinstance(message_ids, str) else None,
             )
+            restored.add(key)
+        if restored:
+            console.log(f"已恢复{len(restored)}个上次未完成的下载任务。", style="#B1DB74")
+        return restored
 
     @DownloadTask.on_create_task
     async def create_download_task(
@@ -2803,6 +3637,9 @@ class TelegramRestrictedMediaDownloader(Bot):
         with_upload: Union[dict, None] = None,
         diy_download_type: Optional[list] = None,
         request_chat_id: Optional[int] = None,  # 用户请求聊天的 ID (用于进度通知)
+        segments: Optional[int] = None,  # 单个文件的分段数,为None时使用配置文件中的设置。
+        source: str = TaskSource.LINKS,  # 任务来源,用于调度器在各来源间公平分配下载名额。
+        meta: Optional[dict] = None,  # 已批量解析的结果,为None时逐条解析链接。
     ) -> dict:
         retry = retry if retry else {"id": -1, "count": 0}
         diy_download_type = (
@@ -2819,9 +3656,14 @@ class TelegramRestrictedMediaDownloader(Bot):
                 }
                 link = canonical_link_message(message_ids)
             else:
-                meta: dict = await get_message_by_link(
-                    client=self.app.client, link=message_ids, single_link=single_link
-                )
+                if meta is None:
+                    # 当前账号无法访问该频道时,由会话池中其他账号解析。
+                    meta: dict = await self.pool.resolve(
+                        lambda client: get_message_by_link(
+                            client=client, link=message_ids, single_link=single_link
+                        ),
+                        chat_id=extract_info_from_link(message_ids).group_id,
+                    )
                 link = canonical_link_str(message_ids)
 
             link_type, chat_id, message, member_num = meta.values()
@@ -2836,6 +3678,8 @@ class TelegramRestrictedMediaDownloader(Bot):
                 with_upload,
                 diy_download_type,
                 telegram_chat_id=request_chat_id,
+                segments=segments,
+                source=source,
             )
             return {
                 "chat_id": chat_id,
@@ -2951,6 +3795,30 @@ class TelegramRestrictedMediaDownloader(Bot):
                 "e_code": {"all_member": str(e), "error_msg": "未收录到的错误"},
             }
 
+    async def __resolve_links(self, links: Iterable[str]) -> dict:
+        """按频道批量解析链接,某个频道解析失败时该频道的链接由下载任务逐条解析。"""
+        links: list = list(links)
+        if len(links) < 2:
+            return {}
+        resolved: dict = {}
+        for chat_id, id_map in group_links_by_chat(links).items():
+            try:
+                # 当前账号无法访问该频道时,由会话池中其他账号解析。
+                resolved.update(
+                    await self.pool.resolve(
+                        lambda client: get_chat_messages_by_links(
+                            client=client, chat_id=chat_id, id_map=id_map
+                        ),
+                        chat_id=chat_id,
+                    )
+                )
+            except Exception as e:
+                log.warning(
+                    f'批量解析频道"{chat_id}"的链接失败,将逐条解析,{_t(KeyWord.REASON)}:"{e}"'
+                )
+        log.info(f"已批量解析{len(resolved)}/{len(links)}个链接。")
+        return resolved
+
     def __process_links(self, link: Union[str, list]) -> Union[set, None]:
         """将链接(文本格式或链接)处理成集合。"""
         start_content: str = "https://t.me/"
@@ -2996,11 +3864,12 @@ class TelegramRestrictedMediaDownloader(Bot):
 
     async def __download_media_from_links(self) -> None:
         await self.app.client.start(use_qr=False)
+        await self.pool.start()
         self.pb.progress.start()  # v1.1.8修复登录输入手机号不显示文本问题。
         if self.app.bot_token is not None:
             result = await self.start_bot(
                 self.app.client,
-                pyrogram.Client(
+                RateLimitedClient(
                     name=self.BOT_NAME,
                     api_hash=self.app.api_hash,
                     api_id=self.app.api_id,
@@ -3020,6 +3889,8 @@ class TelegramRestrictedMediaDownloader(Bot):
                     max_upload_task=self.app.max_upload_task,
                     max_retry_count=self.app.max_upload_retries,
                     notify=self.done_notice,
+                    journal=DownloadTask.JOURNAL if self.app.upload_part_enabled else None,
+                    upload_workers=self.app.upload_part_workers,
                 )
                 self.cd = CallbackData()
                 if self.gc.upload_delete:
@@ -3031,35 +3902,51 @@ class TelegramRestrictedMediaDownloader(Bot):
                     )
         self.is_running = True
         self.running_log.add(self.is_running)
+        if self.tuner:
+            self.loop.create_task(self.tuner.run())
+        if self.app.hash_verify:
+            self.loop.create_task(self.__verify_archive())
+        if self.temp_collector:
+            self.loop.create_task(self.temp_collector.run())
+        restored: set = await self.__restore_pending_tasks()
         links: Union[set, None] = self.__process_links(link=self.app.links)
         if links:
             # 使用规范化键与历史完成集比较，避免不同参数形式导致的漏判
             pending_links = [
                 link
                 for link in links
-                if canonical_link_str(link) not in DownloadTask.COMPLETE_LINK
-            ]
-            [
-                await self.loop.create_task(
-                    self.create_download_task(message_ids=link, retry=None)
-                )
-                for link in pending_links
+                if not DownloadTask.is_complete(canonical_link_str(link))
+                and canonical_link_str(link) not in restored
             ]
-        # 处理队列中的任务与机器人事件。
-        while not self.queue.empty() or self.is_bot_running:
-            result = await self.queue.get()
-            try:
-                await result
-            except PermissionError as e:
-                log.error(
-                    "临时文件无法移动至下载路径:\n"
-                    "1.可能存在使用网络路径、挂载硬盘行为(本软件不支持);\n"
-                    "2.可能存在多开软件时,同时操作同一文件或目录导致冲突;\n"
-                    "3.由于软件设计缺陷,没有考虑到不同频道文件名相同的情况(若调整将会导致部分用户更新后重复下载已有文件),当保存路径下文件过多时,可能恰巧存在相同文件名的文件,导致相同文件名无法正常移动,故请定期整理归档下载链接与保存路径下的文件。"
-                    f'{_t(KeyWord.REASON)}:"{e}"'
-                )
-        # 等待所有任务完成。
-        await self.queue.join()
+            resolved: dict = await self.__resolve_links(pending_links)
+            for link in pending_links:
+                self.submit_download_task(
+                    source=TaskSource.LINKS,
+                    message_ids=link,
+                    retry=None,
+                    meta=resolved.get(link),
+                )
+        while True:
+            # 等待链接解析完成(解析出的下载任务会放入队列)。
+            await self.scheduler.join()
+            # 处理队列中的任务与机器人事件。
+            while not self.queue.empty() or self.is_bot_running:
+                result = await self.queue.get()
+                try:
+                    await result
+                except PermissionError as e:
+                    log.error(
+                        "临时文件无法移动至下载路径:\n"
+                        "1.可能存在使用网络路径、挂载硬盘行为(本软件不支持);\n"
+                        "2.可能存在多开软件时,同时操作同一文件或目录导致冲突;\n"
+                        "3.由于软件设计缺陷,没有考虑到不同频道文件名相同的情况(若调整将会导致部分用户更新后重复下载已有文件),当保存路径下文件过多时,可能恰巧存在相同文件名的文件,导致相同文件名无法正常移动,故请定期整理归档下载链接与保存路径下的文件。"
+                        f'{_t(KeyWord.REASON)}:"{e}"'
+                    )
+            # 等待所有任务完成。
+            await self.queue.join()
+            if self.scheduler.is_idle():  # 下载失败时提交的重试任务也需要等待。
+                break
+        await self.pool.stop()
         await self.app.client.stop() if self.app.client.is_connected else None
 
     def run(self) -> None:
@@ -3123,6 +4010,18 @@ class TelegramRestrictedMediaDownloader(Bot):
         finally:
             self.is_running = False
             self.pb.progress.stop()
+            PeerCache.save()
+            flood_summary: dict = self.app.client.limiter.summary()
+            if flood_summary:
+                log.info(f"FloodWait统计:{flood_summary}。")
+            if self.file_reference_refresh_count:
+                log.info(
+                    f"文件引用过期后重新获取消息:{self.file_reference_refresh_count}次。"
+                )
+            if self.content_index.saved_count:
+                log.info(f"内容去重统计:{self.content_index.summary()}。")
+            if UploadStats.part_count:
+                log.info(f"分片上传统计:{UploadStats.summary()}。")
             if not record_error:
                 self.app.print_link_table(
                     link_info=DownloadTask.LINK_INFO,
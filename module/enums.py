@@ -58,6 +58,25 @@ class UploadStatus:
     FAILURE = "failure"
 
 
+class TaskSource:
+    RETRY: str = "retry"
+    BOT: str = "bot"
+    LISTEN_DOWNLOAD: str = "listen_download"
+    DOWNLOAD_CHAT: str = "download_chat"
+    LINKS: str = "links"
+
+    def __iter__(self):
+        for key, value in vars(self.__class__).items():
+            if not key.startswith("_") and not callable(value):
+                yield value
+
+
+class RetryReason:
+    NETWORK: str = "network"  # 网络错误、超时或文件大小不一致,按指数退避重试。
+    FLOOD_WAIT: str = "flood_wait"  # 按Telegram要求的时间等待后重试。
+    PERMANENT: str = "permanent"  # 消息不存在、无权访问等,重试也无法成功。
+
+
 class CalenderKeyboard:
     START_TIME_BUTTON: str = "start time button"
     END_TIME_BUTTON: str = "end time button"
@@ -0,0 +1,123 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 22:50
+# File:integrity.py
+import os
+import hashlib
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Union
+
+from module import log
+from module.language import _t
+from module.enums import KeyWord
+from module.journal import TaskJournal
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+class StreamHasher:
+    """下载时增量计算文件摘要。
+    写入线程每写入一块就调用update,与当前位置连续的块直接计算,
+    分段下载或断点续传时不连续的部分在下载完成后由finish从缓存文件中补读。
+    """
+    XXHASH: str = 'xxhash'
+    READ_SIZE: int = 4 * 1024 * 1024
+
+    def __init__(self, algorithm: str):
+        self.algorithm: str = algorithm
+        self.hash = StreamHasher.new(algorithm)
+        self.offset: int = 0
+
+    @staticmethod
+    def new(algorithm: str):
+        if algorithm == StreamHasher.XXHASH:
+            return xxhash.xxh3_128()
+        return hashlib.new(algorithm)
+
+    @staticmethod
+    def is_supported(algorithm: Union[str, None]) -> bool:
+        if not algorithm:
+            return False
+        if algorithm == StreamHasher.XXHASH:
+            return xxhash is not None
+        return algorithm in hashlib.algorithms_available
+
+    def update(self, offset: int, data: bytes) -> None:
+        """在写入线程中调用,只计算与当前位置连续的块。"""
+        if offset == self.offset:
+            self.hash.update(data)
+            self.offset += len(data)
+
+    def finish(self, path: str, size: int) -> str:
+        """补读尚未计算的部分,返回十六进制摘要。"""
+        if self.offset < size:
+            with open(file=path, mode='rb') as f:
+                f.seek(self.offset)
+                while self.offset < size:
+                    data: bytes = f.read(min(StreamHasher.READ_SIZE, size - self.offset))
+                    if not data:
+                        break
+                    self.hash.update(data)
+                    self.offset += len(data)
+        return self.hash.hexdigest()
+
+    @staticmethod
+    def hash_file(path: str, algorithm: str) -> Union[str, None]:
+        """计算整个文件的摘要,文件不存在时返回None。在进程池中执行。"""
+        if not os.path.isfile(path):
+            return None
+        hasher = StreamHasher(algorithm)
+        return hasher.finish(path=path, size=os.path.getsize(path))
+
+
+class Integrity:
+    """文件摘要的保存与校验。"""
+    STATUS_OK: str = 'ok'
+    STATUS_MISSING: str = 'missing'
+    STATUS_CORRUPT: str = 'corrupt'
+
+    @staticmethod
+    def get_sidecar_path(path: str, algorithm: str) -> str:
+        return f'{path}.{algorithm}'
+
+    @staticmethod
+    def write_sidecar(path: str, algorithm: str, digest: str) -> None:
+        """以sha256sum的格式写入与文件同名的摘要文件。"""
+        try:
+            with open(file=Integrity.get_sidecar_path(path, algorithm), mode='w', encoding='UTF-8') as f:
+                f.write(f'{digest}  {os.path.basename(path)}\n')
+        except Exception as e:
+            log.warning(f'写入"{path}"的摘要文件失败,{_t(KeyWord.REASON)}:"{e}"')
+
+    @staticmethod
+    def verify(journal: TaskJournal, workers: Union[int, None] = None) -> Dict[str, int]:
+        """使用进程池重新计算任务日志中记录过摘要的所有文件,返回各状态的数量。"""
+        rows: list = [row for row in journal.load_digests() if StreamHasher.is_supported(row.get('algorithm'))]
+        result: Dict[str, int] = {Integrity.STATUS_OK: 0, Integrity.STATUS_MISSING: 0, Integrity.STATUS_CORRUPT: 0}
+        if not rows:
+            return result
+        log.info(f'开始校验已下载的{len(rows)}个文件。')
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            digests = executor.map(
+                StreamHasher.hash_file,
+                [row.get('path') for row in rows],
+                [row.get('algorithm') for row in rows],
+                chunksize=8
+            )
+            for row, digest in zip(rows, digests):
+                path: str = row.get('path')
+                status: str = Integrity.STATUS_OK
+                if digest is None:
+                    status = Integrity.STATUS_MISSING
+                elif digest != row.get('digest'):
+                    status = Integrity.STATUS_CORRUPT
+                    log.error(f'文件"{path}"校验失败,记录的摘要:{row.get("digest")},实际的摘要:{digest}。')
+                result[status] += 1
+                journal.set_digest_status(path=path, status=status)
+        log.info(f'文件校验完成,{result}。')
+        return result
@@ -0,0 +1,477 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 14:05
+# File:journal.py
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from typing import Iterable, Union
+
+from module import log, yaml
+from module.language import _t
+from module.enums import DownloadStatus, KeyWord
+
+
+class TaskJournal:
+    """基于SQLite(WAL模式)的下载任务日志。
+    每个链接与文件的状态变化都只更新对应的一行,
+    替代每完成一个链接就重写一次的download_history.yaml。
+    同一个连接会在事件循环与线程池中使用,每条语句从执行到读取完结果都在lock中进行。
+    """
+    FILE_NAME: str = 'download_journal.db'
+    SCHEMA: tuple = (
+        'CREATE TABLE IF NOT EXISTS link('
+        'link TEXT PRIMARY KEY,'
+        'link_type TEXT,'
+        'member_num INTEGER DEFAULT 0,'
+        'complete_num INTEGER DEFAULT 0,'
+        'status TEXT,'
+        'error_msg TEXT,'
+        'update_time REAL)',
+        'CREATE INDEX IF NOT EXISTS link_status ON link(status)',
+        'CREATE INDEX IF NOT EXISTS link_update_time ON link(update_time)',
+        'CREATE TABLE IF NOT EXISTS file('
+        'link TEXT,'
+        'file_name TEXT,'
+        'file_id INTEGER,'
+        'size INTEGER DEFAULT 0,'
+        'downloaded INTEGER DEFAULT 0,'
+        'status TEXT,'
+        'error_msg TEXT,'
+        'update_time REAL,'
+        'PRIMARY KEY(link, file_name))',
+        'CREATE TABLE IF NOT EXISTS meta('
+        'key TEXT PRIMARY KEY,'
+        'value TEXT)',
+        'CREATE TABLE IF NOT EXISTS pending('
+        'key TEXT PRIMARY KEY,'
+        'source TEXT,'
+        'link TEXT,'
+        'chat_id TEXT,'
+        'message_id INTEGER,'
+        'single_link INTEGER DEFAULT 0,'
+        'tag TEXT,'
+        'with_upload TEXT,'
+        'diy_download_type TEXT,'
+        'request_chat_id INTEGER,'
+        'retry TEXT,'
+        'temp_path TEXT,'
+        'attempts INTEGER DEFAULT 0,'
+        'drop_time REAL,'
+        'create_time REAL,'
+        'update_time REAL)',
+        'CREATE TABLE IF NOT EXISTS pending_temp('
+        'key TEXT,'
+        'message_id INTEGER,'
+        'temp_path TEXT,'
+        'retry TEXT,'
+        'update_time REAL,'
+        'PRIMARY KEY(key, message_id))',
+        'CREATE TABLE IF NOT EXISTS chat_sync('
+        'chat_id TEXT,'
+        'filter_hash TEXT,'
+        'max_id INTEGER DEFAULT 0,'
+        'update_time REAL,'
+        'PRIMARY KEY(chat_id, filter_hash))',
+        'CREATE TABLE IF NOT EXISTS content('
+        'file_unique_id TEXT,'
+        'size INTEGER,'
+        'path TEXT,'
+        'update_time REAL,'
+        'PRIMARY KEY(file_unique_id, size))',
+        'CREATE TABLE IF NOT EXISTS content_ref('
+        'path TEXT PRIMARY KEY,'
+        'file_unique_id TEXT,'
+        'size INTEGER,'
+        'source TEXT,'
+        'method TEXT,'
+        'update_time REAL)',
+        'CREATE TABLE IF NOT EXISTS digest('
+        'path TEXT PRIMARY KEY,'
+        'algorithm TEXT,'
+        'digest TEXT,'
+        'size INTEGER,'
+        'file_unique_id TEXT,'
+        'status TEXT,'
+        'verify_time REAL,'
+        'update_time REAL)',
+        'CREATE INDEX IF NOT EXISTS digest_file_unique_id ON digest(file_unique_id)',
+        'CREATE TABLE IF NOT EXISTS upload('
+        'path TEXT,'
+        'chat_id TEXT,'
+        'file_id INTEGER,'
+        'size INTEGER,'
+        'mtime REAL,'
+        'part_size INTEGER,'
+        'parts BLOB,'
+        'update_time REAL,'
+        'PRIMARY KEY(path, chat_id))'
+    )
+
+    COLUMNS: tuple = (
+        ('pending_temp', 'retry TEXT'),
+        ('pending', 'drop_time REAL'),
+    )
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.lock = threading.RLock()
+        try:
+            if path != ':memory:':
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        except Exception as e:
+            log.warning(f'无法打开任务日志"{path}",本次运行的下载记录将不会保存,{_t(KeyWord.REASON)}:"{e}"')
+            self.path = ':memory:'
+            self.conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        for sql in TaskJournal.SCHEMA:
+            self.conn.execute(sql)
+        for table, column in TaskJournal.COLUMNS:
+            try:  # 旧的任务日志中缺少的列。
+                self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column}')
+            except sqlite3.OperationalError:
+                pass
+
+    def execute(self, sql: str, params: Iterable = ()) -> Union[sqlite3.Cursor, None]:
+        try:
+            with self.lock:
+                return self.conn.execute(sql, tuple(params))
+        except Exception as e:
+            log.warning(f'写入任务日志失败,{_t(KeyWord.REASON)}:"{e}"')
+            return None
+
+    def fetchone(self, sql: str, params: Iterable = ()) -> Union[tuple, None]:
+        with self.lock:
+            cursor = self.execute(sql, params)
+            return cursor.fetchone() if cursor else None
+
+    def fetchall(self, sql: str, params: Iterable = ()) -> list:
+        with self.lock:
+            cursor = self.execute(sql, params)
+            return cursor.fetchall() if cursor else []
+
+    def get_meta(self, key: str) -> Union[str, None]:
+        row = self.fetchone('SELECT value FROM meta WHERE key=?', (key,))
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.execute('INSERT OR REPLACE INTO meta(key, value) VALUES(?, ?)', (key, value))
+
+    @staticmethod
+    def dumps(value) -> Union[str, None]:
+        if value is None:
+            return None
+        try:
+            return json.dumps(value, ensure_ascii=False, default=str)
+        except Exception:
+            return str(value)
+
+    def upsert(self, table: str, keys: dict, fields: dict, insert_only: Union[dict, None] = None) -> None:
+        """按主键新增或更新一行,只写入传入的字段,insert_only中的字段仅在新增时写入。"""
+        fields['update_time'] = time.time()
+        insert_only: dict = insert_only or {}
+        columns: list = [*keys.keys(), *fields.keys(), *insert_only.keys()]
+        self.execute(
+            f'INSERT INTO {table}({", ".join(columns)}) VALUES({", ".join("?" for _ in columns)}) '
+            f'ON CONFLICT({", ".join(keys.keys())}) '
+            f'DO UPDATE SET {", ".join(f"{c}=excluded.{c}" for c in fields.keys())}',
+            (*keys.values(), *fields.values(), *insert_only.values())
+        )
+
+    def update_link(self, link: str, **fields) -> None:
+        """新增或更新链接记录,只写入传入的字段。"""
+        if not fields:
+            return None
+        if 'error_msg' in fields:
+            fields['error_msg'] = TaskJournal.dumps(fields.get('error_msg'))
+        self.upsert(table='link', keys={'link': str(link)}, fields=fields)
+
+    def update_file(self, link: str, file_name: str, **fields) -> None:
+        """新增或更新文件记录(大小、已下载字节数、状态、错误)。"""
+        if 'error_msg' in fields:
+            fields['error_msg'] = TaskJournal.dumps(fields.get('error_msg'))
+        self.upsert(table='file', keys={'link': str(link), 'file_name': str(file_name)}, fields=fields)
+
+    def add_pending(self, key: str, **fields) -> None:
+        """记录已接受但未完成的任务,重复提交时更新字段并保留创建时间。"""
+        for name in ('with_upload', 'diy_download_type', 'retry'):
+            if name in fields:
+                fields[name] = TaskJournal.dumps(fields.get(name))
+        # 提交成功即重新计算恢复失败次数,重新提交已放弃恢复的任务时重新恢复。
+        fields.setdefault('attempts', 0)
+        fields.setdefault('drop_time', None)
+        self.upsert(table='pending', keys={'key': str(key)}, fields=fields, insert_only={'create_time': time.time()})
+
+    def update_pending(self, key: str, **fields) -> None:
+        if not fields:
+            return None
+        if 'retry' in fields:
+            fields['retry'] = TaskJournal.dumps(fields.get('retry'))
+        fields['update_time'] = time.time()
+        self.execute(
+            f'UPDATE pending SET {", ".join(f"{c}=?" for c in fields.keys())} WHERE key=?',
+            (*fields.values(), str(key))
+        )
+
+    def add_pending_attempt(self, key: str) -> None:
+        """记录一次恢复失败。"""
+        self.execute(
+            'UPDATE pending SET attempts=COALESCE(attempts, 0)+1, update_time=? WHERE key=?',
+            (time.time(), str(key))
+        )
+
+    def drop_pending(self, key: str) -> None:
+        """不再恢复多次恢复失败的任务,但保留记录,可通过load_dropped_pending取回。"""
+        self.update_pending(key, drop_time=time.time())
+
+    def remove_pending(self, key: str) -> None:
+        self.execute('DELETE FROM pending_temp WHERE key=?', (str(key),))
+        self.execute('DELETE FROM pending WHERE key=?', (str(key),))
+
+    def set_pending_temp(self, key: str, message_id: Union[int, None], temp_path: str) -> None:
+        """记录任务中每条消息的缓存文件,媒体组的成员各占一行,互不覆盖。"""
+        self.upsert(
+            table='pending_temp',
+            keys={'key': str(key), 'message_id': message_id if message_id is not None else 0},
+            fields={'temp_path': temp_path}
+        )
+
+    def set_pending_retry(self, key: str, message_id: Union[int, None], retry: dict) -> None:
+        """记录任务中单个文件的重试状态,媒体组中每个文件的重试次数互不影响。"""
+        self.upsert(
+            table='pending_temp',
+            keys={'key': str(key), 'message_id': message_id if message_id is not None else 0},
+            fields={'retry': TaskJournal.dumps(retry)}
+        )
+
+    def load_pending_retries(self, key: str) -> dict:
+        """读取任务中各文件的重试状态,返回消息ID与重试状态的映射。"""
+        retries: dict = {}
+        for message_id, retry in self.fetchall(
+                'SELECT message_id, retry FROM pending_temp WHERE key=? AND retry IS NOT NULL', (str(key),)
+        ):
+            try:
+                retries[message_id] = json.loads(retry)
+            except Exception:
+                continue
+        return retries
+
+    def load_pending_temps(self) -> list:
+        """读取所有未完成任务的缓存文件,返回(任务,缓存文件)列表,包含旧版记录在pending中的缓存文件。"""
+        return self.fetchall(
+            'SELECT t.key, t.temp_path FROM pending_temp t JOIN pending p ON p.key=t.key WHERE t.temp_path IS NOT NULL '
+            'UNION SELECT key, temp_path FROM pending WHERE temp_path IS NOT NULL'
+        )
+
+    def load_pending(self, dropped: bool = False) -> list:
+        """按提交顺序读取所有未完成的任务,JSON字段会被还原。
+        dropped为True时读取已放弃恢复的任务。
+        """
+        with self.lock:
+            cursor = self.execute(
+                f'SELECT * FROM pending WHERE drop_time IS {"NOT " if dropped else ""}NULL ORDER BY create_time'
+            )
+            if cursor is None:
+                return []
+            names: list = [d[0] for d in cursor.description]
+            result: list = cursor.fetchall()
+        rows: list = []
+        for row in result:
+            item: dict = dict(zip(names, row))
+            for name in ('with_upload', 'diy_download_type', 'retry'):
+                try:
+                    item[name] = json.loads(item.get(name)) if item.get(name) else None
+                except Exception:
+                    item[name] = None
+            rows.append(item)
+        return rows
+
+    def is_pending(self, key: str) -> bool:
+        return self.fetchone('SELECT 1 FROM pending WHERE key=? AND drop_time IS NULL', (str(key),)) is not None
+
+    def get_pending_tag(self, key: str) -> Union[str, None]:
+        row = self.fetchone('SELECT tag FROM pending WHERE key=?', (str(key),))
+        return row[0] if row else None
+
+    def load_links(self, since: float):
+        """逐条读取指定时间后更新过的链接记录,附带已完成的文件名。"""
+        rows: list = self.fetchall(
+            'SELECT link, link_type, member_num, complete_num, error_msg FROM link '
+            'WHERE update_time>=? ORDER BY update_time',
+            (since,)
+        )
+        for link, link_type, member_num, complete_num, error_msg in rows:
+            try:
+                error_msg = json.loads(error_msg) if error_msg else {}
+            except Exception:
+                error_msg = {'all_member': error_msg}
+            yield {
+                'link': link,
+                'link_type': link_type,
+                'member_num': member_num,
+                'complete_num': complete_num,
+                'error_msg': error_msg if isinstance(error_msg, dict) else {},
+                'file_name': [
+                    row[0] for row in self.fetchall(
+                        'SELECT file_name FROM file WHERE link=? AND status=?',
+                        (link, DownloadStatus.SUCCESS)
+                    )
+                ]
+            }
+
+    def get_sync_mark(self, chat_id: Union[str, int], filter_hash: str) -> int:
+        """读取频道在该过滤条件下已扫描并提交的最大消息ID。"""
+        row = self.fetchone(
+            'SELECT max_id FROM chat_sync WHERE chat_id=? AND filter_hash=?',
+            (str(chat_id), filter_hash)
+        )
+        return row[0] if row and row[0] else 0
+
+    def set_sync_mark(self, chat_id: Union[str, int], filter_hash: str, max_id: int) -> None:
+        """更新频道的扫描位置,只会向前推进。"""
+        self.execute(
+            'INSERT INTO chat_sync(chat_id, filter_hash, max_id, update_time) VALUES(?, ?, ?, ?) '
+            'ON CONFLICT(chat_id, filter_hash) DO UPDATE SET '
+            'max_id=MAX(max_id, excluded.max_id), update_time=excluded.update_time',
+            (str(chat_id), filter_hash, int(max_id), time.time())
+        )
+
+    def get_content(self, file_unique_id: str, size: int) -> Union[str, None]:
+        """按文件唯一ID与大小查询已保存的文件路径。"""
+        row = self.fetchone(
+            'SELECT path FROM content WHERE file_unique_id=? AND size=?',
+            (file_unique_id, int(size))
+        )
+        return row[0] if row else None
+
+    def set_content(self, file_unique_id: str, size: int, path: str) -> None:
+        self.upsert(
+            table='content',
+            keys={'file_unique_id': file_unique_id, 'size': int(size)},
+            fields={'path': path}
+        )
+
+    def remove_content(self, file_unique_id: str, size: int) -> None:
+        self.execute('DELETE FROM content WHERE file_unique_id=? AND size=?', (file_unique_id, int(size)))
+
+    def add_content_ref(self, path: str, file_unique_id: str, size: int, source: str, method: str) -> None:
+        """记录由已有文件得到的重复文件(未经网络传输)。"""
+        self.upsert(
+            table='content_ref',
+            keys={'path': path},
+            fields={'file_unique_id': file_unique_id, 'size': int(size), 'source': source, 'method': method}
+        )
+
+    def content_saved_bytes(self) -> int:
+        row = self.fetchone('SELECT SUM(size) FROM content_ref')
+        return row[0] if row and row[0] else 0
+
+    def set_digest(
+            self,
+            path: str,
+            algorithm: str,
+            digest: str,
+            size: int,
+            file_unique_id: Union[str, None] = None
+    ) -> None:
+        """记录文件下载完成时计算的摘要。"""
+        self.upsert(
+            table='digest',
+            keys={'path': path},
+            fields={
+                'algorithm': algorithm,
+                'digest': digest,
+                'size': int(size),
+                'file_unique_id': file_unique_id,
+                'status': None,
+                'verify_time': None
+            }
+        )
+
+    def set_digest_status(self, path: str, status: str) -> None:
+        self.execute('UPDATE digest SET status=?, verify_time=? WHERE path=?', (status, time.time(), path))
+
+    def load_digests(self) -> list:
+        return [
+            {'path': path, 'algorithm': algorithm, 'digest': digest}
+            for path, algorithm, digest in self.fetchall('SELECT path, algorithm, digest FROM digest')
+        ]
+
+    def get_upload(self, path: str, chat_id: Union[str, int]) -> Union[dict, None]:
+        """读取未完成的分片上传记录,parts为已确认分片的位图。"""
+        row = self.fetchone(
+            'SELECT file_id, size, mtime, part_size, parts, update_time FROM upload WHERE path=? AND chat_id=?',
+            (path, str(chat_id))
+        )
+        if not row:
+            return None
+        return dict(zip(('file_id', 'size', 'mtime', 'part_size', 'parts', 'update_time'), row))
+
+    def set_upload(self, path: str, chat_id: Union[str, int], **fields) -> None:
+        self.upsert(table='upload', keys={'path': path, 'chat_id': str(chat_id)}, fields=fields)
+
+    def remove_upload(self, path: str, chat_id: Union[str, int]) -> None:
+        self.execute('DELETE FROM upload WHERE path=? AND chat_id=?', (path, str(chat_id)))
+
+    def complete_link(self, link: str) -> None:
+        self.update_link(link, status=DownloadStatus.SUCCESS, error_msg=None)
+
+    def is_complete(self, link: str) -> bool:
+        return self.fetchone(
+            'SELECT 1 FROM link WHERE link=? AND status=?',
+            (str(link), DownloadStatus.SUCCESS)
+        ) is not None
+
+    def complete_count(self) -> int:
+        row = self.fetchone('SELECT COUNT(*) FROM link WHERE status=?', (DownloadStatus.SUCCESS,))
+        return row[0] if row else 0
+
+    def migrate_yaml(self, yaml_path: str, canonical: callable) -> None:
+        """将旧版download_history.yaml中的已完成链接一次性导入日志,原文件保留不动。"""
+        if self.get_meta('yaml_migrated') or not os.path.isfile(yaml_path):
+            return None
+        try:
+            with open(file=yaml_path, mode='r', encoding='UTF-8') as f:
+                data = yaml.safe_load(f) or {}
+            items = data.get('complete_links') or []
+            links: set = set()
+            for it in items if isinstance(items, list) else []:
+                s = str(it)
+                try:
+                    s = canonical(s)
+                except Exception:
+                    pass
+                links.add(s)
+            now: float = time.time()
+            with self.lock:
+                self.conn.execute('BEGIN')
+                try:
+                    self.conn.executemany(
+                        'INSERT INTO link(link, status, update_time) VALUES(?, ?, ?) '
+                        'ON CONFLICT(link) DO UPDATE SET status=excluded.status',
+                        ((link, DownloadStatus.SUCCESS, now) for link in links)
+                    )
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO meta(key, value) VALUES(?, ?)',
+                        ('yaml_migrated', str(now))
+                    )
+                    self.conn.execute('COMMIT')
+                except Exception:
+                    self.conn.execute('ROLLBACK')
+                    raise
+            log.info(f'已将"{yaml_path}"中的{len(links)}条已完成链接导入任务日志"{self.path}"。')
+        except Exception as e:
+            log.warning(f'导入下载历史"{yaml_path}"失败,{_t(KeyWord.REASON)}:"{e}"')
+
+    def close(self) -> None:
+        try:
+            with self.lock:
+                self.conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,213 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 19:05
+# File:limiter.py
+import time
+import heapq
+import asyncio
+import itertools
+
+from typing import Awaitable, Callable, Dict, Tuple, Union
+
+from pyrogram.errors.exceptions.flood_420 import FloodWait
+
+from module import log
+
+
+class TokenBucket:
+    """令牌桶,遇到FloodWait时在等待时间内暂停发放令牌并将速率减半,请求成功后逐步恢复。"""
+
+    def __init__(self, rate: float, burst: float, min_rate: float):
+        self.max_rate: float = max(rate, min_rate)
+        self.min_rate: float = min_rate
+        self.rate: float = self.max_rate
+        self.burst: float = max(burst, 1)
+        self.tokens: float = self.burst
+        self.updated: float = time.monotonic()
+        self.blocked_until: float = 0.0
+        self.flood_count: int = 0
+        self.flood_seconds: float = 0.0
+
+    def delay(self) -> float:
+        """有令牌时取走一个并返回0,否则返回需要等待的秒数。"""
+        now: float = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def on_flood_wait(self, value: float) -> None:
+        now: float = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + value)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.updated = now
+        self.flood_count += 1
+        self.flood_seconds += value
+
+    def on_success(self) -> None:
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.min_rate)
+
+
+class PriorityGate:
+    """按优先级发放同一个DC的令牌,priority越小越先获得,相同优先级按到达顺序。"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket: TokenBucket = bucket
+        self.heap: list = []
+        self.changed = asyncio.Event()
+        self.__seq = itertools.count()
+
+    def __notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    async def acquire(self, priority: int) -> None:
+        entry: Tuple[int, int] = (priority, next(self.__seq))
+        heapq.heappush(self.heap, entry)
+        self.__notify()
+        try:
+            while True:
+                if self.heap[0] == entry:
+                    delay: float = self.bucket.delay()
+                    if delay <= 0:
+                        return None
+                    await asyncio.sleep(delay)
+                else:
+                    await self.changed.wait()
+        finally:
+            self.heap.remove(entry)
+            heapq.heapify(self.heap)
+            self.__notify()
+
+
+class RateLimiter:
+    """按方法与DC限制RPC速率的限流器,所有账号(包括机器人)共享同一个限流器。
+    1.每个(账号,方法,DC)一个令牌桶,FloodWait按账号计算,遇到时该账号的该方法在等待时间内排队等待而不是失败,并降低速率。
+    2.同一DC的所有账号的请求再共享一个按优先级发放的令牌桶,发送媒体优先,其次是获取消息,界面编辑最后。
+    3.FloodWait超过调用方的sleep_threshold时仍然抛出,与pyrogram原有行为一致。
+    4.文件分片的传输请求(upload.*)不经过限流器,由pyrogram按sleep_threshold处理FloodWait。
+    分片请求的速率只受带宽限制,按METHOD_RATE限制时分片上传最多只有约METHOD_RATE*512KiB/s。
+    """
+    PRIORITY_MEDIA: int = 0
+    PRIORITY_READ: int = 1
+    PRIORITY_SEND: int = 2
+    PRIORITY_UI: int = 3
+    EXEMPT: Tuple[str, ...] = ('functions.upload.',)
+    PRIORITY: Dict[str, int] = {
+        'functions.messages.SendMedia': PRIORITY_MEDIA,
+        'functions.messages.SendMultiMedia': PRIORITY_MEDIA,
+        'functions.messages.UploadMedia': PRIORITY_MEDIA,
+        'functions.messages.GetHistory': PRIORITY_READ,
+        'functions.messages.GetMessages': PRIORITY_READ,
+        'functions.channels.GetMessages': PRIORITY_READ,
+        'functions.messages.GetDiscussionMessage': PRIORITY_READ,
+        'functions.messages.GetReplies': PRIORITY_READ,
+        'functions.messages.Search': PRIORITY_READ,
+        'functions.messages.EditMessage': PRIORITY_UI,
+        'functions.messages.EditInlineBotMessage': PRIORITY_UI,
+        'functions.messages.SetBotCallbackAnswer': PRIORITY_UI,
+        'functions.messages.DeleteMessages': PRIORITY_UI
+    }
+    DC_RATE: float = 30.0  # 每个DC每秒最多发出的请求数。
+    METHOD_RATE: float = 20.0  # 每个方法每秒最多发出的请求数。
+    MIN_RATE: float = 0.2  # 多次FloodWait后速率的下限。
+
+    def __init__(
+            self,
+            dc_rate: float = DC_RATE,
+            method_rate: float = METHOD_RATE,
+            min_rate: float = MIN_RATE
+    ):
+        self.dc_rate: float = dc_rate
+        self.method_rate: float = method_rate
+        self.min_rate: float = min_rate
+        self.buckets: Dict[Tuple[str, int, Union[str, None]], TokenBucket] = {}
+        self.gates: Dict[int, PriorityGate] = {}
+
+    @staticmethod
+    def get_method(query) -> str:
+        return getattr(query, 'QUALNAME', None) or type(query).__name__
+
+    @staticmethod
+    def is_exempt(method: str) -> bool:
+        return method.startswith(RateLimiter.EXEMPT)
+
+    @staticmethod
+    def get_priority(method: str) -> int:
+        for prefix, priority in RateLimiter.PRIORITY.items():
+            if method.startswith(prefix):
+                return priority
+        return RateLimiter.PRIORITY_SEND
+
+    def get_bucket(self, method: str, dc_id: int, account: Union[str, None] = None) -> TokenBucket:
+        key: Tuple[str, int, Union[str, None]] = (method, dc_id, account)
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(rate=self.method_rate, burst=self.method_rate, min_rate=self.min_rate)
+        return self.buckets[key]
+
+    def get_gate(self, dc_id: int) -> PriorityGate:
+        if dc_id not in self.gates:
+            self.gates[dc_id] = PriorityGate(
+                TokenBucket(rate=self.dc_rate, burst=self.dc_rate, min_rate=self.min_rate)
+            )
+        return self.gates[dc_id]
+
+    async def acquire(self, method: str, dc_id: int, account: Union[str, None] = None) -> TokenBucket:
+        """等待方法与DC的令牌,返回方法的令牌桶。"""
+        bucket: TokenBucket = self.get_bucket(method, dc_id, account)
+        while True:
+            delay: float = bucket.delay()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self.get_gate(dc_id).acquire(RateLimiter.get_priority(method))
+        return bucket
+
+    async def invoke(
+            self,
+            call: Callable[..., Awaitable],
+            query,
+            dc_id: Union[int, None],
+            sleep_threshold: float,
+            account: Union[str, None] = None,
+            **kwargs
+    ):
+        """限流后执行call(query,**kwargs),call需在FloodWait时直接抛出(sleep_threshold=0)。"""
+        method: str = RateLimiter.get_method(query)
+        if RateLimiter.is_exempt(method):
+            return await call(query, sleep_threshold=sleep_threshold, **kwargs)
+        dc_id: int = dc_id or 0
+        while True:
+            bucket: TokenBucket = await self.acquire(method, dc_id, account)
+            try:
+                result = await call(query, sleep_threshold=0, **kwargs)
+            except FloodWait as e:
+                value: float = float(e.value or 0)
+                bucket.on_flood_wait(value)
+                if value > sleep_threshold:
+                    raise
+                log.warning(
+                    f'{f"{account}的" if account else ""}"{method}"(DC{dc_id})需要等待{value}秒(FloodWait),'
+                    f'该方法的请求将排队等待,速率已调整为{bucket.rate:.2f}次/秒。'
+                )
+                continue
+            bucket.on_success()
+            return result
+
+    def summary(self) -> dict:
+        return {
+            f'{f"{account}:" if account else ""}{method}(DC{dc_id})': {
+                'rate': round(bucket.rate, 2),
+                'flood_count': bucket.flood_count,
+                'flood_seconds': bucket.flood_seconds
+            }
+            for (method, dc_id, account), bucket in self.buckets.items()
+            if bucket.flood_count
+        }
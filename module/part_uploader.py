@@ -0,0 +1,191 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 01:10
+# File:part_uploader.py
+import os
+import time
+import asyncio
+
+from typing import BinaryIO, Callable, Optional, Tuple, Union
+
+import pyrogram
+from pyrogram import raw
+
+from module import log
+from module.journal import TaskJournal
+from module.stdio import MetaData
+
+
+class UploadStats:
+    """所有分片上传共享的统计,与下载的写入统计一同在结束时输出。"""
+    bytes_sent: int = 0
+    part_count: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    resumed_parts: int = 0
+
+    @staticmethod
+    def average_latency() -> float:
+        return UploadStats.total_latency / UploadStats.part_count if UploadStats.part_count else 0.0
+
+    @staticmethod
+    def record(size: int, latency: float) -> None:
+        UploadStats.bytes_sent += size
+        UploadStats.part_count += 1
+        UploadStats.total_latency += latency
+        UploadStats.max_latency = max(UploadStats.max_latency, latency)
+
+    @staticmethod
+    def summary() -> dict:
+        return {
+            'bytes_sent': UploadStats.bytes_sent,
+            'part_count': UploadStats.part_count,
+            'average_latency': UploadStats.average_latency(),
+            'max_latency': UploadStats.max_latency,
+            'resumed_parts': UploadStats.resumed_parts
+        }
+
+
+class PartUploader:
+    """大文件的分片并发上传,已确认的分片记录在任务日志中,重试或重启后只上传缺少的分片。
+    1.大于BIG_FILE_SIZE的文件按PART_SIZE分片,以同一file_id调用SaveBigFilePart,全部确认后由SendMedia引用。
+    2.workers个协程同时上传不同的分片,每确认FLUSH_PARTS个分片(以及中断时)写入一次任务日志。
+    3.文件大小或修改时间变化、记录超过RECORD_TTL秒未更新、或发送时服务器提示分片缺失时,从头上传。
+    """
+    PART_SIZE: int = 512 * 1024  # Telegram允许的最大分片。
+    BIG_FILE_SIZE: int = 10 * 1024 * 1024  # 与save_file一致,不超过该大小的文件不分片并发上传。
+    FLUSH_PARTS: int = 32
+    RECORD_TTL: int = 12 * 3600  # 服务器只保留已上传的分片一段时间。
+
+    def __init__(self, client: pyrogram.Client, journal: TaskJournal, workers: int = 4):
+        self.client: pyrogram.Client = client
+        self.journal: TaskJournal = journal
+        self.workers: int = max(workers or 1, 1)
+
+    @staticmethod
+    def is_big(size: int) -> bool:
+        return size > PartUploader.BIG_FILE_SIZE
+
+    @staticmethod
+    def get_total_parts(size: int) -> int:
+        return (size + PartUploader.PART_SIZE - 1) // PartUploader.PART_SIZE
+
+    @staticmethod
+    def is_done(parts: bytearray, index: int) -> bool:
+        return bool(parts[index >> 3] >> (index & 7) & 1)
+
+    @staticmethod
+    def mark(parts: bytearray, index: int) -> None:
+        parts[index >> 3] |= 1 << (index & 7)
+
+    @staticmethod
+    def read(f: BinaryIO, offset: int) -> bytes:
+        """在线程中读取一个分片,每个上传协程使用各自的文件对象。"""
+        f.seek(offset)
+        return f.read(PartUploader.PART_SIZE)
+
+    def load(self, path: str, chat_id: Union[str, int], size: int, mtime: float) -> Tuple[int, bytearray]:
+        """读取可以继续的上传记录,返回(file_id,已确认分片的位图)。"""
+        total_parts: int = PartUploader.get_total_parts(size)
+        record: Union[dict, None] = self.journal.get_upload(path, chat_id)
+        if (
+                record
+                and record.get('size') == size
+                and record.get('mtime') == mtime
+                and record.get('part_size') == PartUploader.PART_SIZE
+                and record.get('parts') is not None
+                and len(record.get('parts')) == (total_parts + 7) // 8
+                and time.time() - (record.get('update_time') or 0) < PartUploader.RECORD_TTL
+        ):
+            return record.get('file_id'), bytearray(record.get('parts'))
+        return self.client.rnd_id(), bytearray((total_parts + 7) // 8)
+
+    def save(self, path: str, chat_id: Union[str, int], file_id: int, size: int, mtime: float, parts: bytearray) -> None:
+        self.journal.set_upload(
+            path=path,
+            chat_id=chat_id,
+            file_id=file_id,
+            size=size,
+            mtime=mtime,
+            part_size=PartUploader.PART_SIZE,
+            parts=bytes(parts)
+        )
+
+    def discard(self, path: str, chat_id: Union[str, int]) -> None:
+        """文件已发送或服务器上的分片已失效时删除上传记录。"""
+        self.journal.remove_upload(path, chat_id)
+
+    async def upload(
+            self,
+            path: str,
+            chat_id: Union[str, int],
+            progress: Optional[Callable] = None,
+            progress_args: tuple = ()
+    ) -> raw.types.InputFileBig:
+        loop = asyncio.get_running_loop()
+        size: int = os.path.getsize(path)
+        mtime: float = os.path.getmtime(path)
+        total_parts: int = PartUploader.get_total_parts(size)
+        file_id, parts = self.load(path, chat_id, size, mtime)
+        missing: list = [i for i in range(total_parts) if not PartUploader.is_done(parts, i)]
+        uploaded: int = size - sum(min(PartUploader.PART_SIZE, size - i * PartUploader.PART_SIZE) for i in missing)
+        if len(missing) < total_parts:
+            UploadStats.resumed_parts += total_parts - len(missing)
+            log.info(
+                f'"{path}"已上传{total_parts - len(missing)}/{total_parts}个分片'
+                f'({MetaData.suitable_units_display(uploaded)}),继续上传缺少的分片。'
+            )
+        pending = iter(missing)
+        acked: int = 0
+        sent: int = 0
+        latency: float = 0.0
+        start: float = time.monotonic()
+
+        async def worker() -> None:
+            nonlocal uploaded, acked, sent, latency
+            with open(path, 'rb') as f:
+                for index in pending:
+                    data: bytes = await loop.run_in_executor(None, PartUploader.read, f, index * PartUploader.PART_SIZE)
+                    part_start: float = time.monotonic()
+                    await self.client.invoke(
+                        raw.functions.upload.SaveBigFilePart(
+                            file_id=file_id,
+                            file_part=index,
+                            file_total_parts=total_parts,
+                            bytes=data
+                        )
+                    )
+                    part_latency: float = time.monotonic() - part_start
+                    UploadStats.record(len(data), part_latency)
+                    PartUploader.mark(parts, index)
+                    uploaded += len(data)
+                    sent += len(data)
+                    latency += part_latency
+                    acked += 1
+                    if acked % PartUploader.FLUSH_PARTS == 0:
+                        self.save(path, chat_id, file_id, size, mtime, parts)
+                    if progress:
+                        result = progress(uploaded, size, *progress_args)
+                        if asyncio.iscoroutine(result):
+                            await result
+
+        tasks: list = [asyncio.create_task(worker()) for _ in range(min(self.workers, len(missing)))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            if acked:
+                self.save(path, chat_id, file_id, size, mtime, parts)
+        if acked:
+            elapsed: float = max(time.monotonic() - start, 1e-6)
+            log.info(
+                f'"{path}"的{acked}个分片已上传,'
+                f'平均速度:{MetaData.suitable_units_display(int(sent / elapsed))}/s,'
+                f'平均分片耗时:{latency / acked * 1000:.0f}ms,并发数:{len(tasks)}。'
+            )
+        return raw.types.InputFileBig(id=file_id, parts=total_parts, name=os.path.basename(path))
@@ -12,6 +12,7 @@ import mimetypes
 import unicodedata
 
 from io import BytesIO
+from functools import lru_cache
 from typing import Optional, Union
 
 from pyrogram.file_id import (
@@ -24,6 +25,7 @@ from pyrogram.file_id import (
 )
 
 from module.enums import Extension
+from module.dir_index import DirectoryIndex
 
 _mimetypes = mimetypes.MimeTypes()
 
@@ -37,19 +39,15 @@ def split_path(path: str) -> dict:
     }
 
 
-def __is_exist(file_path: str) -> bool:
-    """判断文件路径是否存在。"""
-    return not os.path.isdir(file_path) and os.path.exists(file_path)
-
-
 def compare_file_size(a_size: int, b_size: int) -> bool:
     """比较文件的大小是否一致。"""
     return a_size == b_size
 
 
 def is_file_duplicate(save_directory: str, sever_file_size: int) -> bool:
-    """判断文件是否重复。"""
-    return __is_exist(save_directory) and compare_file_size(os.path.getsize(save_directory), sever_file_size)
+    """判断文件是否重复,通过保存目录的索引查询,不再逐个文件访问文件系统。"""
+    local_file_size: Union[int, None] = DirectoryIndex.get_size(save_directory)
+    return local_file_size is not None and compare_file_size(local_file_size, sever_file_size)
 
 
 def validate_title(title: str) -> str:
@@ -99,6 +97,7 @@ def gen_backup_config(old_path: str, absolute_backup_dir: str, error_config: boo
 def safe_delete(file_p_d: str) -> bool:
     """删除文件或目录。"""
     try:
+        DirectoryIndex.discard(file_p_d)
         if os.path.isdir(file_p_d):
             shutil.rmtree(file_p_d)
             return True
@@ -129,19 +128,22 @@ def safe_replace(origin_file: str, overwrite_file: str) -> dict:
                 e_code = f'移动文件失败,原因:"{e2}"'
         else:
             e_code = f'覆盖文件失败,原因:"{e}"'
-
+    if e_code is None:
+        DirectoryIndex.discard(origin_file)
+        DirectoryIndex.add(overwrite_file)
     return {'e_code': e_code}
 
 
 def move_to_save_directory(temp_file_path: str, save_directory: str) -> dict:
     """移动文件到指定路径。"""
     try:
-        os.makedirs(save_directory, exist_ok=True)
+        DirectoryIndex.makedirs(save_directory)
         if os.path.isdir(save_directory):
             file_name: str = split_path(temp_file_path).get('file_name')
             if os.path.exists(os.path.join(save_directory, file_name)):
                 return {'e_code': f'"{file_name}"已存在于保存路径无法移动,请手动解决冲突。'}
             shutil.move(temp_file_path, save_directory)
+            DirectoryIndex.add(os.path.join(save_directory, file_name))
             return {'e_code': None}
         else:
             save_directory: str = os.path.join(os.getcwd(), 'downloads')
@@ -195,14 +197,16 @@ def get_extension(file_id: str, mime_type: str, dot: bool = True) -> str:
     return extension
 
 
+@lru_cache(maxsize=1024)
 def __guess_extension(mime_type: str) -> Optional[str]:
     """如果扩展名不是None，则从没有点的MIME类型返回中猜测文件扩展名。"""
     extension = _mimetypes.guess_extension(mime_type, strict=True)
     return extension[1:] if extension and extension.startswith('.') else extension
 
 
+@lru_cache(maxsize=4096)
 def __get_file_type(file_id: str) -> FileType:
-    """获取文件类型。"""
+    """获取文件类型,同一file_id只解码一次。"""
     decoded = rle_decode(b64_decode(file_id))
 
     # File id versioning. Major versions lower than 4 don't have a minor version
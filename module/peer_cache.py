@@ -0,0 +1,226 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 18:10
+# File:peer_cache.py
+import os
+import json
+import time
+
+from typing import Dict, Tuple, Union
+
+import pyrogram
+from pyrogram.errors.exceptions.bad_request_400 import (
+    ChannelInvalid,
+    PeerIdInvalid,
+    UsernameNotOccupied
+)
+
+from module import log, APPDATA_PATH
+from module.language import _t
+from module.enums import KeyWord
+
+
+class PeerCache:
+    """进程内共享的频道解析缓存,供下载、上传与监听使用。
+    1.input peer:按客户端缓存,避免每次获取历史消息或上传时重复resolve_peer。
+    2.频道信息:缓存get_chat的结果(频道ID、讨论组ID、是否为话题频道),用户名不存在时缓存较短时间(负缓存)。
+    3.遇到PeerIdInvalid、ChannelInvalid时使对应缓存失效,频道信息会在退出时保存,下次启动时预热。
+    """
+    FILE_NAME: str = 'peer_cache.json'
+    PATH: str = os.path.join(APPDATA_PATH, FILE_NAME)
+    TTL: int = 6 * 3600  # 缓存有效时间(秒)。
+    NEGATIVE_TTL: int = 600  # 用户名不存在时的缓存时间(秒)。
+    INVALID_ERRORS: tuple = (PeerIdInvalid, ChannelInvalid)
+    peers: Dict[tuple, Tuple[object, float]] = {}  # (客户端名,频道):(input peer,过期时间)。
+    chats: Dict[tuple, Tuple[pyrogram.types.Chat, float]] = {}  # (客户端名,频道):(Chat,过期时间)。
+    infos: Dict[Union[str, int], dict] = {}  # 频道:{'chat_id','linked_chat_id','is_forum','expire'},可持久化。
+    missing: Dict[Union[str, int], float] = {}  # 不存在的用户名:过期时间。
+    hits: int = 0
+    misses: int = 0
+    loaded: bool = False
+
+    @staticmethod
+    def get_key(chat_id: Union[str, int]) -> Union[str, int, None]:
+        """统一频道的键,me与self因客户端而异,不缓存。"""
+        if isinstance(chat_id, int):
+            return chat_id
+        key: str = str(chat_id).strip().lstrip('@')
+        if key.lower() in ('me', 'self', ''):
+            return None
+        try:
+            return int(key)
+        except ValueError:
+            # 用户名不区分大小写,邀请链接等其他形式保持原样。
+            return key.lower() if key.replace('_', '').isalnum() else key
+
+    @staticmethod
+    def load(path: Union[str, None] = None) -> None:
+        PeerCache.loaded = True
+        path = path or PeerCache.PATH
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(file=path, mode='r', encoding='UTF-8') as f:
+                data: dict = json.load(f) or {}
+            now: float = time.time()
+            for key, info in (data.get('infos') or {}).items():
+                if isinstance(info, dict) and info.get('expire', 0) > now:
+                    PeerCache.infos[PeerCache.get_key(key)] = info
+            for key, expire in (data.get('missing') or {}).items():
+                if expire > now:
+                    PeerCache.missing[PeerCache.get_key(key)] = expire
+            log.info(f'已从"{path}"载入{len(PeerCache.infos)}条频道解析缓存。')
+        except Exception as e:
+            log.warning(f'载入频道解析缓存失败,{_t(KeyWord.REASON)}:"{e}"')
+
+    @staticmethod
+    def save(path: Union[str, None] = None) -> None:
+        path = path or PeerCache.PATH
+        now: float = time.time()
+        try:
+            with open(file=path, mode='w', encoding='UTF-8') as f:
+                json.dump(
+                    {
+                        'infos': {str(k): v for k, v in PeerCache.infos.items() if v.get('expire', 0) > now},
+                        'missing': {str(k): v for k, v in PeerCache.missing.items() if v > now}
+                    },
+                    f,
+                    ensure_ascii=False
+                )
+        except Exception as e:
+            log.warning(f'保存频道解析缓存失败,{_t(KeyWord.REASON)}:"{e}"')
+        if PeerCache.hits or PeerCache.misses:
+            log.info(f'频道解析缓存统计,{PeerCache.summary()}。')
+
+    @staticmethod
+    def summary() -> dict:
+        return {
+            'hits': PeerCache.hits,
+            'misses': PeerCache.misses,
+            'saved_rpc': PeerCache.hits,  # 每次命中都省去了一次resolve_peer、ResolveUsername或get_chat请求。
+            'peers': len(PeerCache.peers),
+            'chats': len(PeerCache.infos)
+        }
+
+    @staticmethod
+    def invalidate(chat_id: Union[str, int]) -> None:
+        """使频道的所有缓存失效,频道ID与用户名两种键都会被清除。"""
+        key = PeerCache.get_key(chat_id)
+        keys: set = {key}
+        info: Union[dict, None] = PeerCache.infos.get(key)
+        if info:
+            keys.add(info.get('chat_id'))
+        keys.update(k for k, v in PeerCache.infos.items() if v.get('chat_id') == key)
+        for k in keys:
+            PeerCache.infos.pop(k, None)
+            PeerCache.missing.pop(k, None)
+        for cache in (PeerCache.peers, PeerCache.chats):
+            for k in [k for k in cache if k[1] in keys]:
+                cache.pop(k, None)
+
+    @staticmethod
+    def __get(cache: dict, key: tuple):
+        item = cache.get(key)
+        if item is None:
+            return None
+        value, expire = item
+        if expire < time.time():
+            cache.pop(key, None)
+            return None
+        return value
+
+    @staticmethod
+    def __check_missing(key: Union[str, int]) -> None:
+        expire: Union[float, None] = PeerCache.missing.get(key)
+        if expire is None:
+            return None
+        if expire < time.time():
+            PeerCache.missing.pop(key, None)
+            return None
+        PeerCache.hits += 1
+        raise UsernameNotOccupied()
+
+    @staticmethod
+    async def resolve_peer(client: pyrogram.Client, chat_id: Union[str, int]):
+        key = PeerCache.get_key(chat_id)
+        if key is None:
+            return await client.resolve_peer(chat_id)
+        if not PeerCache.loaded:
+            PeerCache.load()
+        PeerCache.__check_missing(key)
+        peer = PeerCache.__get(PeerCache.peers, (client.name, key))
+        if peer is not None:
+            PeerCache.hits += 1
+            return peer
+        peer_key: Union[str, int] = chat_id
+        info: Union[dict, None] = PeerCache.infos.get(key)
+        if info and info.get('chat_id') and info.get('expire', 0) > time.time():
+            peer_key = info.get('chat_id')  # 用户名已知对应的频道ID时,由会话存储直接得到input peer,无需请求。
+            PeerCache.hits += 1
+        else:
+            PeerCache.misses += 1
+        try:
+            peer = await client.resolve_peer(peer_key)
+        except UsernameNotOccupied:
+            PeerCache.missing[key] = time.time() + PeerCache.NEGATIVE_TTL
+            raise
+        except PeerCache.INVALID_ERRORS:
+            PeerCache.invalidate(key)
+            if peer_key == chat_id:
+                raise
+            peer = await client.resolve_peer(chat_id)  # 会话存储中没有该频道时按用户名重新解析。
+        PeerCache.peers[(client.name, key)] = (peer, time.time() + PeerCache.TTL)
+        return peer
+
+    @staticmethod
+    async def get_chat(client: pyrogram.Client, chat_id: Union[str, int]) -> pyrogram.types.Chat:
+        key = PeerCache.get_key(chat_id)
+        if key is None:
+            return await client.get_chat(chat_id)
+        if not PeerCache.loaded:
+            PeerCache.load()
+        PeerCache.__check_missing(key)
+        chat = PeerCache.__get(PeerCache.chats, (client.name, key))
+        if chat is not None:
+            PeerCache.hits += 1
+            return chat
+        PeerCache.misses += 1
+        try:
+            chat = await client.get_chat(chat_id)
+        except UsernameNotOccupied:
+            PeerCache.missing[key] = time.time() + PeerCache.NEGATIVE_TTL
+            raise
+        except PeerCache.INVALID_ERRORS:
+            PeerCache.invalidate(key)
+            raise
+        expire: float = time.time() + PeerCache.TTL
+        PeerCache.chats[(client.name, key)] = (chat, expire)
+        linked_chat = getattr(chat, 'linked_chat', None)
+        info: dict = {
+            'chat_id': chat.id,
+            'linked_chat_id': linked_chat.id if linked_chat else None,
+            'is_forum': bool(getattr(chat, 'is_forum', False)),
+            'expire': expire
+        }
+        PeerCache.infos[key] = info
+        PeerCache.infos[chat.id] = info
+        return chat
+
+    @staticmethod
+    async def get_info(client: pyrogram.Client, chat_id: Union[str, int]) -> dict:
+        """获取频道ID、讨论组ID与是否为话题频道,预热的缓存命中时无需请求。"""
+        key = PeerCache.get_key(chat_id)
+        if not PeerCache.loaded:
+            PeerCache.load()
+        info: Union[dict, None] = PeerCache.infos.get(key) if key is not None else None
+        if info and info.get('expire', 0) > time.time():
+            PeerCache.hits += 1
+            return info
+        chat = await PeerCache.get_chat(client, chat_id)
+        linked_chat = getattr(chat, 'linked_chat', None)
+        return PeerCache.infos.get(key) or {
+            'chat_id': chat.id,
+            'linked_chat_id': linked_chat.id if linked_chat else None,
+            'is_forum': bool(getattr(chat, 'is_forum', False))
+        }
@@ -0,0 +1,166 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 20:30
+# File:pool.py
+from typing import Awaitable, Callable, Dict, List, Tuple, Union
+
+import pyrogram
+from pyrogram.file_id import FileId
+from pyrogram.errors.exceptions.bad_request_400 import (
+    ChannelInvalid,
+    PeerIdInvalid,
+    UsernameInvalid,
+    UsernameNotOccupied
+)
+from pyrogram.errors.exceptions.bad_request_400 import (
+    ChannelPrivate as ChannelPrivate_400
+)
+from pyrogram.errors.exceptions.not_acceptable_406 import (
+    ChannelPrivate as ChannelPrivate_406
+)
+
+from module import log
+from module.language import _t
+from module.enums import DownloadType, KeyWord
+
+
+class ClientPool:
+    """多账号会话池。
+    下载时按以下顺序为每个文件选择账号:能访问该频道、未在该文件上失败过、当前下载数最少、与文件所在DC相同。
+    某账号无法访问频道时记录下来并自动改用其他账号,文件下载失败后的重试会换用其他账号继续下载同一个缓存文件。
+    """
+    ACCESS_ERRORS: tuple = (
+        ChannelInvalid,
+        ChannelPrivate_400,
+        ChannelPrivate_406,
+        PeerIdInvalid,
+        UsernameInvalid,
+        UsernameNotOccupied
+    )
+
+    def __init__(self, main: pyrogram.Client, clients: Union[List[pyrogram.Client], None] = None):
+        self.main: pyrogram.Client = main
+        self.extra: List[pyrogram.Client] = list(clients or [])
+        self.clients: List[pyrogram.Client] = [main]
+        self.load: Dict[str, int] = {main.name: 0}
+        self.denied: Dict[Union[int, str], set] = {}  # 频道:无法访问该频道的账号名。
+        self.failed: Dict[Tuple[Union[int, str], int], set] = {}  # (频道,消息ID):下载失败过的账号名。
+
+    async def start(self) -> None:
+        """登录额外的账号,无法登录的账号不加入会话池。"""
+        for client in self.extra:
+            try:
+                log.info(f'正在登录会话池中的账号"{client.name}"。')
+                await client.start(use_qr=False)
+                self.clients.append(client)
+                self.load[client.name] = 0
+            except Exception as e:
+                log.error(f'会话池中的账号"{client.name}"登录失败,将不会使用该账号,{_t(KeyWord.REASON)}:"{e}"')
+        if len(self.clients) > 1:
+            log.info(f'会话池已启用,共{len(self.clients)}个账号:{", ".join(c.name for c in self.clients)}。')
+
+    async def stop(self) -> None:
+        for client in self.clients[1:]:
+            try:
+                await client.stop() if client.is_connected else None
+            except Exception:
+                pass
+
+    @staticmethod
+    def get_dc(message: pyrogram.types.Message) -> Union[int, None]:
+        """获取消息中媒体文件所在的DC。"""
+        for dtype in DownloadType():
+            media = getattr(message, dtype, None)
+            if media is not None:
+                try:
+                    return FileId.decode(media.file_id).dc_id
+                except Exception:
+                    return None
+        return None
+
+    @staticmethod
+    def get_dc_of(client: pyrogram.Client) -> Union[int, None]:
+        return getattr(getattr(client, 'session', None), 'dc_id', None)
+
+    def deny(self, client: pyrogram.Client, chat_id: Union[int, str]) -> None:
+        self.denied.setdefault(chat_id, set()).add(client.name)
+        log.info(f'账号"{client.name}"无法访问频道"{chat_id}",该频道的任务将由其他账号处理。')
+
+    def pick(
+            self,
+            chat_id: Union[int, str],
+            dc_id: Union[int, None] = None,
+            exclude: Union[set, None] = None
+    ) -> Union[pyrogram.Client, None]:
+        """选择可访问该频道、负载最低的账号,负载相同时优先选择与文件同一DC的账号。"""
+        denied: set = self.denied.get(chat_id, set())
+        exclude: set = exclude or set()
+        candidates: list = [c for c in self.clients if c.name not in denied and c.name not in exclude]
+        if not candidates:
+            candidates = [c for c in self.clients if c.name not in denied]
+        if not candidates:
+            return None
+        return min(
+            candidates,
+            key=lambda c: (
+                self.load.get(c.name, 0),
+                0 if dc_id and ClientPool.get_dc_of(c) == dc_id else 1,
+                self.clients.index(c)
+            )
+        )
+
+    async def resolve(self, func: Callable[[pyrogram.Client], Awaitable], chat_id: Union[int, str, None] = None):
+        """依次使用可访问该频道的账号执行func,遇到无法访问的错误时换用下一个账号。"""
+        error: Union[Exception, None] = None
+        denied: set = self.denied.get(chat_id, set()) if chat_id is not None else set()
+        for client in self.clients:
+            if client.name in denied:
+                continue
+            try:
+                return await func(client)
+            except ClientPool.ACCESS_ERRORS as e:
+                error = e
+                if chat_id is not None and len(self.clients) > 1:
+                    self.deny(client, chat_id)
+        if error is None:
+            return await func(self.main)
+        raise error
+
+    async def assign(
+            self,
+            chat_id: Union[int, str],
+            message: pyrogram.types.Message
+    ) -> Tuple[pyrogram.Client, pyrogram.types.Message]:
+        """为下载分配账号,返回账号与该账号获取到的消息(文件引用与账号绑定)。"""
+        owner: pyrogram.Client = getattr(message, '_client', None) or self.main
+        if len(self.clients) == 1:
+            return owner, message
+        client = self.pick(
+            chat_id=chat_id,
+            dc_id=ClientPool.get_dc(message),
+            exclude=self.failed.get((chat_id, message.id))
+        )
+        if client is None or client is owner:
+            return owner, message
+        try:
+            _message = await client.get_messages(chat_id=chat_id, message_ids=message.id)
+            if _message and not getattr(_message, 'empty', False):
+                return client, _message
+        except ClientPool.ACCESS_ERRORS:
+            self.deny(client, chat_id)
+        except Exception as e:
+            log.warning(f'账号"{client.name}"获取消息失败,将使用账号"{owner.name}"下载,{_t(KeyWord.REASON)}:"{e}"')
+        return owner, message
+
+    def acquire(self, client: pyrogram.Client) -> None:
+        self.load[client.name] = self.load.get(client.name, 0) + 1
+
+    def release(self, client: pyrogram.Client, chat_id: Union[int, str], message_id: int, _future) -> None:
+        """下载结束后释放账号负载,失败时记录该账号,重试时换用其他账号。"""
+        self.load[client.name] = max(self.load.get(client.name, 0) - 1, 0)
+        key: tuple = (chat_id, message_id)
+        if _future.cancelled() or _future.exception() is not None:
+            self.failed.setdefault(key, set()).add(client.name)
+        else:
+            self.failed.pop(key, None)
@@ -0,0 +1,90 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 16:40
+# File:retention.py
+from collections import OrderedDict
+from typing import Iterable
+
+
+class RetainedSet:
+    """只在内存中保留最近maxlen个元素的集合,被移出的元素只计入数量。
+    用于长时间运行时只需要近期去重的记录,如媒体组去重。
+    被移出的元素无法再判断是否存在,需要准确判断或计数时应另外查询任务日志或单独计数。
+    """
+
+    def __init__(self, maxlen: int = 10000, iterable: Iterable = ()):
+        self.maxlen: int = max(maxlen or 1, 1)
+        self.items: OrderedDict = OrderedDict()
+        self.evicted: int = 0
+        self.update(iterable)
+
+    def add(self, item) -> None:
+        if item in self.items:
+            self.items.move_to_end(item)
+            return None
+        self.items[item] = None
+        while len(self.items) > self.maxlen:
+            self.items.popitem(last=False)
+            self.evicted += 1
+
+    def update(self, iterable: Iterable) -> None:
+        for item in iterable:
+            self.add(item)
+
+    def discard(self, item) -> None:
+        self.items.pop(item, None)
+
+    def __contains__(self, item) -> bool:
+        return item in self.items
+
+    def __iter__(self):
+        return iter(list(self.items))
+
+    def __len__(self) -> int:
+        return self.evicted + len(self.items)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __isub__(self, other: Iterable):
+        for item in other:
+            self.items.pop(item, None)
+        return self
+
+
+class RetainedDict:
+    """只在内存中保留最近使用的maxlen个键值对的字典(LRU)。"""
+
+    def __init__(self, maxlen: int = 10000):
+        self.maxlen: int = max(maxlen or 1, 1)
+        self.items: OrderedDict = OrderedDict()
+
+    def __setitem__(self, key, value) -> None:
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxlen:
+            self.items.popitem(last=False)
+
+    def __getitem__(self, key):
+        value = self.items[key]
+        self.items.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        if key not in self.items:
+            return default
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def pop(self, key, default=None):
+        return self.items.pop(key, default)
+
+    def __contains__(self, key) -> bool:
+        return key in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(list(self.items))
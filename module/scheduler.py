@@ -0,0 +1,170 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 13:20
+# File:scheduler.py
+import heapq
+import asyncio
+import itertools
+
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Union
+
+from module import log
+from module.language import _t
+from module.enums import KeyWord, TaskSource
+
+
+class TaskScheduler:
+    """下载任务调度器。
+    1.链接解析:固定数量的解析协程按来源轮流从各自的优先队列中取出任务执行,避免某一来源(如上万条链接的txt文件)独占解析。
+    2.下载名额:最多同时运行max_download_task个下载,名额释放时只唤醒一个按来源轮转选出的等待者。
+    """
+
+    def __init__(self, max_download_task: int, resolve_workers: int):
+        self.max_download_task: int = max(max_download_task or 1, 1)
+        self.resolve_workers: int = max(resolve_workers or 1, 1)
+        self.running: int = 0  # 已占用的下载名额。
+        self.pending: int = 0  # 已提交但未执行完成的解析任务。
+        self.jobs: Dict[str, list] = {source: [] for source in TaskSource()}
+        self.waiters: Dict[str, deque] = {source: deque() for source in TaskSource()}
+        self.job_order: deque = deque(TaskSource())
+        self.slot_order: deque = deque(TaskSource())
+        self.job_count = asyncio.Semaphore(0)
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.workers: List[asyncio.Task] = []
+        self.__seq = itertools.count()
+
+    @staticmethod
+    def __next_source(order: deque, container: Dict[str, Union[list, deque]]) -> Union[str, None]:
+        """按轮转顺序找出下一个有待处理项的来源。"""
+        for _ in range(len(order)):
+            source: str = order[0]
+            order.rotate(-1)
+            if container.get(source):
+                return source
+        return None
+
+    def __start(self) -> None:
+        if self.workers:
+            return None
+        loop = asyncio.get_event_loop()
+        self.workers = [loop.create_task(self.__worker()) for _ in range(self.resolve_workers)]
+
+    def submit(
+            self,
+            func: Callable[[], Awaitable],
+            source: str = TaskSource.LINKS,
+            priority: int = 0,
+            delay: float = 0
+    ) -> asyncio.Future:
+        """提交一个解析任务,返回可等待其结果的Future。priority越小越先执行。
+        delay大于0时在delay秒后才进入队列,等待期间任务仍计入未完成,调度器不会被视为空闲。
+        """
+        self.__start()
+        loop = asyncio.get_event_loop()
+        future: asyncio.Future = loop.create_future()
+        # 不等待结果的调用方不会取出异常,在此标记为已取出,避免退出时打印警告。
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.pending += 1
+        self.idle.clear()
+        job: tuple = (priority, next(self.__seq), func, future)
+        if delay > 0:
+            loop.call_later(delay, self.__push, source, job)
+        else:
+            self.__push(source, job)
+        return future
+
+    def __push(self, source: str, job: tuple) -> None:
+        heapq.heappush(self.jobs.setdefault(source, []), job)
+        if source not in self.job_order:
+            self.job_order.append(source)
+        self.job_count.release()
+
+    async def __worker(self) -> None:
+        while True:
+            await self.job_count.acquire()
+            source: Union[str, None] = TaskScheduler.__next_source(self.job_order, self.jobs)
+            if source is None:
+                continue
+            _, __, func, future = heapq.heappop(self.jobs[source])
+            try:
+                result = await func()
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                log.error(f'解析任务出错,来源:{source},{_t(KeyWord.REASON)}:"{e}"')
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.pending -= 1
+                if self.pending <= 0:
+                    self.pending = 0
+                    self.idle.set()
+
+    async def acquire(self, source: str = TaskSource.LINKS) -> None:
+        """获取一个下载名额,没有空闲名额时排队等待。"""
+        if self.running < self.max_download_task and not any(self.waiters.values()):
+            self.running += 1
+            return None
+        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        waiters: deque = self.waiters.setdefault(source, deque())
+        if source not in self.slot_order:
+            self.slot_order.append(source)
+        waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # 名额已转交但等待者被取消,继续转交给下一个。
+            else:
+                try:
+                    waiters.remove(future)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self) -> None:
+        """释放一个下载名额,有等待者时直接转交给按来源轮转选出的一个等待者。"""
+        if self.running > self.max_download_task:
+            self.running -= 1  # 名额上限已调低,超出的名额不再转交。
+            return None
+        while True:
+            source: Union[str, None] = TaskScheduler.__next_source(self.slot_order, self.waiters)
+            if source is None:
+                self.running = max(self.running - 1, 0)
+                return None
+            future: asyncio.Future = self.waiters[source].popleft()
+            if not future.done():
+                future.set_result(True)
+                return None
+
+    def set_limit(self, max_download_task: int) -> None:
+        """调整同时下载的名额上限,调高时立即唤醒等待者,调低时等运行中的下载结束后生效。"""
+        self.max_download_task = max(max_download_task or 1, 1)
+        while self.running < self.max_download_task:
+            source: Union[str, None] = TaskScheduler.__next_source(self.slot_order, self.waiters)
+            if source is None:
+                return None
+            future: asyncio.Future = self.waiters[source].popleft()
+            if not future.done():
+                self.running += 1
+                future.set_result(True)
+
+    def is_idle(self) -> bool:
+        return self.pending == 0
+
+    async def join(self) -> None:
+        """等待所有已提交的解析任务执行完成。"""
+        await self.idle.wait()
+
+    def status(self) -> dict:
+        return {
+            'running': self.running,
+            'pending': self.pending,
+            'waiting': {source: len(waiters) for source, waiters in self.waiters.items() if waiters}
+        }
@@ -0,0 +1,184 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 10:12
+# File:segment.py
+import os
+import math
+import time
+import zlib
+import struct
+
+from typing import List, Tuple, Union
+
+
+class ChunkManifest:
+    """记录缓存文件中每个块的清单文件,每个块一条定长记录(偏移,长度,CRC32,状态),块写入完成后才写入对应记录。
+    断点续传时只重新校验每段已下载区间末尾的几个块,校验失败的块视为未下载,
+    缓存文件会被截断到最后一个已完成块的末尾,避免崩溃时残留的不完整数据被当作已下载。
+    记录由写入线程在块写入后改写,每隔FLUSH_INTERVAL秒(以及关闭时)写入一次文件,
+    中断时最多丢失最近的几条记录,对应的块会被视为未下载并重新下载。
+    """
+    SUFFIX: str = '.manifest'
+    RECORD = struct.Struct('<QIIB3x')  # 偏移,长度,CRC32,状态。
+    STATE_MISSING: int = 0
+    STATE_VERIFIED: int = 1  # 带有CRC32,可以校验。
+    STATE_ADOPTED: int = 2  # 由旧的缓存文件直接接管,没有CRC32。
+    VERIFY_TAIL: int = 4  # 每个已下载区间末尾需要重新校验的块数。
+    FLUSH_INTERVAL: float = 1.0
+
+    def __init__(self, temp_path: str, total_chunks: int):
+        self.path: str = ChunkManifest.get_path(temp_path)
+        self.total_chunks: int = total_chunks
+        self.records: List[Tuple[int, int, int, int]] = [(0, 0, 0, ChunkManifest.STATE_MISSING)] * total_chunks
+        self.is_new: bool = not os.path.isfile(self.path)
+        size: int = ChunkManifest.RECORD.size
+        if not self.is_new:
+            with open(file=self.path, mode='rb') as f:
+                data: bytes = f.read()
+            if len(data) == total_chunks * size:
+                self.records = [ChunkManifest.RECORD.unpack_from(data, i * size) for i in range(total_chunks)]
+            else:  # 文件大小变化或清单损坏时重新记录。
+                self.is_new = True
+        if self.is_new:
+            with open(file=self.path, mode='wb') as f:
+                f.write(bytes(total_chunks * size))
+        self.__file = open(file=self.path, mode='r+b')
+        self.__flushed: float = time.monotonic()
+
+    @staticmethod
+    def get_path(temp_path: str) -> str:
+        return f'{temp_path}{ChunkManifest.SUFFIX}'
+
+    @staticmethod
+    def exists(temp_path: str) -> bool:
+        return os.path.isfile(ChunkManifest.get_path(temp_path))
+
+    @staticmethod
+    def remove(temp_path: str) -> None:
+        try:
+            os.remove(ChunkManifest.get_path(temp_path))
+        except OSError:
+            pass
+
+    @staticmethod
+    def get_done_bytes(temp_path: str, total_chunks: int) -> Union[int, None]:
+        """只读地统计清单中已完成块的字节数,没有清单或清单与块数不一致时返回None。"""
+        size: int = ChunkManifest.RECORD.size
+        try:
+            with open(file=ChunkManifest.get_path(temp_path), mode='rb') as f:
+                data: bytes = f.read()
+        except OSError:
+            return None
+        if len(data) != total_chunks * size:
+            return None
+        return sum(
+            length for _, length, _, state in ChunkManifest.RECORD.iter_unpack(data)
+            if state != ChunkManifest.STATE_MISSING
+        )
+
+    def is_done(self, index: int) -> bool:
+        return self.records[index][3] != ChunkManifest.STATE_MISSING
+
+    def __write(self, index: int, record: Tuple[int, int, int, int]) -> None:
+        """只改写清单文件中对应的一条记录。"""
+        self.records[index] = record
+        self.__file.seek(index * ChunkManifest.RECORD.size)
+        self.__file.write(ChunkManifest.RECORD.pack(*record))
+        if time.monotonic() - self.__flushed >= ChunkManifest.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        self.__file.flush()
+        self.__flushed = time.monotonic()
+
+    def mark(self, index: int, offset: int, length: int, crc: Union[int, None] = None) -> None:
+        """记录块已写入,crc为None时表示由旧的缓存文件接管。"""
+        state: int = ChunkManifest.STATE_ADOPTED if crc is None else ChunkManifest.STATE_VERIFIED
+        self.__write(index, (offset, length, crc or 0, state))
+
+    def unmark(self, index: int) -> None:
+        self.__write(index, (0, 0, 0, ChunkManifest.STATE_MISSING))
+
+    def verify(self, temp_path: str) -> List[int]:
+        """重新校验每个已下载区间末尾的块,从末尾向前逐块校验直到连续VERIFY_TAIL个块通过。
+        校验失败的块标记为未下载并返回其序号,随后将缓存文件截断到最后一个已完成块的末尾。
+        """
+        invalid: List[int] = []
+        if not os.path.isfile(temp_path):
+            invalid = [i for i in range(self.total_chunks) if self.is_done(i)]
+            for i in invalid:
+                self.unmark(i)
+            return invalid
+        file_size: int = os.path.getsize(temp_path)
+        tails: List[int] = [
+            i for i in range(self.total_chunks)
+            if self.is_done(i) and (i + 1 == self.total_chunks or not self.is_done(i + 1))
+        ]
+        with open(file=temp_path, mode='rb') as f:
+            for tail in tails:
+                passed: int = 0
+                index: int = tail
+                while index >= 0 and self.is_done(index) and passed < ChunkManifest.VERIFY_TAIL:
+                    offset, length, crc, state = self.records[index]
+                    if state == ChunkManifest.STATE_VERIFIED:
+                        f.seek(offset)
+                        if offset + length > file_size or zlib.crc32(f.read(length)) != crc:
+                            invalid.append(index)
+                            self.unmark(index)
+                            passed = 0
+                            index -= 1
+                            continue
+                    passed += 1
+                    index -= 1
+        end: int = max((offset + length for offset, length, _, state in self.records
+                        if state != ChunkManifest.STATE_MISSING), default=0)
+        if file_size > end:
+            os.truncate(temp_path, end)
+        return sorted(invalid)
+
+    def missing(self) -> List[int]:
+        return [i for i in range(self.total_chunks) if not self.is_done(i)]
+
+    def done_count(self) -> int:
+        return self.total_chunks - len(self.missing())
+
+    def is_complete(self) -> bool:
+        return self.done_count() == self.total_chunks
+
+    def close(self) -> None:
+        try:
+            self.__file.close()
+        except Exception:
+            pass
+
+
+def get_total_chunks(file_size: int, chunk_size: int) -> int:
+    return max(math.ceil(file_size / chunk_size), 1)
+
+
+def get_chunk_length(index: int, file_size: int, chunk_size: int) -> int:
+    """获取第index个块的实际长度(最后一个块可能不足chunk_size)。"""
+    return max(min(chunk_size, file_size - index * chunk_size), 0)
+
+
+def split_segments(missing: List[int], segments: int) -> List[Tuple[int, int]]:
+    """将缺失的块拆分为若干个连续区间,返回[(起始块, 块数量), ...]。
+    每个区间的长度不超过缺失块总数/分段数,保证并发时各分段的工作量大致相同。
+    """
+    if not missing:
+        return []
+    segments: int = max(segments, 1)
+    max_length: int = max(math.ceil(len(missing) / segments), 1)
+    result: List[Tuple[int, int]] = []
+    start: Union[int, None] = None
+    count: int = 0
+    for index in missing:
+        if start is not None and index == start + count and count < max_length:
+            count += 1
+            continue
+        if start is not None:
+            result.append((start, count))
+        start, count = index, 1
+    result.append((start, count))
+    return result
@@ -37,6 +37,7 @@ from module import (
 )
 from module.language import _t
 from module.util import get_terminal_width
+from module.retention import RetainedSet
 from module.enums import (
     DownloadType,
     KeyWord,
@@ -47,10 +48,13 @@ from module.enums import (
 
 
 class StatisticalTable:
-    def __init__(self):
-        self.skip_video, self.skip_photo, self.skip_document, self.skip_audio, self.skip_voice, self.skip_animation = set(), set(), set(), set(), set(), set()
-        self.success_video, self.success_photo, self.success_document, self.success_audio, self.success_voice, self.success_animation = set(), set(), set(), set(), set(), set()
-        self.failure_video, self.failure_photo, self.failure_document, self.failure_audio, self.failure_voice, self.failure_animation = set(), set(), set(), set(), set(), set()
+    def __init__(self, maxlen: int = 10000):
+        # 成功与跳过只保留最近的文件名用于去重,避免长时间运行时内存持续增长,数量单独计数。
+        # 失败的文件在重试成功时需要移出并减少失败数量,因此完整保留(只包含仍为失败的文件)。
+        self.skip_video, self.skip_photo, self.skip_document, self.skip_audio, self.skip_voice, self.skip_animation = (RetainedSet(maxlen) for _ in range(6))
+        self.success_video, self.success_photo, self.success_document, self.success_audio, self.success_voice, self.success_animation = (RetainedSet(maxlen) for _ in range(6))
+        self.failure_video, self.failure_photo, self.failure_document, self.failure_audio, self.failure_voice, self.failure_animation = (set() for _ in range(6))
+        self.success_count, self.skip_count = ({dtype: 0 for dtype in DownloadType()} for _ in range(2))
 
     def print_count_table(
             self,
@@ -64,24 +68,24 @@ class StatisticalTable:
     ) -> Union[bool, None]:
         """打印统计的下载信息的表格。"""
         header: tuple = ('种类&状态', '成功下载', '失败下载', '跳过下载', '合计')
-        success_video: int = len(self.success_video)
+        success_video: int = self.success_count.get(DownloadType.VIDEO, 0)
         failure_video: int = len(self.failure_video)
-        skip_video: int = len(self.skip_video)
-        success_photo: int = len(self.success_photo)
+        skip_video: int = self.skip_count.get(DownloadType.VIDEO, 0)
+        success_photo: int = self.success_count.get(DownloadType.PHOTO, 0)
         failure_photo: int = len(self.failure_photo)
-        skip_photo: int = len(self.skip_photo)
-        success_document: int = len(self.success_document)
+        skip_photo: int = self.skip_count.get(DownloadType.PHOTO, 0)
+        success_document: int = self.success_count.get(DownloadType.DOCUMENT, 0)
         failure_document: int = len(self.failure_document)
-        skip_document: int = len(self.skip_document)
-        success_audio: int = len(self.success_audio)
+        skip_document: int = self.skip_count.get(DownloadType.DOCUMENT, 0)
+        success_audio: int = self.success_count.get(DownloadType.AUDIO, 0)
         failure_audio: int = len(self.failure_audio)
-        skip_audio: int = len(self.skip_audio)
-        success_voice: int = len(self.success_voice)
+        skip_audio: int = self.skip_count.get(DownloadType.AUDIO, 0)
+        success_voice: int = self.success_count.get(DownloadType.VOICE, 0)
         failure_voice: int = len(self.failure_voice)
-        skip_voice: int = len(self.skip_voice)
-        success_animation: int = len(self.success_animation)
+        skip_voice: int = self.skip_count.get(DownloadType.VOICE, 0)
+        success_animation: int = self.success_count.get(DownloadType.ANIMATION, 0)
         failure_animation: int = len(self.failure_animation)
-        skip_animation: int = len(self.skip_animation)
+        skip_animation: int = self.skip_count.get(DownloadType.ANIMATION, 0)
         total_video: int = sum([success_video, failure_video, skip_video])
         total_photo: int = sum([success_photo, failure_photo, skip_photo])
         total_document: int = sum([success_document, failure_document, skip_document])
@@ -165,7 +169,7 @@ class StatisticalTable:
                 except ZeroDivisionError:
                     rate = 0
                 complete_rate = f'{complete_num}/{member_num}[{rate}%]'
-                file_names: Union[set, str] = info.get('file_name', set())
+                file_names: Union[set, str] = set(info.get('file_name') or set())
                 error_msg = info.get('error_msg')
                 if not error_msg:
                     error_info = ''
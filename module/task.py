@@ -4,67 +4,176 @@
 # Time:2025/2/27 17:38
 # File:task.py
 import os
+import time
 import asyncio
 
 from functools import wraps
-from typing import Union
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Union
 
 import pyrogram
 
-from module import console, log, APPDATA_PATH, yaml, CustomDumper
+from module import console, log, APPDATA_PATH
 from module.language import _t
+from module.journal import TaskJournal
 from module.stdio import MetaData
 from module.enums import DownloadStatus, UploadStatus, KeyWord
 from module.util import canonical_link_str, canonical_link_message
 
 
-class DownloadTask:
-    LINK_INFO: dict = {}
-    COMPLETE_LINK: set = set()
-    _HISTORY_FILE: str = os.path.join(APPDATA_PATH, "download_history.yaml")
+class LinkRecord:
+    """单个下载链接的任务元数据,兼容字典式的get与下标访问。"""
+    __slots__ = (
+        "link", "link_type", "member_num", "complete_num", "file_name", "error_msg", "aliases"
+    )
+    KEYS: tuple = ("link_type", "member_num", "complete_num", "file_name", "error_msg")
 
-    @staticmethod
-    def _default_meta() -> dict:
-        return {
-            "link_type": None,
-            "member_num": 0,
-            "complete_num": 0,
-            "file_name": set(),
-            "error_msg": {},
-        }
+    def __init__(
+        self,
+        link: str,
+        link_type: Union[str, None] = None,
+        member_num: int = 0,
+        complete_num: int = 0,
+        file_name: Union[set, None] = None,
+        error_msg: Union[dict, None] = None,
+    ):
+        self.link: str = link
+        self.link_type: Union[str, None] = link_type
+        self.member_num: int = member_num
+        self.complete_num: int = complete_num
+        self.file_name: set = file_name if file_name is not None else set()
+        self.error_msg: dict = error_msg if error_msg is not None else {}
+        self.aliases: Union[list, None] = None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in LinkRecord.KEYS else default
+
+    def __getitem__(self, key: str):
+        if key not in LinkRecord.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in LinkRecord.KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def setdefault(self, key: str, default=None):
+        value = self.get(key)
+        if value is None:
+            self[key] = default
+            return default
+        return value
+
+    def add_file_name(self, file_name: str) -> int:
+        """记录已完成的文件并同步更新完成数,返回当前完成数。"""
+        if not isinstance(self.file_name, set):
+            # 兼容性保护：如果被意外写成了列表，转换为集合
+            self.file_name = set(self.file_name or [])
+        self.file_name.add(file_name)
+        self.complete_num = len(self.file_name)
+        return self.complete_num
+
+
+class LinkIndex:
+    """以规范化链接为主键的任务元数据索引,别名(如消息ID)单独存放,遍历时只返回主键记录。
+    已结束的记录超过保留数量或保留时间后移出内存,遍历时再通过loader从任务日志中按需读取。
+    """
+
+    def __init__(self, max_records: int = 10000, max_age: float = 24 * 3600):
+        self.records: Dict[str, LinkRecord] = {}
+        self.aliases: dict = {}
+        self.finished: OrderedDict = OrderedDict()  # 已结束的链接 -> 结束时间。
+        self.max_records: int = max_records
+        self.max_age: float = max_age
+        self.evicted: int = 0
+        self.since: float = time.time()
+        self.loader: Union[Callable[[float, "LinkIndex"], Iterable], None] = None
+
+    def resolve(self, key) -> Union[LinkRecord, None]:
+        record: Union[LinkRecord, None] = self.records.get(key)
+        if record is None and key in self.aliases:
+            record = self.records.get(self.aliases.get(key))
+        return record
+
+    def create(self, link: str, **fields) -> LinkRecord:
+        record = LinkRecord(link=link, **fields)
+        self.records[link] = record
+        return record
+
+    def setdefault(self, key) -> LinkRecord:
+        record: Union[LinkRecord, None] = self.resolve(key)
+        return record if record is not None else self.create(key)
+
+    def alias(self, alias_key, primary_key) -> None:
+        record: Union[LinkRecord, None] = self.records.get(primary_key)
+        if record is not None:
+            self.aliases[alias_key] = primary_key
+            if record.aliases is None:
+                record.aliases = []
+            record.aliases.append(alias_key)
+
+    def finish(self, link: str) -> None:
+        """标记记录已结束(完成或确认失败),并移出超过保留数量或保留时间的记录。"""
+        if link not in self.records:
+            return None
+        self.finished[link] = time.time()
+        self.finished.move_to_end(link)
+        self.evict()
+
+    def evict(self) -> None:
+        deadline: float = time.time() - self.max_age
+        while self.finished:
+            link, finish_time = next(iter(self.finished.items()))
+            if len(self.finished) <= self.max_records and finish_time >= deadline:
+                break
+            self.finished.popitem(last=False)
+            record: Union[LinkRecord, None] = self.records.pop(link, None)
+            if record is not None:
+                for alias_key in record.aliases or []:
+                    if self.aliases.get(alias_key) == link:
+                        self.aliases.pop(alias_key, None)
+                self.evicted += 1
+
+    def get(self, key, default=None):
+        record: Union[LinkRecord, None] = self.resolve(key)
+        return record if record is not None else default
+
+    def items(self):
+        """先按需从任务日志读取已移出内存的记录,再返回内存中的记录。"""
+        if self.evicted and self.loader is not None:
+            yield from self.loader(self.since, self)
+        yield from list(self.records.items())
+
+    def __contains__(self, key) -> bool:
+        return self.resolve(key) is not None
+
+    def __getitem__(self, key) -> LinkRecord:
+        record: Union[LinkRecord, None] = self.resolve(key)
+        if record is None:
+            raise KeyError(key)
+        return record
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+class DownloadTask:
+    LINK_INFO: LinkIndex = LinkIndex()
+    _HISTORY_FILE: str = os.path.join(APPDATA_PATH, "download_history.yaml")  # 旧版下载历史,仅用于迁移。
+    JOURNAL: TaskJournal = TaskJournal(os.path.join(APPDATA_PATH, TaskJournal.FILE_NAME))
 
     @staticmethod
     def _load_history() -> None:
-        try:
-            if os.path.isfile(DownloadTask._HISTORY_FILE):
-                with open(
-                    file=DownloadTask._HISTORY_FILE, mode="r", encoding="UTF-8"
-                ) as f:
-                    data = yaml.safe_load(f) or {}
-                items = data.get("complete_links") or []
-                if isinstance(items, list):
-                    normalized = []
-                    for it in items:
-                        s = str(it)
-                        # 加载历史时也进行标准化，提升跨版本兼容性
-                        try:
-                            s = canonical_link_str(s)
-                        except Exception:
-                            pass
-                        normalized.append(s)
-                    DownloadTask.COMPLETE_LINK.update(normalized)
-        except Exception:
-            pass
+        """首次运行时将download_history.yaml中的已完成链接迁移至任务日志。"""
+        DownloadTask.JOURNAL.migrate_yaml(
+            yaml_path=DownloadTask._HISTORY_FILE, canonical=canonical_link_str
+        )
 
     @staticmethod
-    def _save_history() -> None:
-        try:
-            os.makedirs(APPDATA_PATH, exist_ok=True)
-            payload = {"complete_links": sorted(list(DownloadTask.COMPLETE_LINK))}
-            with open(file=DownloadTask._HISTORY_FILE, mode="w", encoding="UTF-8") as f:
-                yaml.dump(payload, f, Dumper=CustomDumper)
-        except Exception:
-            pass
+    def is_complete(link: str) -> bool:
+        """通过任务日志的索引查询规范化链接是否已下载完成。"""
+        return DownloadTask.JOURNAL.is_complete(link)
 
     def __init__(
         self,
@@ -75,25 +184,20 @@ class DownloadTask:
         file_name: set,
         error_msg: dict,
     ):
-        DownloadTask.LINK_INFO[link] = {
-            "link_type": link_type,
-            "member_num": member_num,
-            "complete_num": complete_num,
-            "file_name": file_name,
-            "error_msg": error_msg,
-        }
+        DownloadTask.LINK_INFO.create(
+            link,
+            link_type=link_type,
+            member_num=member_num,
+            complete_num=complete_num,
+            file_name=file_name,
+            error_msg=error_msg,
+        )
 
     def on_create_task(func):
         @wraps(func)
         async def wrapper(self, *args, **kwargs):
             message_ids = kwargs.get("message_ids")
-            link = message_ids
-            if isinstance(message_ids, pyrogram.types.Message):
-                # 统一使用规范化的任务键
-                link = canonical_link_message(message_ids)
-            elif isinstance(message_ids, str):
-                # 统一标准化字符串链接（保留 single/comment 语义）
-                link = canonical_link_str(message_ids)
+            link = DownloadTask.get_key(message_ids)
             DownloadTask(
                 link=link,
                 link_type=None,
@@ -120,6 +224,8 @@ class DownloadTask:
             e_code = res.get("e_code")
             if status == DownloadStatus.FAILURE:
                 DownloadTask.set(link=link, key="error_msg", value=e_code)
+                DownloadTask.remove_pending(link)  # 无法解析的链接重启后也无法下载。
+                DownloadTask.LINK_INFO.finish(link)
                 reason: str = e_code.get("error_msg")
                 if reason:
                     log.error(
@@ -147,14 +253,8 @@ class DownloadTask:
             if all(i is None for i in res):
                 return None
             link, file_name = res
-            DownloadTask.add_file_name(link=link, file_name=file_name)
-            for i in DownloadTask.LINK_INFO.items():
-                compare_link: str = i[0]
-                info: dict = i[1]
-                if compare_link == link:
-                    info["complete_num"] = len(info.get("file_name"))
+            complete_num: int = DownloadTask.add_file_name(link=link, file_name=file_name)
             all_num: int = DownloadTask.get(link=link, key="member_num")
-            complete_num: int = DownloadTask.get(link=link, key="complete_num")
             if all_num == complete_num:
                 console.log(
                     f"{_t(KeyWord.DOWNLOAD_TASK)}"
@@ -162,54 +262,185 @@ class DownloadTask:
                     f"{_t(KeyWord.STATUS)}:{_t(DownloadStatus.SUCCESS)}。"
                 )
                 DownloadTask.set(link=link, key="error_msg", value={})
-                DownloadTask.COMPLETE_LINK.add(link)
+                DownloadTask.JOURNAL.complete_link(link)
+                DownloadTask.remove_pending(link)
+                DownloadTask.LINK_INFO.finish(link)
                 asyncio.create_task(self.done_notice(f'"{link}"已下载完成。'))
-                try:
-                    DownloadTask._save_history()
-                except Exception:
-                    pass
+            else:
+                DownloadTask.update_pending(link, attempts=0)  # 有进展的任务重新计算恢复失败次数。
             return res
 
         return wrapper
 
     @staticmethod
-    def add_file_name(link, file_name):
-        meta = DownloadTask.LINK_INFO.setdefault(link, DownloadTask._default_meta())
-        files = meta.get("file_name")
-        if isinstance(files, set):
-            files.add(file_name)
+    def get_key(message_ids: Union[pyrogram.types.Message, str]):
+        """获取任务的规范化键,与LINK_INFO及任务日志中的键一致。"""
+        if isinstance(message_ids, pyrogram.types.Message):
+            # 统一使用规范化的任务键
+            return canonical_link_message(message_ids)
+        elif isinstance(message_ids, str):
+            # 统一标准化字符串链接（保留 single/comment 语义）
+            return canonical_link_str(message_ids)
+        return message_ids
+
+    @staticmethod
+    def add_pending(
+        message_ids: Union[pyrogram.types.Message, str],
+        source: str,
+        retry: Union[dict, None] = None,
+        single_link: bool = False,
+        with_upload: Union[dict, None] = None,
+        diy_download_type: Union[list, None] = None,
+        request_chat_id: Union[int, None] = None,
+        tag: Union[str, None] = None,
+    ) -> str:
+        """持久化已接受的任务,进程意外退出后可在下次启动时恢复。"""
+        key: str = DownloadTask.get_key(message_ids)
+        if isinstance(message_ids, pyrogram.types.Message):
+            link = getattr(message_ids, "link", None)
+            chat_id = getattr(getattr(message_ids, "chat", None), "id", None)
+            message_id = getattr(message_ids, "id", None)
         else:
-            # 兼容性保护：如果被意外写成了列表，转换为集合
-            new_set = set(files or [])
-            new_set.add(file_name)
-            meta["file_name"] = new_set
+            link, chat_id, message_id = message_ids, None, None
+        DownloadTask.JOURNAL.add_pending(
+            key,
+            source=source,
+            link=link,
+            chat_id=str(chat_id) if chat_id is not None else None,
+            message_id=message_id,
+            single_link=int(bool(single_link)),
+            tag=tag,
+            with_upload=with_upload,
+            diy_download_type=diy_download_type,
+            request_chat_id=request_chat_id,
+            retry=retry,
+        )
+        return key
+
+    @staticmethod
+    def update_pending(link: str, **fields) -> None:
+        DownloadTask.JOURNAL.update_pending(link, **fields)
+
+    @staticmethod
+    def add_pending_attempt(link: str) -> None:
+        DownloadTask.JOURNAL.add_pending_attempt(link)
+
+    @staticmethod
+    def drop_pending(link: str) -> None:
+        DownloadTask.JOURNAL.drop_pending(link)
+
+    @staticmethod
+    def remove_pending(link: str) -> None:
+        DownloadTask.JOURNAL.remove_pending(link)
+
+    @staticmethod
+    def set_pending_temp(link: str, message_id: Union[int, None], temp_path: str) -> None:
+        DownloadTask.JOURNAL.set_pending_temp(link, message_id, temp_path)
+
+    @staticmethod
+    def set_pending_retry(link: str, message_id: Union[int, None], retry: dict) -> None:
+        DownloadTask.JOURNAL.set_pending_retry(link, message_id, retry)
+
+    @staticmethod
+    def load_pending_retries(link: str) -> dict:
+        return DownloadTask.JOURNAL.load_pending_retries(link)
+
+    @staticmethod
+    def is_pending(link: str) -> bool:
+        """通过任务日志查询规范化链接是否已接受但未完成。"""
+        return DownloadTask.JOURNAL.is_pending(link)
+
+    @staticmethod
+    def get_pending_tag(link: str) -> Union[str, None]:
+        """从任务日志中读取提交任务时记录的标签。"""
+        return DownloadTask.JOURNAL.get_pending_tag(link)
+
+    @staticmethod
+    def get_sync_mark(chat_id: Union[str, int], filter_hash: str) -> int:
+        return DownloadTask.JOURNAL.get_sync_mark(chat_id, filter_hash)
+
+    @staticmethod
+    def set_sync_mark(chat_id: Union[str, int], filter_hash: str, max_id: int) -> None:
+        DownloadTask.JOURNAL.set_sync_mark(chat_id, filter_hash, max_id)
+
+    @staticmethod
+    def set_retention(max_records: int, max_age: float) -> None:
+        DownloadTask.LINK_INFO.max_records = max_records
+        DownloadTask.LINK_INFO.max_age = max_age
+
+    @staticmethod
+    def _load_evicted(since: float, index: LinkIndex):
+        """从任务日志中读取本次运行期间已移出内存的链接记录。"""
+        for row in DownloadTask.JOURNAL.load_links(since=since):
+            link: str = row.get("link")
+            if link in index.records:
+                continue
+            yield link, LinkRecord(
+                link=link,
+                link_type=row.get("link_type"),
+                member_num=row.get("member_num") or 0,
+                complete_num=row.get("complete_num") or 0,
+                file_name=set(row.get("file_name") or []),
+                error_msg=row.get("error_msg") or {},
+            )
+
+    @staticmethod
+    def load_pending(dropped: bool = False) -> list:
+        return DownloadTask.JOURNAL.load_pending(dropped=dropped)
+
+    @staticmethod
+    def add_file_name(link, file_name) -> int:
+        """记录已完成的文件,返回该链接当前的完成数。"""
+        record: LinkRecord = DownloadTask.LINK_INFO.setdefault(link)
+        complete_num: int = record.add_file_name(file_name)
+        DownloadTask.JOURNAL.update_file(
+            link, file_name, status=DownloadStatus.SUCCESS, error_msg=None
+        )
+        DownloadTask.JOURNAL.update_link(link, complete_num=complete_num)
+        return complete_num
 
     @staticmethod
     def get(link: str, key: str) -> Union[str, int, set, dict, None]:
-        return DownloadTask.LINK_INFO.get(link, {}).get(key)
+        record: Union[LinkRecord, None] = DownloadTask.LINK_INFO.resolve(link)
+        return record.get(key) if record is not None else None
 
     @staticmethod
     def set(link: str, key: str, value):
-        meta = DownloadTask.LINK_INFO.setdefault(link, DownloadTask._default_meta())
-        meta[key] = value
+        DownloadTask.LINK_INFO.setdefault(link)[key] = value
+        if key in ("link_type", "member_num", "complete_num"):
+            DownloadTask.JOURNAL.update_link(link, **{key: value})
+        elif key == "error_msg" and value:
+            DownloadTask.JOURNAL.update_link(
+                link, status=DownloadStatus.FAILURE, error_msg=value
+            )
 
     @staticmethod
     def set_error(link: str, value, key: Union[str, None] = None):
-        meta = DownloadTask.LINK_INFO.setdefault(link, DownloadTask._default_meta())
-        errs = meta.setdefault("error_msg", {})
+        errs = DownloadTask.LINK_INFO.setdefault(link).setdefault("error_msg", {})
         errs[key if key else "all_member"] = value
+        if key:
+            DownloadTask.JOURNAL.update_file(
+                link, key, status=DownloadStatus.FAILURE, error_msg=value
+            )
+        DownloadTask.JOURNAL.update_link(link, error_msg=errs)
+
+    @staticmethod
+    def set_file(link: str, file_name: str, **fields) -> None:
+        """记录单个文件的下载进度(file_id、size、downloaded、status)。"""
+        DownloadTask.JOURNAL.update_file(link, file_name, **fields)
 
     @staticmethod
     def alias(alias_key, primary_key) -> None:
         """将别名键映射到同一任务元数据对象。"""
         try:
-            if primary_key in DownloadTask.LINK_INFO:
-                DownloadTask.LINK_INFO[alias_key] = DownloadTask.LINK_INFO[primary_key]
+            DownloadTask.LINK_INFO.alias(alias_key=alias_key, primary_key=primary_key)
         except Exception:
             pass
 
 
-# 预加载历史已完成链接
+DownloadTask.LINK_INFO.loader = DownloadTask._load_evicted
+
+# 迁移旧版下载历史
 try:
     DownloadTask._load_history()
 except Exception:
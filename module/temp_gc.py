@@ -0,0 +1,183 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 00:20
+# File:temp_gc.py
+import os
+import time
+import asyncio
+import itertools
+
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+from module import log
+from module.language import _t
+from module.enums import KeyWord
+from module.journal import TaskJournal
+from module.path_tool import safe_delete
+from module.stdio import MetaData
+
+
+class TempCollector:
+    """缓存目录的后台清理。
+    1.每轮扫描缓存目录(包含temp/<chat_id>/一层子目录)中的.temp与.temp.manifest文件,建立缓存文件到任务的索引。
+    2.正在下载(已预留磁盘空间)或任务日志中未完成的任务对应的缓存文件不会被删除,再次下载时用于断点续传。
+    3.其余文件视为孤立文件,超过max_age秒未修改的被删除;孤立文件总大小超过max_size时,从最旧的开始删除。
+    4.扫描与删除在线程中分批进行,每批最多BATCH个文件,即使目录中有大量文件也不会阻塞事件循环。
+    5.第一次启用清理前已存在的文件可能属于旧版本未记录缓存文件的任务,不会被清理。
+    """
+    SUFFIXES: Tuple[str, ...] = ('.temp.manifest', '.temp')
+    BATCH: int = 512
+    MAX_DEPTH: int = 1
+
+    def __init__(
+            self,
+            directories: Callable[[], Iterable[str]],
+            journal: TaskJournal,
+            active: Callable[[], Iterable[str]],
+            max_age: float,
+            max_size: int,
+            interval: float
+    ):
+        self.directories: Callable[[], Iterable[str]] = directories  # 返回所有缓存目录。
+        self.journal: TaskJournal = journal
+        self.active: Callable[[], Iterable[str]] = active  # 返回正在下载的缓存文件。
+        self.max_age: float = max(max_age or 0, 0)  # 为0时不按时间清理。
+        self.max_size: int = max(max_size or 0, 0)  # 为0时不按大小清理。
+        self.interval: float = max(interval or 600, 60)
+        self.index: Dict[str, Tuple[int, float]] = {}  # 缓存文件:(大小,修改时间)。
+        self.owners: Dict[str, str] = {}  # 缓存文件(不含后缀):所属任务的链接。
+        self.deleted_count: int = 0
+        self.deleted_bytes: int = 0
+        self.since: float = self.__load_since()  # 第一次启用清理的时间。
+
+    @staticmethod
+    def __key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def __load_since(self) -> float:
+        since: Union[str, None] = self.journal.get_meta('temp_gc_since')
+        if since is None:
+            since = str(time.time())
+            self.journal.set_meta('temp_gc_since', since)
+        return float(since)
+
+    @staticmethod
+    def get_base(path: str) -> Union[str, None]:
+        """去掉缓存文件的后缀,不是缓存文件时返回None。"""
+        for suffix in TempCollector.SUFFIXES:
+            if path.endswith(suffix):
+                return path[:-len(suffix)]
+        return None
+
+    @staticmethod
+    def walk(directory: str, depth: int = 0) -> Iterator[Tuple[str, int, float]]:
+        """逐个产生目录中的缓存文件(路径,大小,修改时间)。"""
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if depth < TempCollector.MAX_DEPTH:
+                                yield from TempCollector.walk(entry.path, depth + 1)
+                            continue
+                        if TempCollector.get_base(entry.name) is None:
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime
+        except OSError:
+            return None
+
+    @staticmethod
+    def take(iterator: Iterator, n: int) -> list:
+        return list(itertools.islice(iterator, n))
+
+    def __load_owners(self) -> Dict[str, str]:
+        owners: Dict[str, str] = {}
+        for key, temp_path in self.journal.load_pending_temps():
+            if temp_path:
+                owners[TempCollector.__key(TempCollector.get_base(temp_path) or temp_path)] = key
+        for path in list(self.active()):
+            owners[TempCollector.__key(TempCollector.get_base(path) or path)] = 'active'
+        return owners
+
+    def is_orphan(self, path: str) -> bool:
+        return TempCollector.__key(TempCollector.get_base(path) or path) not in self.owners
+
+    async def scan(self) -> None:
+        """分批重建缓存文件索引。"""
+        loop = asyncio.get_running_loop()
+        index: Dict[str, Tuple[int, float]] = {}
+        directories: set = {TempCollector.__key(_) for _ in self.directories() if _}
+        for directory in directories:
+            iterator: Iterator[Tuple[str, int, float]] = TempCollector.walk(directory)
+            while True:
+                batch: list = await loop.run_in_executor(None, TempCollector.take, iterator, TempCollector.BATCH)
+                for path, size, mtime in batch:
+                    index[path] = (size, mtime)
+                if len(batch) < TempCollector.BATCH:
+                    break
+        self.index = index
+        self.owners = self.__load_owners()
+
+    def select(self, now: float) -> List[str]:
+        """选出需要删除的孤立文件。"""
+        orphans: List[Tuple[str, int, float]] = sorted(
+            (
+                (path, size, mtime) for path, (size, mtime) in self.index.items()
+                if mtime >= self.since and self.is_orphan(path)
+            ),
+            key=lambda x: x[2]
+        )
+        total: int = sum(size for _, size, _ in orphans)
+        selected: List[str] = []
+        for path, size, mtime in orphans:
+            expired: bool = bool(self.max_age) and now - mtime > self.max_age
+            over: bool = bool(self.max_size) and total > self.max_size
+            if not expired and not over:
+                continue
+            selected.append(path)
+            total -= size
+        return selected
+
+    @staticmethod
+    def delete(paths: List[str]) -> List[str]:
+        return [path for path in paths if safe_delete(path)]
+
+    async def collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        await self.scan()
+        selected: List[str] = self.select(time.time())
+        if not selected:
+            return None
+        # 删除前重新读取任务,扫描期间开始下载的文件不会被删除。
+        self.owners = self.__load_owners()
+        selected = [path for path in selected if self.is_orphan(path)]
+        deleted: List[str] = []
+        for i in range(0, len(selected), TempCollector.BATCH):
+            deleted.extend(
+                await loop.run_in_executor(None, TempCollector.delete, selected[i:i + TempCollector.BATCH])
+            )
+        size: int = sum(self.index.pop(path)[0] for path in deleted)
+        self.deleted_count += len(deleted)
+        self.deleted_bytes += size
+        if deleted:
+            log.info(
+                f'已清理{len(deleted)}个孤立的缓存文件,释放空间:{MetaData.suitable_units_display(size)},'
+                f'剩余缓存文件:{len(self.index)}个。'
+            )
+
+    async def run(self) -> None:
+        log.info(
+            f'已启用缓存文件清理,每隔{int(self.interval)}秒检查一次,'
+            f'保留时间:{int(self.max_age // 3600)}小时,'
+            f'孤立文件上限:{MetaData.suitable_units_display(self.max_size) if self.max_size else "不限"}。'
+        )
+        while True:
+            try:
+                await self.collect()
+            except Exception as e:
+                log.warning(f'清理缓存文件时出错,{_t(KeyWord.REASON)}:"{e}"')
+            await asyncio.sleep(self.interval)
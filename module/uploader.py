@@ -17,6 +17,7 @@ from typing import (
 
 import pyrogram
 from pyrogram import raw, utils
+from pyrogram.errors.exceptions.bad_request_400 import BadRequest
 from pymediainfo import MediaInfo
 
 from module import console, log
@@ -24,6 +25,9 @@ from module.language import _t
 
 from module.stdio import MetaData
 from module.task import UploadTask
+from module.journal import TaskJournal
+from module.peer_cache import PeerCache
+from module.part_uploader import PartUploader
 from module.path_tool import get_mime_from_extension
 
 from module.path_tool import (
@@ -51,7 +55,9 @@ class TelegramUploader:
             progress,
             max_upload_task: int = 3,
             max_retry_count: int = 3,
-            notify: Optional[Callable] = None
+            notify: Optional[Callable] = None,
+            journal: Optional[TaskJournal] = None,
+            upload_workers: int = 4
     ):
         self.client: pyrogram.Client = client
         self.loop = loop
@@ -62,6 +68,10 @@ class TelegramUploader:
         self.max_retry_count = max_retry_count
         self.is_premium: bool = is_premium
         self.notify: Callable = notify
+        # 传入任务日志时大文件使用分片并发上传,重试或重启后从缺少的分片继续。
+        self.part_uploader: Union[PartUploader, None] = (
+            PartUploader(client=client, journal=journal, workers=upload_workers) if journal else None
+        )
 
     async def send_media(
             self,
@@ -72,13 +82,27 @@ class TelegramUploader:
             progress: Callable = None,
             progress_args: tuple = ()
     ):
-        file = await self.client.save_file(
-            path=path,
-            file_id=file_id,
-            file_part=file_part,
-            progress=progress,
-            progress_args=progress_args
+        part_upload: bool = (
+                self.part_uploader is not None
+                and isinstance(path, str)
+                and not file_id
+                and PartUploader.is_big(os.path.getsize(path))
         )
+        if part_upload:
+            file = await self.part_uploader.upload(
+                path=path,
+                chat_id=chat_id,
+                progress=progress,
+                progress_args=progress_args
+            )
+        else:
+            file = await self.client.save_file(
+                path=path,
+                file_id=file_id,
+                file_part=file_part,
+                progress=progress,
+                progress_args=progress_args
+            )
 
         file_path: Union[str, None] = getattr(file, 'name', '')
         if not file_path:
@@ -115,20 +139,30 @@ class TelegramUploader:
                 force_file=False,  # 不要强制作为文件发送。
                 thumb=None  # 缩略图。
             )
-        peer = await self.client.resolve_peer(chat_id)
-        r = await self.client.invoke(
-            raw.functions.messages.SendMedia(
-                peer=peer,
-                media=media,
-                random_id=self.client.rnd_id(),
-                **await utils.parse_text_entities(
-                    self.client,
-                    text='',
-                    parse_mode=None,
-                    entities=None
+        peer = await PeerCache.resolve_peer(self.client, chat_id)
+        try:
+            r = await self.client.invoke(
+                raw.functions.messages.SendMedia(
+                    peer=peer,
+                    media=media,
+                    random_id=self.client.rnd_id(),
+                    **await utils.parse_text_entities(
+                        self.client,
+                        text='',
+                        parse_mode=None,
+                        entities=None
+                    )
                 )
             )
-        )
+        except PeerCache.INVALID_ERRORS:
+            PeerCache.invalidate(chat_id)
+            raise
+        except BadRequest as e:
+            if part_upload and 'FILE_PART' in str(getattr(e, 'ID', None) or e).upper():
+                self.part_uploader.discard(path, chat_id)  # 服务器上的分片已失效,重试时从头上传。
+            raise
+        if part_upload:
+            self.part_uploader.discard(path, chat_id)
         return await utils.parse_messages(self.client, r)
 
     @staticmethod
@@ -6,7 +6,7 @@
 import os
 import re
 
-from typing import Tuple, List, Union
+from typing import Dict, Iterable, Tuple, List, Union
 
 import pyrogram
 from pyrogram import utils
@@ -18,11 +18,15 @@ from pyrogram.types.messages_and_media import ReplyParameters
 from urllib.parse import parse_qs, urlparse
 from rich.text import Text
 
+from module import log
 from module.enums import (
     Link,
     LinkType,
+    KeyWord,
     DownloadType
 )
+from module.language import _t
+from module.peer_cache import PeerCache
 
 
 def safe_index(lst: list, index: int, default=None):
@@ -64,10 +68,10 @@ async def parse_link(client: pyrogram.Client, link: str) -> dict:
     try:
         link = extract_info_from_link(link)
         if link.comment_id:
-            chat = await client.get_chat(link.group_id)
-            if chat:
+            info: dict = await PeerCache.get_info(client, link.group_id)
+            if info.get("linked_chat_id"):
                 return {
-                    "chat_id": chat.linked_chat.id,
+                    "chat_id": info.get("linked_chat_id"),
                     "comment_id": link.comment_id,
                     "topic_id": link.topic_id,
                 }
@@ -192,12 +196,11 @@ def canonical_link_message(message: pyrogram.types.Message) -> str:
         return f"msg:{getattr(message, 'id', 'unknown')}"
 
 
-async def get_message_by_link(
-    client: pyrogram.Client,
+def parse_message_link(
     link: str,
-    single_link: bool = False,  # 为True时,将每个链接都视作是单文件。
-) -> Union[dict, None]:
-    origin_link: str = link
+    single_link: bool = False
+) -> Tuple[Union[int, str], int, bool, set]:
+    """解析消息链接,返回(chat_id,message_id,是否视作单文件,链接类型集合(COMMENT、TOPIC))。"""
     record_type: set = set()
     link: str = link[:-1] if link.endswith("/") else link
     if "?single&comment" in link:  # v1.1.0修复讨论组中附带?single时不下载的问题。
@@ -228,7 +231,16 @@ async def get_message_by_link(
         chat_id = utils.get_channel_id(int(match.group(1)))
     except ValueError:
         chat_id = match.group(1)
-    message_id: int = int(match.group(2))
+    return chat_id, int(match.group(2)), single_link, record_type
+
+
+async def get_message_by_link(
+    client: pyrogram.Client,
+    link: str,
+    single_link: bool = False,  # 为True时,将每个链接都视作是单文件。
+) -> Union[dict, None]:
+    origin_link: str = link
+    chat_id, message_id, single_link, record_type = parse_message_link(link, single_link)
     comment_message: list = []
     if LinkType.COMMENT in record_type:
         # 如果用户需要同时下载媒体下面的评论,把评论中的所有信息放入列表一起返回。
@@ -297,6 +309,98 @@ async def __is_group(message) -> Tuple[Union[bool, None], Union[list, None]]:
         return None, None
 
 
+async def get_messages_by_ids(
+        client: pyrogram.Client,
+        chat_id: Union[int, str],
+        message_ids: Iterable[int],
+        batch_size: int = 200
+) -> Dict[int, pyrogram.types.Message]:
+    """分批获取同一频道的多条消息,每次get_messages最多获取batch_size条,返回消息id与消息的映射,已删除的消息不在结果中。"""
+    message_ids: list = list(dict.fromkeys(message_ids))
+    result: Dict[int, pyrogram.types.Message] = {}
+    for i in range(0, len(message_ids), batch_size):
+        messages = await client.get_messages(chat_id=chat_id, message_ids=message_ids[i:i + batch_size])
+        for message in messages if isinstance(messages, list) else [messages]:
+            if message and not getattr(message, 'empty', False):
+                result[message.id] = message
+    return result
+
+
+def group_links_by_chat(
+        links: Iterable[str],
+        single_link: bool = False
+) -> Dict[Union[str, int], Dict[int, list]]:
+    """将消息链接按频道分组,返回chat_id:{message_id:[(链接,是否为单文件链接,是否为话题链接)]},评论区链接与无法解析的链接不在结果中。"""
+    chats: Dict[Union[str, int], Dict[int, list]] = {}
+    for link in links:
+        try:
+            chat_id, message_id, _single_link, record_type = parse_message_link(link, single_link)
+        except ValueError:
+            continue
+        if LinkType.COMMENT in record_type:
+            continue
+        chats.setdefault(chat_id, {}).setdefault(message_id, []).append(
+            (link, _single_link, LinkType.TOPIC in record_type)
+        )
+    return chats
+
+
+async def get_chat_messages_by_links(
+        client: pyrogram.Client,
+        chat_id: Union[int, str],
+        id_map: Dict[int, list],
+        batch_size: int = 200
+) -> Dict[str, dict]:
+    """批量解析同一频道的消息链接,id_map为group_links_by_chat中该频道的结果,媒体组按media_group_id只获取一次。"""
+    result: Dict[str, dict] = {}
+    groups: dict = {}  # media_group_id:媒体组消息列表。
+    messages: dict = await get_messages_by_ids(client, chat_id, id_map.keys(), batch_size)
+    for message_id, message in messages.items():
+        media_group_id = getattr(message, 'media_group_id', None)
+        for link, _single_link, is_topic in id_map.get(message_id, []):
+            if _single_link or not media_group_id:
+                result[link] = {
+                    "link_type": LinkType.TOPIC if is_topic else LinkType.SINGLE,
+                    "chat_id": chat_id,
+                    "message": message,
+                    "member_num": 1,
+                }
+                continue
+            if media_group_id not in groups:
+                try:
+                    groups[media_group_id] = await message.get_media_group()
+                except ValueError:
+                    groups[media_group_id] = None
+            if not groups[media_group_id]:
+                continue
+            result[link] = {
+                "link_type": LinkType.TOPIC if is_topic else LinkType.GROUP,
+                "chat_id": chat_id,
+                "message": list(groups[media_group_id]),
+                "member_num": len(groups[media_group_id]),
+            }
+    return result
+
+
+async def get_messages_by_links(
+        client: pyrogram.Client,
+        links: Iterable[str],
+        single_link: bool = False,
+        batch_size: int = 200
+) -> Dict[str, dict]:
+    """批量解析消息链接,按频道分组,每次get_messages最多获取batch_size条消息(接口上限为200条)。
+    返回链接与解析结果(与get_message_by_link相同)的映射,评论区链接、已删除的消息或解析失败的链接不在结果中,由调用方逐条解析。
+    某个频道解析失败时只跳过该频道的链接。
+    """
+    result: Dict[str, dict] = {}
+    for chat_id, id_map in group_links_by_chat(links, single_link).items():
+        try:
+            result.update(await get_chat_messages_by_links(client, chat_id, id_map, batch_size))
+        except Exception as e:
+            log.warning(f'批量解析频道"{chat_id}"的链接失败,将逐条解析,{_t(KeyWord.REASON)}:"{e}"')
+    return result
+
+
 async def get_chat_with_notify(
     user_client: pyrogram.Client,
     chat_id: Union[int, str],
@@ -305,7 +409,7 @@ async def get_chat_with_notify(
     bot_message: Union[pyrogram.types.Message] = None,
 ) -> Union[pyrogram.types.Chat, None]:
     try:
-        chat = await user_client.get_chat(chat_id)
+        chat = await PeerCache.get_chat(user_client, chat_id)
         return chat
     except UsernameNotOccupied:
         if all([bot_client, bot_message]):
@@ -0,0 +1,148 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 23:25
+# File:volume.py
+import os
+
+from typing import Callable, Dict, Optional, Union
+
+from module import log
+from module.enums import SaveDirectoryPrefix
+
+
+class VolumeMap:
+    """按设备放置缓存目录,使下载完成后移动到保存路径只需一次rename。
+    缓存目录与保存路径不在同一设备(如Docker中分别挂载的/opt/trmd/temp与/data)时,
+    在保存路径所在设备上使用"保存路径/.trmd_temp"作为该设备的缓存目录。
+    """
+    TEMP_NAME: str = '.trmd_temp'
+    BLOCK_SIZE: int = 64 * 1024 * 1024  # 跨设备复制时每次复制的字节数。
+
+    def __init__(self, temp_directory: str, save_directory: Union[str, None], per_volume: bool = True):
+        self.temp_directory: str = temp_directory
+        self.per_volume: bool = per_volume
+        self.temp_device: Union[int, None] = VolumeMap.get_device(temp_directory)
+        self.save_root: Union[str, None] = VolumeMap.get_save_root(save_directory)
+        self.directories: Dict[int, str] = {}  # 设备:该设备上的缓存目录。
+        self.resolved: Dict[str, str] = {}  # 保存路径:缓存目录。
+        if self.temp_device is not None:
+            self.directories[self.temp_device] = temp_directory
+        save_device: Union[int, None] = VolumeMap.get_device(self.save_root) if self.save_root else None
+        if save_device is not None and save_device != self.temp_device:
+            if per_volume:
+                self.directories[save_device] = os.path.join(self.save_root, VolumeMap.TEMP_NAME)
+                log.info(
+                    f'缓存目录"{temp_directory}"与保存路径"{self.save_root}"不在同一设备,'
+                    f'下载时将使用"{self.directories[save_device]}"作为缓存目录。'
+                )
+            else:
+                log.warning(
+                    f'缓存目录"{temp_directory}"与保存路径"{self.save_root}"不在同一设备,'
+                    f'下载完成后需要复制文件。'
+                )
+
+    @staticmethod
+    def get_save_root(save_directory: Union[str, None]) -> Union[str, None]:
+        """获取保存路径中第一个通配符之前的固定部分。"""
+        if not save_directory:
+            return None
+        root: str = save_directory
+        for placeholder in SaveDirectoryPrefix():
+            if placeholder in root:
+                root = os.path.dirname(root[:root.index(placeholder)] + 'x')
+        return os.path.abspath(root)
+
+    @staticmethod
+    def get_device(path: Union[str, None]) -> Union[int, None]:
+        """获取路径所在的设备,路径不存在时使用最近的已存在的上级目录。"""
+        if not path:
+            return None
+        path = os.path.abspath(path)
+        while True:
+            try:
+                return os.stat(path).st_dev
+            except OSError:
+                parent: str = os.path.dirname(path)
+                if parent == path:
+                    return None
+                path = parent
+
+    def is_cross_device(self, path: str, save_directory: str) -> bool:
+        a: Union[int, None] = VolumeMap.get_device(path)
+        b: Union[int, None] = VolumeMap.get_device(save_directory)
+        return a is not None and b is not None and a != b
+
+    def get_staging_directory(self, save_directory: str) -> str:
+        """获取保存路径所在设备上的缓存目录。"""
+        device: Union[int, None] = VolumeMap.get_device(save_directory)
+        if device is None:
+            return self.temp_directory
+        if device not in self.directories:
+            self.directories[device] = os.path.join(os.path.abspath(save_directory), VolumeMap.TEMP_NAME)
+        return self.directories[device]
+
+    def get_temp_directory(self, save_directory: str) -> str:
+        """获取下载到save_directory的文件应使用的缓存目录,结果按保存路径缓存,不会重复访问文件系统。"""
+        if not self.per_volume:
+            return self.temp_directory
+        temp_directory: Union[str, None] = self.resolved.get(save_directory)
+        if temp_directory is None:
+            temp_directory = self.get_staging_directory(save_directory)
+            self.resolved[save_directory] = temp_directory
+        return temp_directory
+
+    @staticmethod
+    def copy(src: str, dst: str, progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """在线程中复制文件,依次尝试copy_file_range、sendfile(均由内核完成,不经过用户态)与普通读写。"""
+        size: int = os.path.getsize(src)
+        copied: int = 0
+        copy_file_range = getattr(os, 'copy_file_range', None)
+        sendfile = getattr(os, 'sendfile', None)
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+            while copied < size:
+                count: int = min(VolumeMap.BLOCK_SIZE, size - copied)
+                written: int = 0
+                if copy_file_range:
+                    try:
+                        written = copy_file_range(in_fd, out_fd, count, copied, copied)
+                    except OSError:
+                        copy_file_range = None
+                        continue
+                elif sendfile:
+                    try:
+                        os.lseek(out_fd, copied, os.SEEK_SET)
+                        written = sendfile(out_fd, in_fd, copied, count)
+                    except OSError:
+                        sendfile = None
+                        continue
+                else:
+                    os.lseek(in_fd, copied, os.SEEK_SET)
+                    os.lseek(out_fd, copied, os.SEEK_SET)
+                    written = os.write(out_fd, os.read(in_fd, count))
+                if written == 0:
+                    break
+                copied += written
+                progress(copied, size) if progress else None
+            os.fsync(out_fd)
+        if copied != size:
+            raise OSError(f'复制"{src}"时只复制了{copied}/{size}字节。')
+        return copied
+
+    @staticmethod
+    def move(src: str, dst: str, progress: Optional[Callable[[int, int], None]] = None) -> str:
+        """跨设备移动文件,先复制为临时文件再重命名,复制完成前dst不会出现不完整的文件。"""
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        part: str = f'{dst}.moving'
+        try:
+            VolumeMap.copy(src=src, dst=part, progress=progress)
+            os.replace(part, dst)
+        except BaseException:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            raise
+        os.remove(src)
+        return dst
@@ -0,0 +1,250 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/18 11:02
+# File:writer.py
+import os
+import time
+import zlib
+import asyncio
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Union
+
+from module import log
+from module.integrity import StreamHasher
+
+
+class WriterStats:
+    """所有写入器共享的磁盘写入统计,用于判断瓶颈是磁盘还是Telegram。"""
+    active: set = set()
+    bytes_written: int = 0
+    write_count: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    backpressure_count: int = 0
+
+    @staticmethod
+    def queue_depth() -> int:
+        """当前所有写入队列中等待写入的块数。"""
+        return sum(writer.queue_depth() for writer in list(WriterStats.active))
+
+    @staticmethod
+    def average_latency() -> float:
+        return WriterStats.total_latency / WriterStats.write_count if WriterStats.write_count else 0.0
+
+    @staticmethod
+    def record(size: int, latency: float) -> None:
+        WriterStats.bytes_written += size
+        WriterStats.write_count += 1
+        WriterStats.total_latency += latency
+        WriterStats.max_latency = max(WriterStats.max_latency, latency)
+
+    @staticmethod
+    def summary() -> dict:
+        return {
+            'queue_depth': WriterStats.queue_depth(),
+            'active_writers': len(WriterStats.active),
+            'bytes_written': WriterStats.bytes_written,
+            'write_count': WriterStats.write_count,
+            'average_latency': WriterStats.average_latency(),
+            'max_latency': WriterStats.max_latency,
+            'backpressure_count': WriterStats.backpressure_count
+        }
+
+
+class FileWriter:
+    """在线程池中写入文件的异步写入器。
+    下载协程只负责把块放入有界队列(队列满时等待,即背压),
+    写入协程将偏移连续的块合并为一次较大的写入后交给线程池执行,避免阻塞事件循环。
+    """
+    FSYNC_NEVER: str = 'never'
+    FSYNC_CLOSE: str = 'close'
+    FSYNC_ALWAYS: str = 'always'
+    FSYNC_POLICY: tuple = (FSYNC_NEVER, FSYNC_CLOSE, FSYNC_ALWAYS)
+    SLOW_WRITE_THRESHOLD: float = 1.0  # 单次写入超过该秒数时记录警告。
+    __executor: Union[ThreadPoolExecutor, None] = None
+    __executor_workers: int = 4
+
+    def __init__(
+            self,
+            path: str,
+            truncate: bool = False,
+            queue_size: int = 8,
+            coalesce_size: int = 4 * 1024 * 1024,
+            fsync: str = FSYNC_CLOSE,
+            on_written: Optional[Callable[[int, int, int], None]] = None,
+            hasher: Optional[StreamHasher] = None
+    ):
+        self.path: str = path
+        self.queue_size: int = max(queue_size, 1)
+        self.coalesce_size: int = max(coalesce_size, 1)
+        self.fsync: str = fsync if fsync in FileWriter.FSYNC_POLICY else FileWriter.FSYNC_CLOSE
+        # 写入完成后的回调(偏移,长度,CRC32),在写入线程中调用,同一写入器的回调按写入顺序依次执行。
+        self.on_written: Optional[Callable[[int, int, int], None]] = on_written
+        self.hasher: Optional[StreamHasher] = hasher  # 在写入线程中增量计算文件摘要。
+        flags: int = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        self.fd: int = os.open(path, flags, 0o644)
+        self.queue: Union[asyncio.Queue, None] = None
+        self.consumer: Union[asyncio.Task, None] = None
+        self.error: Union[BaseException, None] = None
+        self.lock = threading.Lock()  # 不支持pwrite的平台(Windows)需要保证seek与write的原子性。
+        self.bytes_written: int = 0
+        self.write_count: int = 0
+        self.total_latency: float = 0.0
+        self.max_latency: float = 0.0
+        self.max_depth: int = 0
+        self.__pending: Union[Tuple[int, bytes], None] = None
+
+    @staticmethod
+    def set_workers(workers: int) -> None:
+        """设置写入线程池的线程数,需在第一次写入前调用。"""
+        if FileWriter.__executor is None:
+            FileWriter.__executor_workers = max(workers, 1)
+
+    @staticmethod
+    def get_executor() -> ThreadPoolExecutor:
+        if FileWriter.__executor is None:
+            FileWriter.__executor = ThreadPoolExecutor(
+                max_workers=FileWriter.__executor_workers,
+                thread_name_prefix='TRMD_Writer'
+            )
+        return FileWriter.__executor
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close(abort=exc_type is not None)
+
+    def start(self) -> None:
+        if self.consumer is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.consumer = asyncio.create_task(self.__consume())
+            WriterStats.active.add(self)
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    async def write(self, offset: int, data: bytes) -> None:
+        """将数据放入写入队列,队列满时等待写入协程消费。"""
+        if self.error:
+            raise self.error
+        self.start()
+        if self.queue.full():
+            WriterStats.backpressure_count += 1
+        await self.queue.put((offset, data))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def close(self, abort: bool = False) -> None:
+        """等待队列中的数据全部写入后关闭文件,abort为True时不再同步到磁盘。"""
+        try:
+            if self.consumer is not None:
+                if not self.consumer.done():
+                    await self.queue.put(None)
+                    await asyncio.shield(self.consumer)
+            if self.error is None and not abort and self.fsync != FileWriter.FSYNC_NEVER:
+                await asyncio.get_running_loop().run_in_executor(FileWriter.get_executor(), os.fsync, self.fd)
+        finally:
+            WriterStats.active.discard(self)
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            if self.write_count:
+                log.info(
+                    f'"{self.path}"写入统计,'
+                    f'写入次数:{self.write_count},'
+                    f'平均延迟:{self.total_latency / self.write_count * 1000:.1f}ms,'
+                    f'最大延迟:{self.max_latency * 1000:.1f}ms,'
+                    f'最大队列深度:{self.max_depth}/{self.queue_size}。'
+                )
+        if self.error and not abort:
+            raise self.error
+
+    def __drain(self, first: Tuple[int, bytes]) -> Tuple[List[Tuple[int, bytes]], bool]:
+        """从队列中取出已就绪且偏移连续的块,合并为一组。返回(块列表,是否收到结束标记)。"""
+        items: List[Tuple[int, bytes]] = [first]
+        end: int = first[0] + len(first[1])
+        size: int = len(first[1])
+        while size < self.coalesce_size and not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is None:
+                return items, True
+            offset, data = item
+            if offset != end:
+                # 偏移不连续时先写入已合并的部分,再单独处理该块。
+                self.__pending = item
+                break
+            items.append(item)
+            end += len(data)
+            size += len(data)
+        return items, False
+
+    def __pwrite(self, offset: int, buffer: bytes, items: List[Tuple[int, bytes]]) -> float:
+        """写入合并后的数据,并在写入线程中计算文件摘要,计算每个块的CRC32后调用写入完成的回调。"""
+        start: float = time.perf_counter()
+        view = memoryview(buffer)
+        if hasattr(os, 'pwrite'):
+            while view:
+                written: int = os.pwrite(self.fd, view, offset)
+                view = view[written:]
+                offset += written
+        else:
+            with self.lock:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                while view:
+                    written: int = os.write(self.fd, view)
+                    view = view[written:]
+        if self.fsync == FileWriter.FSYNC_ALWAYS:
+            os.fsync(self.fd)
+        latency: float = time.perf_counter() - start
+        if self.hasher:
+            for _offset, data in items:
+                self.hasher.update(_offset, data)
+        if self.on_written:
+            for _offset, data in items:
+                self.on_written(_offset, len(data), zlib.crc32(data))
+        return latency
+
+    async def __consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        finished: bool = False
+        while not finished:
+            if self.__pending is not None:
+                item, self.__pending = self.__pending, None
+            else:
+                item = await self.queue.get()
+            if item is None:
+                break
+            items, finished = self.__drain(item)
+            offset: int = items[0][0]
+            buffer: bytes = items[0][1] if len(items) == 1 else b''.join(data for _, data in items)
+            if self.error is not None:
+                continue  # 出错后继续消费队列,避免生产者因背压永久阻塞。
+            try:
+                latency: float = await loop.run_in_executor(
+                    FileWriter.get_executor(),
+                    self.__pwrite,
+                    offset,
+                    buffer,
+                    items
+                )
+            except Exception as e:
+                self.error = e
+                log.error(f'写入文件"{self.path}"失败,原因:"{e}"')
+                continue
+            self.bytes_written += len(buffer)
+            self.write_count += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            WriterStats.record(size=len(buffer), latency=latency)
+            if latency > FileWriter.SLOW_WRITE_THRESHOLD:
+                log.warning(
+                    f'写入文件"{self.path}"耗时{latency:.2f}s,'
+                    f'当前写入队列深度:{WriterStats.queue_depth()},磁盘可能是下载瓶颈。'
+                )
@@ -0,0 +1,27 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 10:00
+# File:conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+# 导入module时会在配置目录中创建配置与日志文件,测试时使用临时目录。
+os.environ['XDG_CONFIG_HOME'] = tempfile.mkdtemp(prefix='trmd_test_')
+os.environ.pop('APPDATA', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def journal(monkeypatch):
+    """使用内存中的任务日志替换DownloadTask.JOURNAL。"""
+    from module.journal import TaskJournal
+    from module.task import DownloadTask
+
+    _journal = TaskJournal(':memory:')
+    monkeypatch.setattr(DownloadTask, 'JOURNAL', _journal)
+    yield _journal
+    _journal.close()
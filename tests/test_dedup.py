@@ -0,0 +1,28 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 18:10
+# File:test_dedup.py
+from types import SimpleNamespace
+
+from module.dedup import ContentIndex
+
+
+def make_message(file_unique_id: str, size: int) -> SimpleNamespace:
+    return SimpleNamespace(video=SimpleNamespace(file_unique_id=file_unique_id, file_size=size))
+
+
+def test_is_recorded_uses_memory_then_journal(journal, tmp_path):
+    path = tmp_path / 'a.mp4'
+    path.write_bytes(b'x' * 10)
+    index = ContentIndex(journal=journal, max_records=10)
+    message = make_message('a', 10)
+    assert not index.is_recorded(message)
+    index.record(message=message, path=str(path))
+    assert index.is_recorded(message)
+    # 重启后内存中没有记录,由任务日志得到。
+    index = ContentIndex(journal=journal, max_records=10)
+    assert index.is_recorded(message)
+    assert ('a', 10) in index.recorded
+    assert not index.is_recorded(make_message('b', 10))
+    assert index.is_recorded(SimpleNamespace())
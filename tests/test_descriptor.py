@@ -0,0 +1,90 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 11:40
+# File:test_descriptor.py
+import os
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+from module.downloader import TelegramRestrictedMediaDownloader
+from module.retention import RetainedDict
+
+
+def make_downloader(tmp_path) -> TelegramRestrictedMediaDownloader:
+    downloader = object.__new__(TelegramRestrictedMediaDownloader)
+    downloader.app = SimpleNamespace(save_directory=str(tmp_path))
+    downloader.message_tag_map = RetainedDict(1)
+    downloader.listen_download_tag_by_chatid = {}
+    downloader.media_descriptors = RetainedDict(10)
+    downloader.refreshed_messages = RetainedDict(10)
+    return downloader
+
+
+def make_message(mid: int) -> SimpleNamespace:
+    return SimpleNamespace(id=mid, chat=SimpleNamespace(id=-1001))
+
+
+def test_descriptor_cache_hit_and_miss(tmp_path):
+    downloader = make_downloader(tmp_path)
+    message = make_message(1)
+    assert downloader.env_save_directory(message) == str(tmp_path)
+    assert len(downloader.media_descriptors) == 1
+    downloader.media_descriptors.get((-1001, 1))['save_directory'] = 'cached'
+    assert downloader.env_save_directory(message) == 'cached'
+    assert downloader.env_save_directory(make_message(2)) == str(tmp_path)
+    assert len(downloader.media_descriptors) == 2
+
+
+def test_tag_pinned_after_tag_map_eviction(tmp_path):
+    downloader = make_downloader(tmp_path)
+    message = make_message(1)
+    downloader.message_tag_map[(-1001, 1)] = 'movies'
+    expected: str = os.path.join(str(tmp_path), 'movies')
+    assert downloader.env_save_directory(message) == expected
+    downloader.message_tag_map[(-1001, 2)] = 'music'  # 移出(-1001,1)的标签。
+    assert downloader.get_message_tag(message) is None
+    assert downloader.env_save_directory(message) == expected
+
+
+def test_forget_media(tmp_path):
+    downloader = make_downloader(tmp_path)
+    message = make_message(1)
+    downloader.env_save_directory(message)
+    downloader.refreshed_messages[(-1001, 1)] = message
+    downloader.forget_media(message)
+    assert (-1001, 1) not in downloader.media_descriptors
+    assert (-1001, 1) not in downloader.refreshed_messages
+
+
+@pytest.mark.slow
+def test_descriptor_benchmark(tmp_path):
+    downloader = make_downloader(tmp_path)
+    downloader.app.save_directory = os.path.join(str(tmp_path), '%CHAT_USERNAME%', '%MIME_TYPE%')
+    downloader.message_tag_map = RetainedDict(10000)
+    messages: list = [
+        SimpleNamespace(
+            id=i, video=True, chat=SimpleNamespace(id=-1001, username=None, title='频道:名称/测试')
+        )
+        for i in range(10000)
+    ]
+    for message in messages:
+        downloader.message_tag_map[(-1001, message.id)] = '标签'
+    calls: int = 5  # 一个文件在任务期间(添加任务、进度、完成、重试、移动)计算保存目录的次数。
+    elapsed: dict = {}
+    for name, cached in (('每次计算', False), ('媒体描述', True)):
+        start: float = time.perf_counter()
+        for message in messages:
+            for _ in range(calls):
+                directory: str = downloader.env_save_directory(message)
+                if not cached:
+                    downloader.forget_media(message)
+            downloader.forget_media(message)
+        elapsed[name] = time.perf_counter() - start
+        print(f'\n{name}:{len(messages) * calls}次,{elapsed[name]:.3f}秒')
+    assert directory == os.path.join(str(tmp_path), '频道_名称_测试', 'video', '标签')
+    assert len(downloader.media_descriptors) == 0
+    assert elapsed['媒体描述'] < elapsed['每次计算']
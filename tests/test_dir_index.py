@@ -0,0 +1,88 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 15:10
+# File:test_dir_index.py
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from module.dir_index import DirectoryIndex
+from module.path_tool import is_file_duplicate
+
+
+@pytest.fixture(autouse=True)
+def empty_index(monkeypatch):
+    monkeypatch.setattr(DirectoryIndex, 'entries', {})
+    monkeypatch.setattr(DirectoryIndex, 'created', set())
+    monkeypatch.setattr(DirectoryIndex, 'scan_count', 0)
+
+
+def test_lookup_scans_directory_once(tmp_path):
+    (tmp_path / 'a.mp4').write_bytes(b'x' * 10)
+    assert DirectoryIndex.get_size(str(tmp_path / 'a.mp4')) == 10
+    assert DirectoryIndex.get_size(str(tmp_path / 'b.mp4')) is None
+    assert is_file_duplicate(str(tmp_path / 'a.mp4'), 10)
+    assert not is_file_duplicate(str(tmp_path / 'a.mp4'), 11)
+    assert DirectoryIndex.scan_count == 1
+
+
+def test_index_follows_add_and_discard(tmp_path):
+    DirectoryIndex.get_entries(str(tmp_path))
+    DirectoryIndex.add(str(tmp_path / 'b.mp4'), size=5)
+    assert DirectoryIndex.get_size(str(tmp_path / 'b.mp4')) == 5
+    DirectoryIndex.discard(str(tmp_path / 'b.mp4'))
+    assert DirectoryIndex.get_size(str(tmp_path / 'b.mp4')) is None
+    DirectoryIndex.discard(str(tmp_path))
+    assert DirectoryIndex.__dict__['entries'] == {}
+
+
+def test_concurrent_updates(tmp_path):
+    directories: list = [str(tmp_path / str(i)) for i in range(8)]
+
+    def work(directory: str) -> None:
+        DirectoryIndex.makedirs(directory)
+        DirectoryIndex.get_entries(directory)
+        for i in range(200):
+            DirectoryIndex.add(os.path.join(directory, f'{i}.mp4'), size=i)
+            DirectoryIndex.discard(os.path.join(str(tmp_path), 'missing'))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, directories))
+    for directory in directories:
+        assert DirectoryIndex.get_size(os.path.join(directory, '199.mp4')) == 199
+
+
+@pytest.mark.slow
+def test_lookup_avoids_stat_storm(tmp_path, monkeypatch):
+    for i in range(2000):
+        (tmp_path / f'{i}.mp4').write_bytes(b'x')
+    # 每个文件查询5次,其中一半的文件尚未下载。
+    paths: list = [str(tmp_path / f'{i}.mp4') for i in range(4000)] * 5
+    stat = os.stat
+    calls: list = []
+
+    def counted_stat(*args, **kwargs):
+        calls.append(args[0])
+        return stat(*args, **kwargs)
+
+    monkeypatch.setattr(os, 'stat', counted_stat)
+
+    def old_lookup(path: str) -> bool:
+        return os.path.isfile(path) and os.path.getsize(path) == 1
+
+    result: dict = {}
+    for name, lookup in (('os.path', old_lookup), ('DirectoryIndex', lambda path: is_file_duplicate(path, 1))):
+        calls.clear()
+        start: float = time.perf_counter()
+        found: int = sum(1 for path in paths if lookup(path))
+        result[name] = (found, len(calls), time.perf_counter() - start)
+        print(f'\n{name}:{len(paths)}次查询,stat {len(calls)}次,{result[name][2]:.3f}秒')
+    assert result['os.path'][0] == result['DirectoryIndex'][0] == 10000
+    assert result['os.path'][1] >= len(paths)
+    # 只在第一次命中已存在的文件时获取大小。
+    assert result['DirectoryIndex'][1] <= 2000 + 1
+    assert DirectoryIndex.scan_count == 1
@@ -0,0 +1,107 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 11:00
+# File:test_disk.py
+import os
+import asyncio
+
+import pytest
+
+from module.disk import DiskGuard
+from module.downloader import TelegramRestrictedMediaDownloader
+from module.segment import ChunkManifest
+
+MB: int = 1024 * 1024
+
+
+def test_downloaded_bytes_come_from_manifest(tmp_path):
+    temp_file_path: str = str(tmp_path / 'a.mp4')
+    size: int = 8 * MB
+    manifest = ChunkManifest(temp_path=f'{temp_file_path}.temp', total_chunks=8)
+    for i in (0, 1, 5):
+        manifest.mark(index=i, offset=i * MB, length=MB, crc=0)
+    manifest.close()
+    with open(f'{temp_file_path}.temp', 'wb') as f:
+        f.truncate(size)  # 预分配后文件大小等于最终大小。
+    assert TelegramRestrictedMediaDownloader.get_downloaded_bytes(temp_file_path, size) == 3 * MB
+
+
+def test_full_size_temp_without_manifest_is_not_downloaded(tmp_path):
+    temp_file_path: str = str(tmp_path / 'a.mp4')
+    with open(f'{temp_file_path}.temp', 'wb') as f:
+        f.truncate(4 * MB)
+    assert TelegramRestrictedMediaDownloader.get_downloaded_bytes(temp_file_path, 4 * MB) == 0
+    with open(f'{temp_file_path}.temp', 'wb') as f:
+        f.write(b'x' * MB)
+    assert TelegramRestrictedMediaDownloader.get_downloaded_bytes(temp_file_path, 4 * MB) == MB
+
+
+@pytest.mark.skipif(not hasattr(os, 'posix_fallocate'), reason='需要posix_fallocate')
+def test_required_bytes_skip_preallocated_space(tmp_path):
+    path: str = str(tmp_path / 'a.mp4.temp')
+    with open(path, 'wb') as f:
+        f.truncate(8 * MB)  # 稀疏文件,没有占用空间。
+    if DiskGuard.get_allocated(path) > MB:
+        pytest.skip('文件系统不支持稀疏文件')
+    assert DiskGuard.get_required(path, size=8 * MB, written=0) == 8 * MB
+    DiskGuard.preallocate(path, 8 * MB)
+    assert DiskGuard.get_required(path, size=8 * MB, written=2 * MB) == 0
+
+
+def test_reservation_is_offset_by_allocated_space(tmp_path, monkeypatch):
+    monkeypatch.setattr(DiskGuard, 'get_free', staticmethod(lambda path: 100 * MB))
+    path: str = str(tmp_path / 'a.mp4.temp')
+
+    async def run():
+        guard = DiskGuard(min_free=0)
+        await guard.reserve(path, 10 * MB)
+        device = next(iter(guard.reservations.values()))[0]
+        assert guard.get_reserved(device) == 10 * MB
+        with open(path, 'wb') as f:
+            f.write(os.urandom(4 * MB))
+        assert guard.get_reserved(device) == 6 * MB
+        guard.release(path)
+        assert guard.get_reserved(device) == 0
+
+    asyncio.run(run())
+
+
+def test_duplicate_reservations_are_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(DiskGuard, 'get_free', staticmethod(lambda path: 100 * MB))
+    path: str = str(tmp_path / 'a.mp4.temp')
+
+    async def run():
+        guard = DiskGuard(min_free=0)
+        await guard.reserve(path, 10 * MB)
+        await guard.reserve(path, 10 * MB)  # 同一文件被重复提交。
+        device = next(iter(guard.reservations.values()))[0]
+        assert guard.get_reserved(device) == 10 * MB
+        guard.release(path)
+        assert guard.get_reserved(device) == 10 * MB
+        guard.release(path)
+        assert guard.get_reserved(device) == 0
+        assert not guard.holders
+
+    asyncio.run(run())
+
+
+def test_waiting_duplicate_joins_reservation(tmp_path, monkeypatch):
+    free: list = [5 * MB]
+    monkeypatch.setattr(DiskGuard, 'get_free', staticmethod(lambda path: free[0]))
+    path: str = str(tmp_path / 'a.mp4.temp')
+
+    async def run():
+        guard = DiskGuard(min_free=0)
+        other: str = str(tmp_path / 'b.mp4.temp')
+        await guard.reserve(other, MB)
+        waiters: list = [asyncio.create_task(guard.reserve(path, 10 * MB)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert not any(waiter.done() for waiter in waiters)
+        free[0] = 100 * MB
+        guard.release(other)
+        await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+        assert guard.holders == {path: 2}
+        assert len(guard.reservations) == 1
+
+    asyncio.run(run())
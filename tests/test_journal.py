@@ -0,0 +1,30 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 17:10
+# File:test_journal.py
+from concurrent.futures import ThreadPoolExecutor
+
+from module.enums import DownloadStatus
+from module.journal import TaskJournal
+
+
+def test_journal_is_safe_across_threads(tmp_path):
+    journal = TaskJournal(str(tmp_path / TaskJournal.FILE_NAME))
+
+    def work(n: int) -> None:
+        for i in range(100):
+            link: str = f'https://t.me/c/{n}/{i}'
+            journal.add_pending(link, source='links', link=link)
+            journal.update_file(link, f'{i}.mp4', status=DownloadStatus.SUCCESS)
+            journal.complete_link(link)
+            assert journal.is_complete(link)
+            journal.load_pending()
+            journal.remove_pending(link)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+    assert journal.complete_count() == 800
+    assert journal.load_pending() == []
+    assert len(list(journal.load_links(since=0))) == 800
+    journal.close()
@@ -0,0 +1,96 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 15:40
+# File:test_limiter.py
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+from pyrogram.errors.exceptions.flood_420 import FloodWait
+
+import module.limiter
+from module.client import RateLimitedClient
+from module.limiter import PriorityGate, RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """替换限流器使用的时钟,asyncio.sleep只推进时钟。"""
+    clock = SimpleNamespace(now=1000.0, slept=[])
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        clock.slept.append(delay)
+        await real_sleep(0)
+        clock.now += delay
+
+    monkeypatch.setattr(module.limiter.time, 'monotonic', lambda: clock.now)
+    monkeypatch.setattr(module.limiter.asyncio, 'sleep', sleep)
+    return clock
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(rate=2, burst=2, min_rate=0.5)
+    assert bucket.delay() == 0 and bucket.delay() == 0
+    assert bucket.delay() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.delay() == 0
+    bucket.on_flood_wait(10)
+    assert bucket.rate == 1
+    assert bucket.delay() == pytest.approx(10)
+    clock.now += 10
+    assert bucket.delay() == 0
+    bucket.on_success()
+    assert bucket.rate == 1.5
+
+
+def test_priority_gate_order(clock):
+    gate = PriorityGate(TokenBucket(rate=1, burst=1, min_rate=0.1))
+    gate.bucket.tokens = 0
+    order: list = []
+
+    async def acquire(priority: int, name: str):
+        await gate.acquire(priority)
+        order.append(name)
+
+    async def main():
+        await asyncio.gather(
+            acquire(RateLimiter.PRIORITY_UI, 'edit'),
+            acquire(RateLimiter.PRIORITY_SEND, 'send'),
+            acquire(RateLimiter.PRIORITY_MEDIA, 'media'),
+            acquire(RateLimiter.PRIORITY_READ, 'read'),
+        )
+
+    asyncio.run(main())
+    assert order == ['media', 'read', 'send', 'edit']
+    assert not gate.heap
+
+
+def test_flood_wait_is_queued(clock):
+    limiter = RateLimiter()
+    calls: list = []
+
+    async def call(query, sleep_threshold):
+        calls.append(clock.now)
+        if len(calls) == 1:
+            raise FloodWait(value=3)
+        return 'ok'
+
+    query = SimpleNamespace(QUALNAME='functions.messages.GetHistory')
+    assert asyncio.run(limiter.invoke(call, query, dc_id=2, sleep_threshold=10, account='a')) == 'ok'
+    assert calls[1] - calls[0] >= 3
+    assert list(limiter.summary()) == ['a:functions.messages.GetHistory(DC2)']
+    with pytest.raises(FloodWait):
+        calls.clear()
+        asyncio.run(limiter.invoke(call, query, dc_id=2, sleep_threshold=1, account='b'))
+
+
+def test_clients_share_limiter(tmp_path):
+    clients: list = [
+        RateLimitedClient(name=name, api_id=1, api_hash='x', in_memory=True, workdir=str(tmp_path))
+        for name in ('user', 'bot')
+    ]
+    assert clients[0].limiter is clients[1].limiter is RateLimitedClient.LIMITER
@@ -0,0 +1,45 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 14:40
+# File:test_manifest.py
+import asyncio
+import threading
+
+from module.segment import ChunkManifest
+from module.writer import FileWriter
+
+CHUNK_SIZE: int = 1024
+TOTAL_CHUNKS: int = 8
+
+
+def test_manifest_is_written_from_writer_thread(tmp_path):
+    temp_path: str = str(tmp_path / 'video.mp4.temp')
+    manifest = ChunkManifest(temp_path=temp_path, total_chunks=TOTAL_CHUNKS)
+    threads: set = set()
+
+    def on_written(offset: int, length: int, crc: int) -> None:
+        threads.add(threading.current_thread().name)
+        manifest.mark(index=offset // CHUNK_SIZE, offset=offset, length=length, crc=crc)
+
+    async def main():
+        async with FileWriter(path=temp_path, on_written=on_written) as writer:
+            for i in reversed(range(TOTAL_CHUNKS)):
+                await writer.write(offset=i * CHUNK_SIZE, data=bytes([i]) * CHUNK_SIZE)
+
+    asyncio.run(main())
+    manifest.close()
+    assert threads and all(name.startswith('TRMD_Writer') for name in threads)
+    assert manifest.is_complete()
+    assert ChunkManifest.get_done_bytes(temp_path, TOTAL_CHUNKS) == CHUNK_SIZE * TOTAL_CHUNKS
+    reopened = ChunkManifest(temp_path=temp_path, total_chunks=TOTAL_CHUNKS)
+    assert reopened.verify(temp_path) == []
+    reopened.close()
+
+
+def test_manifest_flushes_records_on_close(tmp_path):
+    temp_path: str = str(tmp_path / 'video.mp4.temp')
+    manifest = ChunkManifest(temp_path=temp_path, total_chunks=TOTAL_CHUNKS)
+    manifest.mark(index=0, offset=0, length=CHUNK_SIZE)
+    manifest.close()
+    assert ChunkManifest.get_done_bytes(temp_path, TOTAL_CHUNKS) == CHUNK_SIZE
@@ -0,0 +1,92 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 13:10
+# File:test_part_uploader.py
+import asyncio
+
+import pytest
+
+from pyrogram import raw
+
+from module.limiter import RateLimiter
+from module.part_uploader import PartUploader
+
+PART_SIZE: int = 1024
+TOTAL_PARTS: int = 16
+WORKERS: int = 4
+
+
+class FakeClient:
+    """记录收到的分片与同时进行中的请求数,fail_after个分片后中断上传。"""
+
+    def __init__(self, fail_after: int = 0):
+        self.fail_after: int = fail_after
+        self.parts: list = []
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+        self.file_ids: set = set()
+
+    def rnd_id(self) -> int:
+        return 42
+
+    async def invoke(self, query):
+        assert isinstance(query, raw.functions.upload.SaveBigFilePart)
+        if self.fail_after and len(self.parts) >= self.fail_after:
+            raise ConnectionError('connection lost')
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.parts.append(query.file_part)
+        self.file_ids.add(query.file_id)
+        return True
+
+
+@pytest.fixture
+def big_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(PartUploader, 'PART_SIZE', PART_SIZE)
+    monkeypatch.setattr(PartUploader, 'FLUSH_PARTS', 2)
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'\1' * PART_SIZE * TOTAL_PARTS)
+    return str(path)
+
+
+def test_parts_are_sent_in_parallel(big_file, journal):
+    client = FakeClient()
+    file = asyncio.run(PartUploader(client, journal, workers=WORKERS).upload(big_file, chat_id=1))
+    assert sorted(client.parts) == list(range(TOTAL_PARTS))
+    assert client.max_in_flight == WORKERS
+    assert file.parts == TOTAL_PARTS
+
+
+def test_resume_from_journal_bitmap(big_file, journal):
+    broken = FakeClient(fail_after=6)
+    with pytest.raises(ConnectionError):
+        asyncio.run(PartUploader(broken, journal, workers=WORKERS).upload(big_file, chat_id=1))
+    record: dict = journal.get_upload(big_file, 1)
+    done: set = {i for i in range(TOTAL_PARTS) if PartUploader.is_done(bytearray(record.get('parts')), i)}
+    assert done == set(broken.parts)
+
+    client = FakeClient()
+    file = asyncio.run(PartUploader(client, journal, workers=WORKERS).upload(big_file, chat_id=1))
+    assert sorted(client.parts) == sorted(set(range(TOTAL_PARTS)) - done)
+    assert client.file_ids == {file.id} == broken.file_ids
+
+
+def test_upload_parts_bypass_limiter():
+    limiter = RateLimiter(dc_rate=1, method_rate=1)
+    calls: list = []
+
+    async def call(query, sleep_threshold):
+        calls.append(sleep_threshold)
+        return True
+
+    async def main():
+        query = raw.functions.upload.SaveBigFilePart(file_id=1, file_part=0, file_total_parts=1, bytes=b'')
+        for _ in range(50):
+            await limiter.invoke(call, query, dc_id=2, sleep_threshold=10)
+
+    asyncio.run(asyncio.wait_for(main(), timeout=1))
+    assert calls == [10] * 50
+    assert not limiter.buckets and not limiter.gates
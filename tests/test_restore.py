@@ -0,0 +1,153 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 14:10
+# File:test_restore.py
+import asyncio
+
+from types import SimpleNamespace
+
+from module.downloader import TelegramRestrictedMediaDownloader
+from module.retention import RetainedDict, RetainedSet
+from module.task import DownloadTask
+
+restore_pending_tasks = TelegramRestrictedMediaDownloader._TelegramRestrictedMediaDownloader__restore_pending_tasks
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls: list = []
+
+    async def get_messages(self, chat_id, message_ids):
+        self.calls.append((chat_id, list(message_ids)))
+        return [
+            SimpleNamespace(id=i, empty=i == 404, chat=SimpleNamespace(id=chat_id))
+            for i in message_ids
+        ]
+
+
+class FakePool:
+    def __init__(self, client):
+        self.client = client
+        self.chats: list = []
+
+    async def resolve(self, func, chat_id=None):
+        self.chats.append(chat_id)
+        return await func(self.client)
+
+
+def make_downloader(client: FakeClient) -> TelegramRestrictedMediaDownloader:
+    downloader = object.__new__(TelegramRestrictedMediaDownloader)
+    downloader.app = SimpleNamespace(client=client, max_download_retries=3)
+    downloader.pool = FakePool(client)
+    downloader.link_tag_map = RetainedDict(10)
+    downloader.message_tag_map = RetainedDict(10)
+    downloader.bot_task_link = RetainedSet(10)
+    downloader.bot_task_link_canon = RetainedSet(10)
+    downloader.submitted = []
+    downloader.submit_download_task = lambda **kwargs: downloader.submitted.append(kwargs)
+
+    async def resolve_links(links):
+        downloader.resolved_links = set(links)
+        return {}
+
+    downloader._TelegramRestrictedMediaDownloader__resolve_links = resolve_links
+    return downloader
+
+
+def test_restore_batches_messages_by_chat(journal):
+    for chat_id in ('-1001', '-1002'):
+        for message_id in range(1, 251):
+            journal.add_pending(f'{chat_id}/{message_id}', source='listen', chat_id=chat_id, message_id=message_id)
+    journal.add_pending('-1001/404', source='listen', chat_id='-1001', message_id=404)
+    journal.add_pending('https://t.me/c/1001/9', source='links', link='https://t.me/c/1001/9')
+
+    client = FakeClient()
+    downloader = make_downloader(client)
+    restored: set = asyncio.run(restore_pending_tasks(downloader))
+
+    assert sorted((chat_id, len(ids)) for chat_id, ids in client.calls) == [
+        (-1002, 50), (-1002, 200), (-1001, 51), (-1001, 200)
+    ]
+    assert sorted(downloader.pool.chats) == [-1002, -1001]
+    assert len(restored) == len(downloader.submitted) == 501
+    assert downloader.resolved_links == {'https://t.me/c/1001/9'}
+    assert not DownloadTask.is_pending('-1001/404')
+
+
+def test_interrupted_tasks_survive_restarts(journal):
+    journal.add_pending('https://t.me/c/1001/9', source='links', link='https://t.me/c/1001/9')
+    journal.add_pending('-1003/1', source='listen', chat_id='-1003', message_id=1)
+
+    class BrokenClient(FakeClient):
+        async def get_messages(self, chat_id, message_ids):
+            raise ConnectionError('offline')
+
+    for _ in range(5):
+        downloader = make_downloader(BrokenClient())
+        downloader.restored_retries = {}
+        asyncio.run(restore_pending_tasks(downloader))
+    # 被中断的任务每次启动都会恢复,恢复失败的任务超过次数后不再恢复,但仍可从任务日志中取回。
+    assert DownloadTask.is_pending('https://t.me/c/1001/9')
+    assert not DownloadTask.is_pending('-1003/1')
+    assert [row.get('key') for row in DownloadTask.load_pending(dropped=True)] == ['-1003/1']
+    journal.add_pending('-1003/1', source='listen', chat_id='-1003', message_id=1)
+    assert DownloadTask.is_pending('-1003/1')
+
+
+def test_restore_group_applies_retry_per_file(journal, monkeypatch):
+    link: str = 'https://t.me/c/1001/2'
+    journal.add_pending(link, source='links', link=link)
+    journal.set_pending_retry(link, 3, {'id': 3, 'count': 2})
+    downloader = make_downloader(FakeClient())
+    downloader.restored_retries = {}
+    assert asyncio.run(restore_pending_tasks(downloader)) == {link}
+    assert downloader.submitted[0].get('retry') is None
+
+    add_task = TelegramRestrictedMediaDownloader._TelegramRestrictedMediaDownloader__add_task
+    added: list = []
+    downloader.app.download_type = ['video']
+    downloader.listen_download_tag_by_chatid = {}
+    downloader.content_index = SimpleNamespace(is_recorded=lambda message: True)
+    downloader.get_media_meta = lambda message, dtype: {
+        'file_id': message.id,
+        'temp_file_path': f'{message.id}.mp4',
+        'sever_file_size': 1,
+        'file_name': f'{message.id}.mp4',
+        'save_directory': f'{message.id}.mp4',
+        'format_file_size': '1B',
+    }
+    downloader.download_complete_callback = lambda **kwargs: added.append(
+        (kwargs.get('message').id, kwargs.get('retry_count'))
+    )
+    downloader._TelegramRestrictedMediaDownloader__add_task = (
+        lambda *args, **kwargs: add_task(downloader, *args, **kwargs)
+    )
+    monkeypatch.setattr('module.downloader.is_file_duplicate', lambda **kwargs: True)
+    group: list = [
+        SimpleNamespace(id=i, video=SimpleNamespace(file_size=1), chat=SimpleNamespace(id=-1000000001001))
+        for i in (2, 3, 4)
+    ]
+    asyncio.run(add_task(downloader, -1000000001001, 'group', link, group, {'id': -1, 'count': 0}))
+    assert added == [(2, 0), (3, 2), (4, 0)]
+    assert downloader.restored_retries == {}
+
+
+def test_resolve_links_skips_only_failed_chat():
+    class PrivateClient(FakeClient):
+        async def get_messages(self, chat_id, message_ids):
+            if chat_id == 'private':
+                raise ConnectionError('private')
+            return [
+                SimpleNamespace(id=i, media_group_id=None, empty=False, chat=SimpleNamespace(id=chat_id))
+                for i in message_ids
+            ]
+
+    downloader = object.__new__(TelegramRestrictedMediaDownloader)
+    downloader.pool = FakePool(PrivateClient())
+    resolve_links = TelegramRestrictedMediaDownloader._TelegramRestrictedMediaDownloader__resolve_links
+    resolved: dict = asyncio.run(
+        resolve_links(downloader, ['https://t.me/c/1001/1', 'https://t.me/c/1001/2', 'https://t.me/private/3'])
+    )
+    assert set(resolved) == {'https://t.me/c/1001/1', 'https://t.me/c/1001/2'}
+    assert downloader.pool.chats == [-1000000001001, 'private']
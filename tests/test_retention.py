@@ -0,0 +1,91 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 12:10
+# File:test_retention.py
+import tracemalloc
+
+import pytest
+
+from module.app import Application
+from module.enums import DownloadStatus, DownloadType
+from module.retention import RetainedDict, RetainedSet
+from module.stdio import StatisticalTable
+from module.task import DownloadTask
+
+
+def test_retained_dict_evicts_least_recently_used():
+    d = RetainedDict(2)
+    d['a'] = 1
+    d['b'] = 2
+    assert d.get('a') == 1  # 读取后'a'成为最近使用的键。
+    d['c'] = 3
+    assert 'a' in d and 'c' in d
+    assert 'b' not in d
+    assert d['a'] == 1
+    d['d'] = 4
+    assert 'c' not in d
+    assert d.get('missing', 0) == 0
+
+
+def test_retained_set_counts_evicted_items():
+    s = RetainedSet(2, ('a', 'b', 'c'))
+    assert 'a' not in s
+    assert list(s) == ['b', 'c']
+    assert len(s) == 3
+    s.add('b')
+    s.add('d')
+    assert list(s) == ['b', 'd']
+    assert s.evicted == 2
+
+
+def test_statistics_survive_eviction():
+    table = StatisticalTable(maxlen=2)
+    update = Application.update_download_status
+    for name in ('1.mp4', '2.mp4', '3.mp4'):
+        update(table, DownloadType.VIDEO, DownloadStatus.FAILURE, name)
+    update(table, DownloadType.VIDEO, DownloadStatus.SUCCESS, '1.mp4')  # 重试成功。
+    update(table, DownloadType.VIDEO, DownloadStatus.SUCCESS, '1.mp4')
+    update(table, DownloadType.VIDEO, DownloadStatus.SUCCESS, '4.mp4')
+    update(table, DownloadType.VIDEO, DownloadStatus.SUCCESS, '5.mp4')
+    assert table.success_count[DownloadType.VIDEO] == 3
+    assert len(table.failure_video) == 2
+    assert '1.mp4' not in table.failure_video
+
+
+def test_pending_link_is_known_after_eviction(journal):
+    key: str = DownloadTask.add_pending('https://t.me/c/1001/2', source='bot')
+    assert DownloadTask.is_pending(key)
+    DownloadTask.remove_pending(key)
+    assert not DownloadTask.is_pending(key)
+
+
+@pytest.mark.slow
+def test_soak_stays_bounded():
+    maxlen: int = 1000
+    retained_set = RetainedSet(maxlen)
+    retained_dict = RetainedDict(maxlen)
+    table = StatisticalTable(maxlen=maxlen)
+    update = Application.update_download_status
+    sizes: list = []
+    tracemalloc.start()
+    for round_num in range(10):
+        for i in range(round_num * 100000, (round_num + 1) * 100000):
+            retained_set.add(i)
+            retained_dict[(-1001, i)] = i
+            retained_dict.get((-1001, i - maxlen // 2))
+            if i % 10 == 0:
+                name: str = f'{i}.mp4'
+                update(table, DownloadType.VIDEO, DownloadStatus.FAILURE, name)
+                update(table, DownloadType.VIDEO, DownloadStatus.SUCCESS, name)
+        assert len(retained_set.items) == maxlen
+        assert len(retained_dict) == maxlen
+        assert len(table.failure_video) <= maxlen
+        sizes.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+    print(f'\n每轮结束时占用的内存:{[f"{size / 1024:.0f}KB" for size in sizes]}')
+    assert len(retained_set) == 1000000
+    assert retained_set.evicted == 1000000 - maxlen
+    assert table.success_count[DownloadType.VIDEO] == 100000
+    # 超过容量后持续写入,内存不再增长。
+    assert sizes[-1] < sizes[1] * 1.1
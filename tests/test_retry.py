@@ -0,0 +1,71 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 10:00
+# File:test_retry.py
+import asyncio
+
+from types import SimpleNamespace
+
+from module.downloader import TelegramRestrictedMediaDownloader
+from module.enums import TaskSource
+from module.task import DownloadTask
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.submitted: list = []
+        self.funcs: list = []
+
+    def submit(self, func, source, priority=0, delay=0):
+        self.submitted.append((source, priority, delay))
+        self.funcs.append(func)
+        return asyncio.get_event_loop().create_future()
+
+
+def test_submit_retry_task_persists_retry_count(journal):
+    link: str = 'https://t.me/c/1/2'
+    journal.add_pending(link, source=TaskSource.LINKS, link=link, retry=None)
+    fake = SimpleNamespace(scheduler=FakeScheduler())
+    messages: list = [SimpleNamespace(id=i, chat=SimpleNamespace(id=-1001)) for i in (2, 3)]
+
+    async def run():
+        for count in (1, 2):
+            TelegramRestrictedMediaDownloader.submit_retry_task(
+                fake, link=link, message=messages[0], retry={'id': 2, 'count': count}, delay=count * 5
+            )
+            retry: dict = DownloadTask.load_pending_retries(link).get(2)
+            assert retry.get('count') == count
+            assert retry.get('id') == 2
+            assert retry.get('delay') == count * 5
+        TelegramRestrictedMediaDownloader.submit_retry_task(
+            fake, link=link, message=messages[1], retry={'id': 3, 'count': 1}
+        )
+
+    asyncio.run(run())
+    assert [_[1] for _ in fake.scheduler.submitted] == [1, 2, 1]
+    # 同组中另一个文件的重试不会覆盖前一个文件的重试状态。
+    assert {k: v.get('count') for k, v in DownloadTask.load_pending_retries(link).items()} == {2: 2, 3: 1}
+
+
+def test_retry_keeps_progress_chat_and_segments(journal):
+    link: str = 'https://t.me/c/1/2'
+    journal.add_pending(link, source=TaskSource.LINKS, link=link)
+    added: list = []
+
+    async def add_task(*args, **kwargs):
+        added.append(kwargs)
+
+    fake = SimpleNamespace(scheduler=FakeScheduler(), _TelegramRestrictedMediaDownloader__add_task=add_task)
+    message = SimpleNamespace(id=2, chat=SimpleNamespace(id=-1001))
+
+    async def run():
+        TelegramRestrictedMediaDownloader.submit_retry_task(
+            fake, link=link, message=message, retry={'id': 2, 'count': 1}, telegram_chat_id=42, segments=4
+        )
+        await fake.scheduler.funcs[0]()
+
+    asyncio.run(run())
+    assert added[0].get('telegram_chat_id') == 42
+    assert added[0].get('segments') == 4
+    assert added[0].get('source') == TaskSource.RETRY
@@ -0,0 +1,164 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 16:10
+# File:test_segment.py
+import time
+import zlib
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+from module.downloader import TelegramRestrictedMediaDownloader
+from module.retention import RetainedDict
+from module.segment import ChunkManifest, get_chunk_length, get_total_chunks, split_segments
+
+CHUNK_SIZE: int = 1024
+FILE_SIZE: int = CHUNK_SIZE * 11 + 100
+
+
+def chunk(index: int) -> bytes:
+    return bytes([index % 256]) * get_chunk_length(index, FILE_SIZE, CHUNK_SIZE)
+
+
+def test_split_segments():
+    assert split_segments([], 4) == []
+    assert split_segments(list(range(10)), 3) == [(0, 4), (4, 4), (8, 2)]
+    assert split_segments([0, 1, 5, 6, 7, 9], 2) == [(0, 2), (5, 3), (9, 1)]
+    assert split_segments([3], 0) == [(3, 1)]
+
+
+def test_chunk_sizes():
+    assert get_total_chunks(FILE_SIZE, CHUNK_SIZE) == 12
+    assert get_total_chunks(0, CHUNK_SIZE) == 1
+    assert get_chunk_length(11, FILE_SIZE, CHUNK_SIZE) == 100
+    assert get_chunk_length(12, FILE_SIZE, CHUNK_SIZE) == 0
+
+
+class FakeClient:
+    def __init__(self):
+        self.requested: list = []
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+
+    async def stream_media(self, message, offset=0, limit=0):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            for i in range(offset, offset + limit):
+                self.requested.append(i)
+                await asyncio.sleep(0.001)
+                yield chunk(i)
+        finally:
+            self.in_flight -= 1
+
+
+def make_downloader() -> TelegramRestrictedMediaDownloader:
+    downloader = object.__new__(TelegramRestrictedMediaDownloader)
+    downloader.app = SimpleNamespace(
+        disk_preallocate=False,
+        writer_queue_size=8,
+        writer_coalesce_size=4 * CHUNK_SIZE,
+        writer_fsync='never'
+    )
+    downloader.FILE_REFERENCE_MAX_REFRESH = 3
+    downloader.file_reference_refresh_count = 0
+    downloader.refreshed_messages = RetainedDict(10)
+    return downloader
+
+
+def segmented_download(client: FakeClient, temp_path: str, segments: int) -> int:
+    downloader = make_downloader()
+    message = SimpleNamespace(id=1, chat=SimpleNamespace(id=-100))
+
+    async def report(downloaded: int) -> None:
+        pass
+
+    async def run() -> int:
+        downloader.loop = asyncio.get_running_loop()
+        return await downloader._TelegramRestrictedMediaDownloader__segmented_download(
+            client=client,
+            message=message,
+            temp_path=temp_path,
+            file_size=FILE_SIZE,
+            segments=segments,
+            chunk_size=CHUNK_SIZE,
+            report=report
+        )
+
+    return asyncio.run(run())
+
+
+def test_segments_download_in_parallel(tmp_path):
+    temp_path: str = str(tmp_path / 'a.mp4.temp')
+    client = FakeClient()
+    assert segmented_download(client, temp_path, segments=4) == FILE_SIZE
+    assert client.max_in_flight == 4
+    assert sorted(client.requested) == list(range(12))
+    with open(temp_path, 'rb') as f:
+        assert f.read() == b''.join(chunk(i) for i in range(12))
+    assert ChunkManifest.get_done_bytes(temp_path, 12) == FILE_SIZE
+
+
+def test_resume_only_downloads_missing_chunks(tmp_path):
+    temp_path: str = str(tmp_path / 'a.mp4.temp')
+    with open(temp_path, 'wb') as f:
+        f.write(b''.join(chunk(i) for i in range(6)))
+    manifest = ChunkManifest(temp_path=temp_path, total_chunks=12)
+    for i in range(6):
+        data: bytes = chunk(i)
+        manifest.mark(index=i, offset=i * CHUNK_SIZE, length=len(data), crc=zlib.crc32(data))
+    manifest.close()
+    client = FakeClient()
+    assert segmented_download(client, temp_path, segments=2) == FILE_SIZE
+    assert sorted(client.requested) == list(range(6, 12))
+    with open(temp_path, 'rb') as f:
+        assert f.read() == b''.join(chunk(i) for i in range(12))
+
+
+class SlowClient:
+    """每个请求有固定的网络延迟,用于比较分段数对吞吐量的影响。"""
+    LATENCY: float = 0.005
+
+    def __init__(self, file_size: int, chunk_size: int):
+        self.file_size: int = file_size
+        self.chunk_size: int = chunk_size
+
+    async def stream_media(self, message, offset=0, limit=0):
+        for i in range(offset, offset + limit):
+            await asyncio.sleep(SlowClient.LATENCY)
+            yield b'x' * get_chunk_length(i, self.file_size, self.chunk_size)
+
+
+@pytest.mark.slow
+def test_segmented_download_throughput(tmp_path):
+    chunk_size: int = 64 * 1024
+    file_size: int = chunk_size * 256
+    elapsed: dict = {}
+    for segments in (1, 2, 4, 8):
+        temp_path: str = str(tmp_path / f'{segments}.mp4.temp')
+        downloader = make_downloader()
+        message = SimpleNamespace(id=segments, chat=SimpleNamespace(id=-100))
+
+        async def report(downloaded: int) -> None:
+            pass
+
+        async def run() -> int:
+            downloader.loop = asyncio.get_running_loop()
+            return await downloader._TelegramRestrictedMediaDownloader__segmented_download(
+                client=SlowClient(file_size, chunk_size),
+                message=message,
+                temp_path=temp_path,
+                file_size=file_size,
+                segments=segments,
+                chunk_size=chunk_size,
+                report=report
+            )
+
+        start: float = time.perf_counter()
+        assert asyncio.run(run()) == file_size
+        elapsed[segments] = time.perf_counter() - start
+        print(f'\n{segments}段:{elapsed[segments]:.2f}秒,{file_size / elapsed[segments] / 1024 ** 2:.1f}MB/s')
+    assert elapsed[1] / elapsed[4] > 2
@@ -0,0 +1,79 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 10:30
+# File:test_stream.py
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+from module.downloader import TelegramRestrictedMediaDownloader
+from module.retention import RetainedDict
+
+stream_media = TelegramRestrictedMediaDownloader._TelegramRestrictedMediaDownloader__stream_media
+
+
+class FakeClient:
+    """第一个消息的文件引用"过期":与pyrogram的get_file一样只产生部分块后静默结束。"""
+
+    def __init__(self, total: int, stale_after: int):
+        self.total: int = total
+        self.stale_after: int = stale_after
+        self.fetched: int = 0
+
+    async def stream_media(self, message, offset=0, limit=0):
+        end: int = offset + limit if limit else self.total
+        if message.version == 0:
+            end = min(end, self.stale_after)
+        for i in range(offset, end):
+            yield i
+
+    async def get_messages(self, chat_id, message_ids):
+        self.fetched += 1
+        return SimpleNamespace(id=message_ids, chat=SimpleNamespace(id=chat_id), version=self.fetched)
+
+
+def make_self() -> SimpleNamespace:
+    return SimpleNamespace(
+        FILE_REFERENCE_MAX_REFRESH=3,
+        file_reference_refresh_count=0,
+        refreshed_messages=RetainedDict(10),
+    )
+
+
+def collect(fake_self, client, **kwargs) -> list:
+    async def run():
+        return [chunk async for chunk in stream_media(fake_self, client=client, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_short_stream_refreshes_message_and_resumes():
+    client = FakeClient(total=10, stale_after=4)
+    fake_self = make_self()
+    message = SimpleNamespace(id=7, chat=SimpleNamespace(id=-100), version=0, link=None)
+    assert collect(fake_self, client, message=message, offset=0, total_chunks=10) == list(range(10))
+    assert client.fetched == 1
+    assert fake_self.refreshed_messages.get((-100, 7)).version == 1
+
+
+def test_short_stream_with_limit():
+    client = FakeClient(total=10, stale_after=4)
+    fake_self = make_self()
+    message = SimpleNamespace(id=7, chat=SimpleNamespace(id=-100), version=0, link=None)
+    assert collect(fake_self, client, message=message, offset=2, limit=5) == [2, 3, 4, 5, 6]
+
+
+def test_short_stream_gives_up_after_max_refresh():
+    class StaleClient(FakeClient):
+        async def get_messages(self, chat_id, message_ids):
+            self.fetched += 1
+            return SimpleNamespace(id=message_ids, chat=SimpleNamespace(id=chat_id), version=0)
+
+    client = StaleClient(total=10, stale_after=4)
+    message = SimpleNamespace(id=7, chat=SimpleNamespace(id=-100), version=0, link=None)
+    with pytest.raises(ConnectionError):
+        collect(make_self(), client, message=message, offset=0, total_chunks=10)
+    assert client.fetched == 3
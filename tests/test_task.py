@@ -0,0 +1,104 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 16:40
+# File:test_task.py
+import time
+import tracemalloc
+
+import pytest
+
+from module.task import DownloadTask, LinkIndex
+
+LINK: str = 'https://t.me/c/1001/2'
+
+
+@pytest.fixture
+def index(monkeypatch, journal):
+    _index = LinkIndex(max_records=1, max_age=3600)
+    _index.loader = DownloadTask._load_evicted
+    monkeypatch.setattr(DownloadTask, 'LINK_INFO', _index)
+    return _index
+
+
+def test_alias_resolves_to_primary_record(index):
+    record = index.create(LINK, member_num=2)
+    index.alias(2, LINK)
+    assert index.get(2) is record
+    assert 2 in index
+    assert [link for link, _ in index.items()] == [LINK]
+
+
+def test_completion_is_counted_per_file(index, journal):
+    DownloadTask.set(LINK, 'member_num', 2)
+    assert DownloadTask.add_file_name(LINK, 'a.mp4') == 1
+    assert DownloadTask.add_file_name(LINK, 'a.mp4') == 1
+    assert DownloadTask.add_file_name(LINK, 'b.mp4') == 2
+    assert DownloadTask.get(LINK, 'complete_num') == DownloadTask.get(LINK, 'member_num')
+
+
+def test_finished_records_are_evicted_and_reloaded(index, journal):
+    other: str = 'https://t.me/c/1001/3'
+    for link in (LINK, other):
+        DownloadTask.set(link, 'member_num', 1)
+        DownloadTask.add_file_name(link, f'{link[-1]}.mp4')
+    index.alias(2, LINK)
+    index.finish(LINK)
+    index.finish(other)
+    assert LINK not in index and 2 not in index
+    assert other in index
+    assert index.evicted == 1
+    items: dict = dict(index.items())
+    assert items.get(LINK).get('complete_num') == 1
+    assert set(items) == {LINK, other}
+
+
+def measure(func) -> int:
+    """返回func执行后仍占用的内存字节数。"""
+    tracemalloc.start()
+    result = func()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+@pytest.mark.slow
+def test_link_index_memory_and_lookup():
+    num: int = 100000
+    links: list = [f'https://t.me/c/1001/{i}' for i in range(num)]
+
+    def build_index() -> LinkIndex:
+        _index = LinkIndex(max_records=num, max_age=3600)
+        for i, link in enumerate(links):
+            _index.create(link, link_type='single', member_num=1)
+            _index.alias(i, link)
+        return _index
+
+    def build_dict() -> dict:
+        # 旧版以字典保存元数据,消息ID作为键指向同一字典。
+        _dict: dict = {}
+        for i, link in enumerate(links):
+            _dict[link] = _dict[i] = {
+                'link_type': 'single', 'member_num': 1, 'complete_num': 0, 'file_name': set(), 'error_msg': {}
+            }
+        return _dict
+
+    index_size: int = measure(build_index)
+    dict_size: int = measure(build_dict)
+    print(f'\n{num}条记录:LinkIndex {index_size / 1024 ** 2:.1f}MB,字典 {dict_size / 1024 ** 2:.1f}MB')
+    assert index_size < dict_size
+
+    index: LinkIndex = build_index()
+    start: float = time.perf_counter()
+    for i, link in enumerate(links):
+        assert index.get(link) is index.get(i)
+    elapsed: float = time.perf_counter() - start
+    print(f'{num * 2}次查询:{elapsed:.3f}秒,{num * 2 / elapsed / 1e6:.2f}M次/秒')
+
+    index.max_records = 1000
+    for link in links:
+        index.finish(link)
+    assert len(index) == 1000
+    assert len(index.aliases) == 1000
+    assert index.evicted == num - 1000
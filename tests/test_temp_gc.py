@@ -0,0 +1,63 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 12:40
+# File:test_temp_gc.py
+import os
+import asyncio
+
+from module.task import DownloadTask
+from module.temp_gc import TempCollector
+
+
+def make_collector(directory: str, journal) -> TempCollector:
+    collector = TempCollector(
+        directories=lambda: [directory],
+        journal=journal,
+        active=lambda: [],
+        max_age=1,
+        max_size=0,
+        interval=600
+    )
+    collector.since = 0
+    return collector
+
+
+def touch(path: str, age: float) -> None:
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 16)
+    mtime: float = os.path.getmtime(path) - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_media_group_members_keep_their_temps(tmp_path, journal):
+    link: str = DownloadTask.add_pending('https://t.me/c/1001/2', source='bot')
+    paths: list = [os.path.join(str(tmp_path), f'{i}.mp4') for i in (2, 3)]
+    for message_id, path in zip((2, 3), paths):
+        DownloadTask.set_pending_temp(link, message_id, path)
+        touch(f'{path}.temp', age=3600)
+    orphan: str = os.path.join(str(tmp_path), 'orphan.mp4.temp')
+    touch(orphan, age=3600)
+
+    collector: TempCollector = make_collector(str(tmp_path), journal)
+    asyncio.run(collector.collect())
+    assert all(os.path.exists(f'{path}.temp') for path in paths)
+    assert not os.path.exists(orphan)
+
+    DownloadTask.remove_pending(link)
+    assert journal.load_pending_temps() == []
+    asyncio.run(collector.collect())
+    assert not any(os.path.exists(f'{path}.temp') for path in paths)
+
+
+def test_files_before_first_run_are_kept(tmp_path, journal):
+    old: str = os.path.join(str(tmp_path), 'old.mp4.temp')
+    touch(old, age=3600)  # 升级前旧版本留下的缓存文件。
+    collector = TempCollector(
+        directories=lambda: [str(tmp_path)], journal=journal, active=lambda: [], max_age=1, max_size=1, interval=600
+    )
+    asyncio.run(collector.collect())
+    assert os.path.exists(old)
+    assert TempCollector(
+        directories=lambda: [], journal=journal, active=lambda: [], max_age=1, max_size=0, interval=600
+    ).since == collector.since
@@ -0,0 +1,58 @@
+# coding=UTF-8
+# Author:Gentlesprite
+# Software:PyCharm
+# Time:2026/10/19 13:40
+# File:test_util.py
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+from module.enums import LinkType
+from module.util import get_messages_by_links, parse_message_link
+
+
+@pytest.mark.parametrize(
+    'link, expected',
+    [
+        ('https://t.me/c/1001/5', (-1000000001001, 5, False, set())),
+        ('https://t.me/c/1001/7/5/', (-1000000001001, 5, False, {LinkType.TOPIC})),
+        ('https://t.me/channel/5?single', ('channel', 5, True, set())),
+        ('https://t.me/channel/5?comment', ('channel', 5, False, {LinkType.COMMENT})),
+        ('https://t.me/channel/5?single&comment=9', ('channel', 5, True, {LinkType.COMMENT})),
+    ]
+)
+def test_parse_message_link(link, expected):
+    assert parse_message_link(link) == expected
+
+
+def test_parse_invalid_link():
+    with pytest.raises(ValueError):
+        parse_message_link('https://example.com/5')
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls: list = []
+
+    async def get_messages(self, chat_id, message_ids):
+        self.calls.append((chat_id, list(message_ids)))
+        if chat_id == 'private':
+            raise ConnectionError('private')
+        return [SimpleNamespace(id=i, media_group_id=None, empty=False) for i in message_ids]
+
+
+def test_get_messages_by_links_batches_per_chat():
+    client = FakeClient()
+    links: list = [f'https://t.me/c/1001/{i}' for i in range(1, 251)] + [
+        'https://t.me/channel/3?single',
+        'https://t.me/channel/4?comment',
+        'https://t.me/private/5'
+    ]
+    result: dict = asyncio.run(get_messages_by_links(client, links))
+    assert [len(ids) for _, ids in client.calls] == [200, 50, 1, 1]
+    assert len(result) == 251
+    assert 'https://t.me/private/5' not in result
+    assert 'https://t.me/channel/4?comment' not in result
+    assert result['https://t.me/channel/3?single'].get('link_type') == LinkType.SINGLE